@@ -1,13 +1,26 @@
+import datetime
 import os.path
 import tomllib
 import typer
 
+from anydev.commands import cache as cache_commands
+from anydev.commands import daemon as daemon_commands
+from anydev.commands import db as db_commands
+from anydev.commands import pool as pool_commands
 from anydev.commands import project as project_commands
 from anydev.commands import services as services_commands
 from anydev.configuration import Configuration
 from anydev.core.cli_output import CliOutput
 from anydev.core.command_alias_group import CommandAliasGroup
 from anydev.core.configure_services import ConfigureServices
+from anydev.core.disk_reclaimer import DiskReclaimer
+from anydev.core.docker_controls import DockerHelpers
+from anydev.core.group_startup import GroupStartup
+from anydev.core.resource_stats import ResourceStats
+from anydev.core.traefik_metrics import TraefikMetrics
+from rich.console import Console
+from rich.live import Live
+from rich.table import Table
 
 # Initialize CLI
 main = typer.Typer(
@@ -46,6 +59,257 @@ def version():
         CliOutput.info(data['tool']['poetry']['version'])
 
 
+@main.command("u | up")
+def up(
+        group: str = typer.Argument(
+            None,
+            help="A group from config.yaml. Lists the groups if omitted.",
+            shell_complete=GroupStartup.complete_group_name
+        ),
+        concurrency: int = typer.Option(None, "--concurrency", "-j", help="Projects started at once. Defaults to the "
+                                                                            "group's setting, or 4."),
+        timeout: float = typer.Option(120, "--timeout", "-t", help="Seconds to wait for each project to be ready."),
+        plan: bool = typer.Option(False, "--plan", help="Show the startup order without starting anything."),
+):
+    """Start a group of projects and the services they need, in dependency order."""
+    if not group:
+        print_groups()
+        return
+
+    startup = GroupStartup(group, concurrency=concurrency, ready_timeout=timeout)
+    errors = startup.validate(require_docker=not plan)
+    if errors:
+        for error in errors:
+            CliOutput.warning(error)
+        CliOutput.error(f"Group '{group}' can't be started.")
+
+    if plan:
+        for index, stage in enumerate(startup.plan(), start=1):
+            CliOutput.info(f"Stage {index}: {', '.join(stage)}")
+        return
+
+    CliOutput.info(f"Starting {len(startup.nodes) - 1} project(s) in '{group}', {startup.concurrency} at a time...")
+
+    def on_progress(name: str, result: dict) -> None:
+        if result['status'] == 'ready':
+            CliOutput.success(f"{name} ready at {result['finished']:.1f}s")
+        elif result['status'] in ['failed', 'skipped']:
+            CliOutput.warning(f"{name} {result['status']}: {result['error']}")
+        else:
+            CliOutput.info(f"{name} starting...")
+
+    results = startup.run(progress=on_progress)
+
+    registry = config.get_registry()
+    for name, result in results.items():
+        if name != GroupStartup.SERVICES and result['status'] == 'ready':
+            registry.set_status_by_path(startup.nodes[name]['path'], 'running')
+
+    print_group_startup(startup, results)
+    if any(result['status'] != 'ready' for result in results.values()):
+        raise typer.Exit(code=1)
+
+
+def print_groups() -> None:
+    groups = config.get_groups()
+    if not groups:
+        CliOutput.info(f"No groups are configured. Add a 'groups' section to {config.config_file}.")
+        return
+    table = Table(title="AnyDev Groups")
+    table.add_column("Group", justify="left", style="cyan", no_wrap=True)
+    table.add_column("Projects", justify="left")
+    table.add_column("Profiles", justify="left", style="magenta")
+    for name, group in groups.items():
+        table.add_row(name, ', '.join(GroupStartup.get_project_names(group)), ', '.join((group or {}).get('profiles') or []))
+    Console().print(table)
+
+
+def print_group_startup(startup: GroupStartup, results: dict) -> None:
+    """Prints per-project timings, the critical path and the total wall time of a group startup."""
+    table = Table(title=f"Startup of '{startup.group}'")
+    table.add_column("Node", justify="left", style="cyan", no_wrap=True)
+    table.add_column("Waited For", justify="left")
+    table.add_column("Queued At", justify="right")
+    table.add_column("Up", justify="right")
+    table.add_column("Ready", justify="right")
+    table.add_column("Finished At", justify="right")
+    table.add_column("Status", justify="left")
+
+    def seconds(value) -> str:
+        return f"{value:.1f}s" if value is not None else "-"
+
+    serial_total = 0.0
+    for name in [name for stage in startup.plan() for name in stage]:
+        result = results[name]
+        started, up_at, finished = result.get('started'), result.get('up'), result.get('finished')
+        if started is not None and finished is not None:
+            serial_total += finished - started
+        table.add_row(
+            name,
+            result['waited_on'] or '-',
+            seconds(result.get('queued')),
+            seconds(up_at - started if started is not None and up_at is not None else None),
+            seconds(finished - up_at if up_at is not None and finished is not None else None),
+            seconds(finished),
+            "[green]ready[/green]" if result['status'] == 'ready' else f"[red]{result['status']}[/red]"
+        )
+    Console().print(table)
+
+    path = GroupStartup.critical_path(results)
+    if path:
+        steps = [f"{name} ({results[name]['finished'] - results[name]['started']:.1f}s)" for name in path]
+        CliOutput.info(f"Critical path: {' -> '.join(steps)}")
+        wall_time = max(result['finished'] for result in results.values() if result.get('finished') is not None)
+        CliOutput.info(f"Total wall time: {wall_time:.1f}s (one at a time: {serial_total:.1f}s)")
+
+
+@main.command("st | stats")
+def stats(
+        once: bool = typer.Option(False, "--once", help="Print a single sample and exit."),
+        history: int = typer.Option(60, "--history", "-n", help="Number of samples kept for trend sparklines."),
+        export: str = typer.Option(None, "--export", "-e", help="Append every sample to this file."),
+        export_format: str = typer.Option("csv", "--format", "-f", help="Export format: csv or json (JSON lines)."),
+):
+    """Show CPU, memory, network, and disk usage per project and shared service."""
+    if export_format not in ['csv', 'json']:
+        CliOutput.error(f"Unsupported export format: {export_format}")
+
+    resource_stats = ResourceStats(history_size=history)
+    export_file = open(export, 'a', newline='') if export else None
+    write_header = export_file is not None and export_file.tell() == 0
+
+    try:
+        with Live(console=Console(), auto_refresh=False) as live:
+            for frame in resource_stats.stream(once=once):
+                live.update(resource_stats.render_table(frame), refresh=True)
+                if export_file:
+                    ResourceStats.export_frame(frame, export_file, export_format, write_header)
+                    write_header = False
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if export_file:
+            export_file.close()
+            CliOutput.info(f"Samples exported to {export}")
+
+
+@main.command("m | metrics")
+def metrics(
+        once: bool = typer.Option(False, "--once", help="Report on a single interval and exit."),
+        window: float = typer.Option(60, "--window", "-w", help="Sliding window, in seconds."),
+        interval: float = typer.Option(2, "--interval", "-i", help="Seconds between scrapes."),
+        export: str = typer.Option(None, "--export", "-e", help="Append every report to this file."),
+        export_format: str = typer.Option("csv", "--format", "-f", help="Export format: csv or json (JSON lines)."),
+):
+    """Show requests per second, status codes, and latency percentiles per project."""
+    if export_format not in ['csv', 'json']:
+        CliOutput.error(f"Unsupported export format: {export_format}")
+
+    traefik_metrics = TraefikMetrics(window=window, interval=interval)
+    TraefikMetrics.check_endpoint(traefik_metrics.url)
+    export_file = open(export, 'a', newline='') if export else None
+    write_header = export_file is not None and export_file.tell() == 0
+
+    try:
+        with Live(console=Console(), auto_refresh=False) as live:
+            for report in traefik_metrics.stream(once=once):
+                live.update(traefik_metrics.render_table(report), refresh=True)
+                if export_file:
+                    TraefikMetrics.export_report(report, export_file, export_format, write_header)
+                    write_header = False
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if export_file:
+            export_file.close()
+            CliOutput.info(f"Reports exported to {export}")
+
+
+@main.command("gc")
+def gc(
+        budget: str = typer.Option(None, "--budget", "-b", help="Disk space AnyDev may use (e.g. 50GB). Removes the "
+                                                                "least recently used artifacts above it. Defaults to "
+                                                                "gc.budget in config.yaml."),
+        dry_run: bool = typer.Option(False, "--dry-run", help="Only show what would be removed."),
+        yes: bool = typer.Option(False, "--yes", "-y", help="Don't ask for confirmation."),
+):
+    """Show disk space used per project and service version, and reclaim the least recently used."""
+    if not DockerHelpers.is_docker_running():
+        CliOutput.error("Docker isn't running.")
+    reclaimer = DiskReclaimer()
+    try:
+        budget_bytes = DiskReclaimer.parse_budget(budget or reclaimer.settings['budget']) \
+            if budget or reclaimer.settings['budget'] else None
+        artifacts = reclaimer.scan()
+    except (ValueError, RuntimeError) as e:
+        CliOutput.error(str(e))
+
+    print_disk_usage(reclaimer.summarize(artifacts))
+    total = sum(artifact['size'] for artifact in artifacts)
+    if budget_bytes is None:
+        CliOutput.info(f"AnyDev uses {ResourceStats.format_bytes(total)}. Pass --budget (or set gc.budget in "
+                       f"{config.config_file}) to reclaim space.")
+        return
+    evictions = DiskReclaimer.plan(artifacts, budget_bytes)
+    if not evictions:
+        CliOutput.success(f"AnyDev uses {ResourceStats.format_bytes(total)}, within the "
+                          f"{ResourceStats.format_bytes(budget_bytes)} budget.")
+        return
+
+    table = Table(title="To Remove (least recently used first)")
+    table.add_column("Owner", justify="left", style="cyan")
+    table.add_column("Kind", justify="left")
+    table.add_column("Artifact", justify="left", overflow="fold")
+    table.add_column("Size", justify="right", style="green")
+    for artifact in evictions:
+        table.add_row(artifact['owner'], artifact['kind'], artifact['name'],
+                      ResourceStats.format_bytes(artifact['size']))
+    Console().print(table)
+    freed = sum(artifact['size'] for artifact in evictions)
+    CliOutput.info(f"Removing {len(evictions)} artifact(s) frees {ResourceStats.format_bytes(freed)}, leaving "
+                   f"{ResourceStats.format_bytes(total - freed)} of the {ResourceStats.format_bytes(budget_bytes)} "
+                   f"budget.")
+    if total - freed > budget_bytes:
+        CliOutput.warning("That's still over budget: the rest is running, recently used, or the configured service "
+                          "versions.")
+    if dry_run:
+        return
+    if not yes and not typer.confirm("Remove them?"):
+        CliOutput.alert("Nothing removed.", True)
+
+    def on_removed(artifact: dict, error: None or str) -> None:
+        if error:
+            CliOutput.warning(f"Unable to remove {artifact['kind']} {artifact['name']}: {error}")
+
+    results = reclaimer.evict(evictions, progress=on_removed)
+    freed = sum(artifact['size'] for artifact, error in results if not error)
+    CliOutput.success(f"Reclaimed {ResourceStats.format_bytes(freed)}.")
+
+
+def print_disk_usage(owners: list) -> None:
+    """Prints disk usage per owner, least recently used first."""
+    table = Table(title="AnyDev Disk Usage")
+    table.add_column("Owner", justify="left", style="cyan")
+    table.add_column("Type", justify="left")
+    table.add_column("Last Used", justify="left")
+    table.add_column("Artifacts", justify="right")
+    table.add_column("Size", justify="right")
+    table.add_column("Reclaimable", justify="right", style="green")
+    table.add_column("Kept Because", justify="left", style="magenta")
+    for owner in owners:
+        table.add_row(
+            owner['owner'],
+            owner['owner_type'],
+            datetime.datetime.fromtimestamp(owner['last_used']).strftime('%Y-%m-%d %H:%M') if owner['last_used']
+            else '-',
+            str(owner['artifacts']),
+            ResourceStats.format_bytes(owner['size']),
+            ResourceStats.format_bytes(owner['reclaimable']),
+            owner['protected'] or '-'
+        )
+    Console().print(table)
+
+
 # ==================
 # Sub-commands
 # ==================
@@ -60,5 +324,17 @@ main.add_typer(project_commands.cmd, name="pr | proj", hidden=True)
 main.add_typer(services_commands.cmd, name="s | services")
 main.add_typer(services_commands.cmd, name="srv | svc | serv | service", hidden=True)
 
+# Database commands
+main.add_typer(db_commands.cmd, name="db | database")
+
+# HTTP cache commands
+main.add_typer(cache_commands.cmd, name="ca | cache")
+
+# Daemon commands
+main.add_typer(daemon_commands.cmd, name="d | daemon")
+
+# Warm pool commands
+main.add_typer(pool_commands.cmd, name="pl | pool")
+
 if __name__ == '__main__':
     main()
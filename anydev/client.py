@@ -0,0 +1,221 @@
+"""
+Thin `anydev` entry point.
+
+When the AnyDev daemon (`anydevd`) is running, commands it can serve are sent to it over a unix socket and answered
+from its warm state, without importing typer, rich, or the rest of the CLI. Anything else, or any problem reaching
+the daemon, falls back to running the CLI in-process. Keep this module's imports to the standard library.
+"""
+import json
+import os
+import shlex
+import shutil
+import socket
+import sys
+
+CONFIG_DIR = os.path.join(os.path.expanduser('~'), '.anydev')
+SOCKET_PATH = os.path.join(CONFIG_DIR, 'anydevd.sock')
+COMPLETION_CACHE = os.path.join(CONFIG_DIR, 'cache', 'completion.json')
+
+# Files whose changes invalidate the completion cache: command definitions, configuration, and the registry
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPLETION_SOURCES = [
+    os.path.join(_PACKAGE_DIR, 'cli.py'),
+    os.path.join(_PACKAGE_DIR, 'commands'),
+    os.path.join(CONFIG_DIR, 'config.yaml'),
+    os.path.join(CONFIG_DIR, 'projects.db.updated'),
+]
+
+# Environment that affects how output is rendered
+FORWARDED_ENV = ['TERM', 'NO_COLOR', 'FORCE_COLOR', 'COLORTERM']
+
+
+def request(payload: dict, timeout: float = 30) -> None or dict:
+    """
+    Sends one request to the daemon and reads its reply.
+
+    Returns:
+        dict: The reply, or None if the daemon isn't reachable.
+    """
+    if not os.path.exists(SOCKET_PATH):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(SOCKET_PATH)
+            sock.sendall(json.dumps(payload).encode() + b'\n')
+            data = b''
+            while not data.endswith(b'\n'):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+        return json.loads(data) if data else None
+    except (OSError, ValueError):
+        return None
+
+
+def run_via_daemon(argv: list) -> None or int:
+    """
+    Asks the daemon to run a command.
+
+    Returns:
+        int: The command's exit code, or None if the command should run in-process instead.
+    """
+    reply = request({
+        'op':      'run',
+        'argv':    argv,
+        'cwd':     os.getcwd(),
+        'tty':     sys.stdout.isatty(),
+        'columns': shutil.get_terminal_size().columns,
+        'env':     {key: os.environ[key] for key in FORWARDED_ENV if key in os.environ},
+    })
+    if not reply or reply.get('fallback'):
+        return None
+    sys.stdout.write(reply.get('out', ''))
+    sys.stdout.flush()
+    sys.stderr.write(reply.get('err', ''))
+    sys.stderr.flush()
+    return reply.get('exit', 0)
+
+
+def completion_fingerprint() -> list:
+    """Modification times of everything the completion cache is built from."""
+    fingerprint = []
+    for path in COMPLETION_SOURCES:
+        paths = [path]
+        if os.path.isdir(path):
+            paths = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.py'))
+        for file in paths:
+            try:
+                fingerprint.append([file, os.stat(file).st_mtime_ns])
+            except OSError:
+                fingerprint.append([file, None])
+    return fingerprint
+
+
+def complete_from_cache(mode: str) -> bool:
+    """
+    Answers a shell completion request from the completion cache.
+
+    Args:
+        mode (str): The value of _ANYDEV_COMPLETE (complete_bash, complete_zsh, or complete_fish).
+
+    Returns:
+        bool: False if the cache is missing or stale, or the shell isn't supported; the CLI should answer instead.
+    """
+    if mode not in ['complete_bash', 'complete_zsh', 'complete_fish']:
+        return False
+    try:
+        with open(COMPLETION_CACHE, 'r') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if cache.get('fingerprint') != completion_fingerprint():
+        return False
+
+    # Same argument handling as typer's completion classes
+    if mode == 'complete_bash':
+        words = shlex_split(os.environ.get('COMP_WORDS', ''))
+        cword = int(os.environ.get('COMP_CWORD', len(words)))
+        args, incomplete = words[1:cword], words[cword] if cword < len(words) else ''
+    else:
+        line = os.environ.get('_TYPER_COMPLETE_ARGS', '')
+        args = shlex_split(line)[1:]
+        incomplete = args.pop() if args and not line.endswith(' ') else ''
+
+    items = _completion_items(cache, args, incomplete)
+
+    if mode == 'complete_bash':
+        output = '\n'.join(value for value, _ in items)
+    elif mode == 'complete_zsh':
+        def escape(text: str) -> str:
+            return text.replace('"', '""').replace("'", "''").replace('$', '\\$').replace('`', '\\`')
+        formatted = [f'"{escape(value)}":"{escape(help_text)}"' if help_text else f'"{escape(value)}"'
+                     for value, help_text in items]
+        output = f"_arguments '*: :(({chr(10).join(formatted)}))'" if formatted else '_files'
+    else:
+        action = os.environ.get('_TYPER_COMPLETE_FISH_ACTION', '')
+        if action == 'is-args':
+            sys.exit(0 if items else 1)
+        output = '\n'.join(f"{value}\t{' '.join(help_text.split())}" if help_text else value
+                           for value, help_text in items)
+
+    sys.stdout.write(output)
+    return True
+
+
+def _completion_items(cache: dict, args: list, incomplete: str) -> list:
+    """Walks the cached command tree like click would and lists (value, help) completions."""
+    node = cache['tree']
+    pending_option = None
+    positional = 0
+    for arg in args:
+        if pending_option:
+            pending_option = None
+            continue
+        if arg.startswith('-'):
+            option = next((option for option in node['options'] if arg.split('=')[0] in option['opts']), None)
+            if option and option['takes_value'] and '=' not in arg:
+                pending_option = option
+            continue
+        if 'commands' in node and arg in node['aliases']:
+            node = node['commands'][node['aliases'][arg]]
+            positional = 0
+        else:
+            positional += 1
+
+    def values(kind: str) -> list:
+        # Completion values for a known completer (e.g. registered project names), with their help text
+        return [(name, help_text) for name, help_text in cache.get(kind) or [] if name.startswith(incomplete)]
+
+    if pending_option:
+        return values(pending_option['complete']) if pending_option['complete'] else []
+    if incomplete.startswith('-'):
+        return [(opt, option['help']) for option in node['options'] if not option['hidden']
+                for opt in option['opts'] if opt.startswith(incomplete)]
+    if 'commands' in node:
+        return [(alias, node['commands'][name]['help']) for alias, name in node['aliases'].items()
+                if alias.startswith(incomplete) and not node['commands'][name]['hidden']]
+
+    arguments = node['arguments']
+    argument = arguments[min(positional, len(arguments) - 1)] if arguments else None
+    if argument and (positional < len(arguments) or argument['nargs'] == -1) and argument['complete']:
+        return values(argument['complete'])
+    return []
+
+
+def shlex_split(line: str) -> list:
+    try:
+        return shlex.split(line)
+    except ValueError:
+        # Unbalanced quotes while typing; fall back to whitespace
+        return line.split()
+
+
+def main() -> None:
+    argv = sys.argv[1:]
+    complete_mode = os.environ.get('_ANYDEV_COMPLETE')
+
+    if complete_mode:
+        if complete_from_cache(complete_mode):
+            return
+        # Stale or missing cache: answer in-process, and rebuild the cache for next time
+        from anydev.cli import main as cli_main
+        from anydev.core.completion_cache import CompletionCache
+        if CompletionCache.is_stale():
+            CompletionCache.write(cli_main)
+        cli_main(prog_name='anydev')
+        return
+
+    # Opted-out runs always go straight to the CLI
+    if argv and not os.environ.get('ANYDEV_NO_DAEMON'):
+        exit_code = run_via_daemon(argv)
+        if exit_code is not None:
+            sys.exit(exit_code)
+
+    from anydev.cli import main as cli_main
+    cli_main()
+
+
+if __name__ == '__main__':
+    main()
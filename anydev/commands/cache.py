@@ -0,0 +1,159 @@
+import os
+import typer
+
+from anydev.commands.project_helpers import ProjectHelpers
+from anydev.configuration import Configuration
+from anydev.core.cli_output import CliOutput
+from anydev.core.command_alias_group import CommandAliasGroup
+from anydev.core.docker_controls import DockerHelpers
+from anydev.core.http_cache import HttpCache
+from anydev.core.resource_stats import ResourceStats
+from rich.console import Console
+from rich.table import Table
+
+# Get config object
+config = Configuration()
+
+# Initialize Typer for the cache sub-commands
+cmd = typer.Typer(
+    help="Route projects through the shared HTTP cache and see how cacheable they are.",
+    no_args_is_help=True,
+    cls=CommandAliasGroup
+)
+
+
+@cmd.command('st | stats')
+def stats(
+        name: str = typer.Argument(
+            None,
+            help="Only report on this registered project.",
+            shell_complete=ProjectHelpers.complete_project_name
+        ),
+        since: float = typer.Option(None, "--since", "-s", help="Only count requests from the last N minutes."),
+        top: int = typer.Option(20, "--top", "-n", help="Number of URLs to list."),
+        uncacheable: bool = typer.Option(False, "--uncacheable", "-u", help="Only list URLs that can't be cached."),
+):
+    """Show hit ratio, bytes served from cache, and per-URL cacheability."""
+    host = ProjectHelpers.get_project_hostname(resolve_project(name)) if name else None
+    http_cache = HttpCache()
+    result = http_cache.stats(host, since)
+
+    if result['total']['requests'] == 0:
+        CliOutput.info(f"No requests have gone through the cache yet ({http_cache.log_file}).")
+        if 'cache' not in config.get_active_profiles():
+            CliOutput.info("Enable the 'cache' profile with `anydev configure`, then `anydev cache enable` a project.")
+        return
+
+    console = Console()
+    hosts = Table(title="HTTP Cache")
+    hosts.add_column("Site", justify="left", style="cyan", no_wrap=True)
+    hosts.add_column("Requests", justify="right")
+    hosts.add_column("Hit Ratio", justify="right", style="green")
+    hosts.add_column("Served", justify="right")
+    hosts.add_column("From Cache", justify="right", style="green")
+    for site, summary in sorted(result['hosts'].items()) + [('Total', result['total'])]:
+        hosts.add_row(
+            site if site != 'Total' else '[bold]Total[/bold]',
+            str(summary['requests']),
+            format_ratio(summary['hits'], summary['cached']),
+            ResourceStats.format_bytes(summary['bytes']),
+            ResourceStats.format_bytes(summary['hit_bytes'])
+        )
+    console.print(hosts)
+
+    urls = [(key, summary) for key, summary in result['urls'].items() if not uncacheable or not summary['verdict'][0]]
+    urls.sort(key=lambda item: (item[1]['requests'], item[1]['bytes']), reverse=True)
+
+    table = Table(title=f"Top {min(top, len(urls))} of {len(urls)} URLs")
+    table.add_column("URL", justify="left", style="cyan", overflow="fold")
+    table.add_column("Requests", justify="right")
+    table.add_column("Hit Ratio", justify="right", style="green")
+    table.add_column("From Cache", justify="right")
+    table.add_column("Cacheable", justify="left")
+    for (site, uri), summary in urls[:top]:
+        cacheable, reason = summary['verdict']
+        table.add_row(
+            uri if host else f"{site}{uri}",
+            str(summary['requests']),
+            format_ratio(summary['hits'], summary['cached']),
+            ResourceStats.format_bytes(summary['hit_bytes']),
+            "[green]yes[/green]" if cacheable else f"[red]no[/red] ({reason})"
+        )
+    console.print(table)
+
+
+@cmd.command('e | enable')
+def enable(
+        name: str = typer.Argument(
+            None,
+            help="A registered project. Defaults to the current project.",
+            shell_complete=ProjectHelpers.complete_project_name
+        ),
+):
+    """Route a project's requests through the shared HTTP cache."""
+    set_project_caching(resolve_project(name), True)
+
+
+@cmd.command('d | disable')
+def disable(
+        name: str = typer.Argument(
+            None,
+            help="A registered project. Defaults to the current project.",
+            shell_complete=ProjectHelpers.complete_project_name
+        ),
+):
+    """Serve a project directly again, without the shared HTTP cache."""
+    set_project_caching(resolve_project(name), False)
+
+
+@cmd.command('p | purge')
+def purge(
+        name: str = typer.Argument(
+            None,
+            help="Only purge this registered project's responses. Defaults to everything.",
+            shell_complete=ProjectHelpers.complete_project_name
+        ),
+):
+    """Empty the shared HTTP cache."""
+    host = ProjectHelpers.get_project_hostname(resolve_project(name)) if name else None
+    if not DockerHelpers.is_service_running('http-cache', config.cli_root_dir):
+        CliOutput.error("The HTTP cache isn't running. Enable the 'cache' profile with `anydev configure`.")
+    if not HttpCache.purge(host):
+        CliOutput.error("Could not purge the HTTP cache.")
+    CliOutput.success(f"Purged cached responses for {host}." if host else "Purged all cached responses.")
+
+
+def resolve_project(name: str = None) -> str:
+    """Gets a registered project's path by name, or the current project's path."""
+    if name:
+        project = config.get_registry().get(name)
+        if project is None:
+            CliOutput.error(f"No registered project named {name}.")
+        return project['path']
+    if not ProjectHelpers.is_project(os.getcwd()):
+        raise typer.Exit(code=1)
+    return os.path.abspath(os.getcwd())
+
+
+def set_project_caching(path: str, enabled: bool) -> None:
+    """Opts a project in or out of the cache and recreates its containers if they're running."""
+    if HttpCache.is_enabled(path) == enabled:
+        CliOutput.info(f"Caching is already {'enabled' if enabled else 'disabled'} for {os.path.basename(path)}.")
+        return
+
+    HttpCache.set_enabled(path, enabled)
+    if enabled and 'cache' not in config.get_active_profiles():
+        CliOutput.warning("The 'cache' profile isn't active. Enable it with `anydev configure`, or requests will fail.")
+
+    if DockerHelpers.is_composition_running(path):
+        # Traefik reads routing from container labels, so the containers need recreating
+        result = DockerHelpers.start_composition(path)
+        if result.returncode != 0:
+            CliOutput.error(f"Could not restart {os.path.basename(path)}: {result.stderr.strip()}")
+
+    hostname = ProjectHelpers.get_project_hostname(path) or os.path.basename(path)
+    CliOutput.success(f"{hostname} is {'now' if enabled else 'no longer'} served through the HTTP cache.")
+
+
+def format_ratio(part: int, whole: int) -> str:
+    return f"{part / whole * 100:.1f}%" if whole else "-"
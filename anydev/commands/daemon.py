@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+import time
+import typer
+
+from anydev import client
+from anydev.configuration import Configuration
+from anydev.core.cli_output import CliOutput
+from anydev.core.command_alias_group import CommandAliasGroup
+
+# Initialize Typer for the daemon sub-commands
+cmd = typer.Typer(
+    help="Manage anydevd, the optional background daemon that makes common commands instant.",
+    no_args_is_help=True,
+    cls=CommandAliasGroup
+)
+
+
+@cmd.command('s | start')
+def start(
+        foreground: bool = typer.Option(False, "--foreground", "-f", help="Run in this terminal instead."),
+):
+    """Start the daemon."""
+    if client.request({'op': 'ping'}):
+        CliOutput.info("The daemon is already running.")
+        return
+
+    daemon_cmd = [sys.executable, '-m', 'anydev.daemon']
+    if foreground:
+        CliOutput.info(f"Serving on {client.SOCKET_PATH}. Press Ctrl+C to exit.")
+        try:
+            subprocess.run(daemon_cmd)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    log_dir = os.path.join(Configuration().config_dir, 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    with open(os.path.join(log_dir, 'anydevd.log'), 'a') as log_file:
+        subprocess.Popen(daemon_cmd, stdout=log_file, stderr=log_file, stdin=subprocess.DEVNULL,
+                         start_new_session=True)
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if client.request({'op': 'ping'}, timeout=1):
+            CliOutput.success("Daemon started.")
+            return
+        time.sleep(0.1)
+    CliOutput.error(f"The daemon didn't start. See {os.path.join(log_dir, 'anydevd.log')}.")
+
+
+@cmd.command('x | stop')
+def stop():
+    """Stop the daemon."""
+    if client.request({'op': 'shutdown'}) is None:
+        CliOutput.info("The daemon isn't running.")
+        return
+    CliOutput.success("Daemon stopped.")
+
+
+@cmd.command('st | status')
+def status():
+    """Show whether the daemon is running, and how quickly it answers."""
+    started = time.perf_counter()
+    reply = client.request({'op': 'ping'})
+    latency = time.perf_counter() - started
+    if not reply:
+        CliOutput.info("The daemon isn't running. Start it with `anydev daemon start`.")
+        return
+    CliOutput.success(
+        f"Running (pid {reply['pid']}) for {reply['uptime'] / 60:.0f} minutes, {reply['requests']} request(s) "
+        f"served. Round trip: {latency * 1000:.1f}ms."
+    )
+    CliOutput.info(f"Served commands: {', '.join(reply['served'])}")
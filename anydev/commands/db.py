@@ -0,0 +1,215 @@
+import os
+import time
+import typer
+
+from anydev.commands.project_helpers import ProjectHelpers
+from anydev.core.cli_output import CliOutput
+from anydev.core.command_alias_group import CommandAliasGroup
+from anydev.core.db_snapshots import DatabaseSnapshots
+from anydev.core.slow_queries import QueryDigest, SlowQueryLog
+from dotenv import dotenv_values
+from rich.console import Console
+from rich.table import Table
+
+# Initialize Typer for the database sub-commands
+cmd = typer.Typer(
+    help="Snapshot and inspect project databases on the shared services.",
+    no_args_is_help=True,
+    cls=CommandAliasGroup
+)
+
+# Project .env keys that name the project's database, per engine
+DATABASE_ENV_KEYS = {
+    'mysql':    ['MYSQL_DATABASE', 'DB_DATABASE'],
+    'postgres': ['POSTGRES_DB', 'POSTGRES_DATABASE', 'DB_DATABASE'],
+}
+
+
+def resolve_database(engine: str, database: str = None) -> str:
+    """
+    Finds the database to operate on: the explicit name, or the one configured in the current project's .env.
+    """
+    if engine not in DATABASE_ENV_KEYS:
+        CliOutput.error(f"Unsupported database engine: {engine}")
+    if database:
+        return database
+
+    if not ProjectHelpers.is_project():
+        CliOutput.error("Run this inside an AnyDev project or pass --database.")
+
+    env = {}
+    for filename in ['.env.example', '.env']:
+        if os.path.isfile(filename):
+            env |= dotenv_values(filename)
+    for key in DATABASE_ENV_KEYS[engine]:
+        if env.get(key):
+            return env[key]
+
+    CliOutput.error(f"No database configured in this project's .env ({', '.join(DATABASE_ENV_KEYS[engine])}).")
+
+
+def format_summary(manifest: dict, action: str) -> str:
+    """Formats size and throughput figures for a snapshot or restore."""
+    raw_mb = manifest['raw_bytes'] / (1024 * 1024)
+    compressed_mb = manifest['compressed_bytes'] / (1024 * 1024)
+    return (
+        f"{action} '{manifest['name']}' ({manifest['database']}): {raw_mb:.1f} MB raw, "
+        f"{compressed_mb:.1f} MB compressed, {len(manifest['chunks'])} chunk(s) in {manifest['seconds']:.2f}s "
+        f"({manifest['throughput_mbs']:.1f} MB/s)"
+    )
+
+
+@cmd.command('s | snapshot')
+def snapshot(
+        name: str = typer.Argument(..., help="Name for the snapshot (replaces an existing one)."),
+        engine: str = typer.Option("mysql", "--engine", "-e", help="Shared database service: mysql or postgres."),
+        database: str = typer.Option(None, "--database", "-d", help="Database name. Defaults to the project's."),
+        jobs: int = typer.Option(4, "--jobs", "-j", help="Number of parallel dump jobs."),
+        chunk_rows: int = typer.Option(500_000, "--chunk-rows", help="Split larger tables into chunks of ~N rows."),
+):
+    """
+    Save a snapshot of the project's database.
+
+    Postgres snapshots are consistent across all chunks. MySQL chunks are each dumped in their own transaction, so
+    avoid writing to the database while a MySQL snapshot is running.
+    """
+    database = resolve_database(engine, database)
+    snapshots = DatabaseSnapshots(engine, database, jobs=jobs, chunk_rows=chunk_rows)
+    try:
+        manifest = snapshots.snapshot(name)
+    except RuntimeError as e:
+        CliOutput.error(str(e))
+    CliOutput.success(format_summary(manifest, "Saved snapshot"))
+
+
+@cmd.command('r | restore')
+def restore(
+        name: str = typer.Argument(..., help="Name of the snapshot to restore."),
+        engine: str = typer.Option("mysql", "--engine", "-e", help="Shared database service: mysql or postgres."),
+        database: str = typer.Option(None, "--database", "-d", help="Database name. Defaults to the project's."),
+        jobs: int = typer.Option(4, "--jobs", "-j", help="Number of parallel restore jobs."),
+        force: bool = typer.Option(False, "--force", "-f", help="Don't ask for confirmation."),
+):
+    """Replace the project's database with a snapshot."""
+    database = resolve_database(engine, database)
+    if not force and not typer.confirm(f"This will replace the {engine} database '{database}'. Continue?"):
+        CliOutput.alert("Restore cancelled.", True)
+
+    snapshots = DatabaseSnapshots(engine, database, jobs=jobs)
+    try:
+        manifest = snapshots.restore(name)
+    except (FileNotFoundError, RuntimeError) as e:
+        CliOutput.error(str(e))
+    CliOutput.success(format_summary(manifest, "Restored snapshot"))
+
+
+@cmd.command('l | list')
+@cmd.command('ls', hidden=True)
+def list_all(
+        engine: str = typer.Option("mysql", "--engine", "-e", help="Shared database service: mysql or postgres."),
+        database: str = typer.Option(None, "--database", "-d", help="Database name. Defaults to the project's."),
+):
+    """List snapshots of the project's database."""
+    database = resolve_database(engine, database)
+
+    table = Table(title=f"Snapshots of {engine} database '{database}'")
+    table.add_column("Name", justify="left", style="cyan", no_wrap=True)
+    table.add_column("Created", justify="left", style="magenta")
+    table.add_column("Chunks", justify="right")
+    table.add_column("Raw (MB)", justify="right", style="green")
+    table.add_column("Compressed (MB)", justify="right", style="green")
+
+    for manifest in DatabaseSnapshots(engine, database).list_snapshots():
+        table.add_row(
+            manifest['name'],
+            manifest['created'],
+            str(len(manifest['chunks'])),
+            f"{manifest['raw_bytes'] / (1024 * 1024):.1f}",
+            f"{manifest['compressed_bytes'] / (1024 * 1024):.1f}",
+        )
+
+    Console().print(table)
+
+
+@cmd.command('sl | slowlog')
+@cmd.command('slow', hidden=True)
+def slowlog(
+        engine: str = typer.Option("mysql", "--engine", "-e", help="Shared database service: mysql or postgres."),
+        database: str = typer.Option(None, "--database", "-d", help="Only count queries against this database. "
+                                                                    "Defaults to the project's."),
+        all_databases: bool = typer.Option(False, "--all", "-a", help="Count queries against every database."),
+        threshold: float = typer.Option(50, "--threshold", "-t", help="Capture queries slower than N milliseconds."),
+        duration: float = typer.Option(0, "--duration", help="Stop after N seconds. Defaults to Ctrl+C."),
+        log_file: str = typer.Option(None, "--file", "-f", help="Digest an existing slow query (MySQL) or server "
+                                                                "(Postgres) log instead of capturing."),
+        sort: str = typer.Option("total", "--sort", "-s", help="Rank by total, p95, max, count, or rows."),
+        top: int = typer.Option(15, "--top", "-n", help="Number of queries to list."),
+):
+    """Capture slow queries for a session and show the worst ones, grouped by fingerprint."""
+    if sort not in ['total', 'p95', 'max', 'count', 'rows']:
+        CliOutput.error(f"Cannot sort by {sort}. Use total, p95, max, count, or rows.")
+    if engine not in SlowQueryLog.ENGINES:
+        CliOutput.error(f"Unsupported database engine: {engine}")
+    database = None if all_databases else resolve_database(engine, database)
+
+    if log_file:
+        try:
+            digest = SlowQueryLog.parse_file(log_file, engine, database)
+        except OSError as e:
+            CliOutput.error(f"Unable to read {log_file}: {e}")
+    else:
+        slow_query_log = SlowQueryLog(engine)
+        try:
+            slow_query_log.start(threshold / 1000)
+        except RuntimeError as e:
+            CliOutput.error(f"Could not turn on query logging (is the {engine} service running?): {e}")
+
+        CliOutput.info(f"Capturing {engine} queries slower than {threshold:g}ms"
+                       f"{f' against {database}' if database else ''}. Press Ctrl+C to stop.")
+        try:
+            deadline = time.monotonic() + duration if duration else None
+            while deadline is None or time.monotonic() < deadline:
+                time.sleep(max(0.0, min(1.0, deadline - time.monotonic())) if deadline else 1.0)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            try:
+                slow_query_log.stop()
+            except RuntimeError as e:
+                CliOutput.warning(f"Could not restore {engine}'s logging settings: {e}")
+        digest = slow_query_log.digest(database)
+
+    print_digest(digest, sort, top, database)
+
+
+def print_digest(digest: QueryDigest, sort: str, top: int, database: str = None) -> None:
+    """Prints the worst query fingerprints."""
+    if not digest.total_queries:
+        CliOutput.info("No slow queries were captured.")
+        return
+
+    def seconds(value: None or float) -> str:
+        if value is None:
+            return "-"
+        return f"{value * 1000:.1f}ms" if value < 10 else f"{value:.1f}s"
+
+    table = Table(title=f"Slowest Queries{f' in {database}' if database else ''} "
+                        f"({digest.total_queries} captured, {len(digest.fingerprints)} distinct)")
+    table.add_column("Query", justify="left", style="cyan", overflow="fold", ratio=1)
+    table.add_column("Database", justify="left", style="magenta")
+    table.add_column("Count", justify="right")
+    table.add_column("Total", justify="right", style="green")
+    table.add_column("p95", justify="right")
+    table.add_column("Max", justify="right", style="red")
+    table.add_column("Rows Examined", justify="right")
+    for row in digest.report(sort, top):
+        table.add_row(
+            row['fingerprint'],
+            ', '.join(row['databases']) or '-',
+            str(row['count']),
+            seconds(row['total']),
+            seconds(row['p95']),
+            seconds(row['max']),
+            f"{row['rows_examined'] / row['count']:.0f}/query" if row['rows_examined'] else '-'
+        )
+    Console().print(table)
@@ -0,0 +1,101 @@
+import datetime
+import typer
+
+from anydev.configuration import Configuration
+from anydev.core.cli_output import CliOutput
+from anydev.core.command_alias_group import CommandAliasGroup
+from anydev.core.docker_controls import DockerHelpers
+from anydev.core.warm_pool import WarmPool
+from rich.console import Console
+from rich.table import Table
+
+# Get config object
+config = Configuration()
+
+# Initialize Typer for the pool sub-commands
+cmd = typer.Typer(
+    help="Keep pre-started projects ready, so `anydev project create` can adopt one instead of starting from scratch.",
+    no_args_is_help=True,
+    cls=CommandAliasGroup
+)
+
+
+@cmd.command('f | fill')
+def fill(
+        templates: list[str] = typer.Argument(None, help="Templates to keep slots of. Defaults to pool.templates in "
+                                                         "config.yaml."),
+        size: int = typer.Option(None, "--size", "-n", help="Ready slots per template. Defaults to pool.size in "
+                                                            "config.yaml, or 1."),
+):
+    """Start slots until each template has enough ready ones, replacing outdated slots."""
+    pool = WarmPool()
+    templates = templates or pool.settings['templates']
+    if not templates:
+        CliOutput.error(f"No templates to pool. Name some, or set pool.templates in {config.config_file}.")
+    if not DockerHelpers.is_docker_running():
+        CliOutput.error("Docker isn't running.")
+
+    def on_created(slot: dict) -> None:
+        if slot['state'] == 'ready':
+            CliOutput.success(f"{slot['hostname']} ready in {slot['boot_seconds']:.1f}s")
+        else:
+            CliOutput.warning(f"{slot['hostname']} failed: {slot['error']}")
+
+    CliOutput.info(f"Filling the pool for {', '.join(templates)}...")
+    try:
+        created = pool.fill(templates, size, progress=on_created)
+    except ValueError as e:
+        CliOutput.error(str(e))
+    if not created:
+        CliOutput.info("The pool is already full (or another fill is running).")
+
+
+@cmd.command('st | status')
+def status():
+    """List the pool's slots."""
+    slots = WarmPool().get_slots()
+    if not slots:
+        CliOutput.info("The pool is empty. Fill it with `anydev pool fill`.")
+        return
+
+    table = Table(title="Warm Pool")
+    table.add_column("Slot", justify="left", style="cyan", no_wrap=True)
+    table.add_column("Template", justify="left")
+    table.add_column("Versions", justify="left", style="magenta")
+    table.add_column("Created", justify="left")
+    table.add_column("Boot Time", justify="right")
+    table.add_column("State", justify="left")
+    for slot in slots:
+        if slot['stale']:
+            state = "[yellow]outdated[/yellow]"
+        elif slot['state'] == 'ready':
+            state = "[green]ready[/green]"
+        elif slot['state'] == 'failed':
+            state = f"[red]failed[/red] ({slot['error']})"
+        else:
+            state = slot['state']
+        table.add_row(
+            slot['hostname'],
+            slot['template'],
+            ', '.join(f"{key}={value}" for key, value in slot['versions'].items()) or '-',
+            datetime.datetime.fromtimestamp(slot['created']).strftime('%Y-%m-%d %H:%M'),
+            f"{slot['boot_seconds']:.1f}s" if slot['boot_seconds'] is not None else '-',
+            state
+        )
+    Console().print(table)
+
+
+@cmd.command('dr | drain')
+def drain(
+        templates: list[str] = typer.Argument(None, help="Only remove slots of these templates."),
+):
+    """Remove slots, with their containers and volumes."""
+    results = WarmPool().drain(templates)
+    if not results:
+        CliOutput.info("The pool is already empty.")
+        return
+    for slot, error in results:
+        if error:
+            CliOutput.warning(f"Unable to remove {slot['hostname']}: {error}")
+    removed = len([error for _, error in results if not error])
+    CliOutput.success(f"Removed {removed} slot(s).")
@@ -1,10 +1,30 @@
+import os
+import shlex
+import subprocess
+import sys
+import time
 import typer
 
+from anydev.configuration import Configuration
+from anydev.core.access_logs import AccessLogAnalyzer
+from anydev.core.bulk_provision import BulkProvisioner
 from anydev.core.cli_output import CliOutput
 from anydev.core.command_alias_group import CommandAliasGroup
 from anydev.core.create_project import CreateProject
 from anydev.core.docker_controls import DockerHelpers
+from anydev.core.docker_engine import DockerEngine, DockerEngineError
+from anydev.core.opcache_preload import OpcachePreload
+from anydev.core.precompressor import Precompressor
+from anydev.core.project_discovery import ProjectDiscovery
+from anydev.core.project_registry import ProjectRegistry
+from anydev.core.project_volumes import ProjectVolumes
+from anydev.core.resource_stats import ResourceStats
+from anydev.core.test_shards import TestShards
+from anydev.core.traefik_metrics import TraefikMetrics
+from anydev.core.warm_pool import WarmPool
 from anydev.commands.project_helpers import ProjectHelpers
+from rich.console import Console
+from rich.table import Table
 
 # Initialize Typer for the project sub-commands
 cmd = typer.Typer(
@@ -14,24 +34,126 @@ cmd = typer.Typer(
 )
 
 
+def provision_from_manifest(manifest: str, concurrency: int, start: bool = None) -> None:
+    """Creates every project in a manifest and prints a per-project timing summary."""
+    provisioner = BulkProvisioner(manifest, concurrency=concurrency, start=start)
+    errors = provisioner.validate()
+    if errors:
+        for error in errors:
+            CliOutput.warning(error)
+        CliOutput.error(f"Manifest has {len(errors)} problem(s). Nothing was created.")
+
+    CliOutput.info(f"Provisioning {len(provisioner.projects)} project(s), {provisioner.concurrency} at a time...")
+    started = time.monotonic()
+
+    def progress(result: dict) -> None:
+        if result['error']:
+            CliOutput.warning(f"{result['project']['name']}: {result['error']}")
+        else:
+            CliOutput.success(f"{result['project']['name']} ready in {result['timings']['total']:.1f}s")
+
+    results = provisioner.provision(progress)
+    elapsed = time.monotonic() - started
+
+    table = Table(title="Provisioned Projects")
+    table.add_column("Project", justify="left", style="cyan", no_wrap=True)
+    table.add_column("Template", justify="left", style="magenta")
+    table.add_column("Copy", justify="right")
+    table.add_column("Env", justify="right")
+    table.add_column("Start", justify="right")
+    table.add_column("Total", justify="right")
+    table.add_column("Result", justify="left")
+
+    def seconds(result: dict, step: str) -> str:
+        return f"{result['timings'][step]:.2f}s" if step in result['timings'] else '-'
+
+    for result in results:
+        if result['error']:
+            outcome = "[red]failed[/red]"
+        else:
+            outcome = "[green]running[/green]" if result['started'] else "created"
+        table.add_row(result['project']['name'], result['project']['template'], seconds(result, 'copy'),
+                      seconds(result, 'env'), seconds(result, 'start'), seconds(result, 'total'), outcome)
+    Console().print(table)
+
+    failed = [result for result in results if result['error']]
+    serial = sum(result['timings']['total'] for result in results)
+    summary = f"{len(results) - len(failed)}/{len(results)} project(s) provisioned in {elapsed:.1f}s " \
+              f"({serial:.1f}s of work)."
+    if failed:
+        CliOutput.error(summary)
+    CliOutput.success(summary)
+
+
 @cmd.command('c | create')
-def create():
+def create(
+        manifest: str = typer.Option(
+            None,
+            "--from",
+            help="Create every project listed in a YAML manifest, without prompting."
+        ),
+        concurrency: int = typer.Option(4, "--concurrency", "-j", help="Projects to provision at the same time."),
+        start: bool = typer.Option(
+            None,
+            "--start/--no-start",
+            help="Start (or don't start) every manifest project, overriding the manifest."
+        ),
+        wait: bool = typer.Option(
+            True,
+            "--wait/--no-wait",
+            help="Wait for a pooled template's new project to answer, and report how long it took."
+        ),
+):
     """Create a new project."""
-    project_creator = CreateProject()
+    if manifest:
+        provision_from_manifest(manifest, concurrency, start)
+        return
+    project_creator = CreateProject(pool=WarmPool(), wait=wait)
     project_creator.prompt()
 
 
 @cmd.command('a | add')
-def add():
-    """WIP. Add an existing project directory to AnyDev's memory."""
-    CliOutput.error('Not yet implemented.')
+def add(
+        paths: list[str] = typer.Argument(
+            None,
+            help="Directories to scan. Defaults to your projects directory plus any configured discovery_roots."
+        ),
+        depth: int = typer.Option(4, "--depth", "-d", help="How many directory levels to descend."),
+        jobs: int = typer.Option(16, "--jobs", "-j", help="Number of parallel directory scanners."),
+        full: bool = typer.Option(False, "--full", help="Ignore the scan cache and list every directory."),
+):
+    """Find existing project directories and add them to AnyDev's memory."""
+    discovery = ProjectDiscovery(max_depth=depth, jobs=jobs, use_cache=not full)
+    projects = discovery.scan(paths)
+    new_projects, conflicts = discovery.register(projects)
+
+    CliOutput.info(
+        f"Scanned {discovery.stats['directories']} directories ({discovery.stats['listed']} listed) "
+        f"in {discovery.stats['seconds'] * 1000:.0f}ms and found {len(projects)} project(s)."
+    )
+    for project in new_projects:
+        CliOutput.success(f"Registered {project['name']} ({project['template']}) at {project['path']}")
+    for project in conflicts:
+        CliOutput.warning(
+            f"Skipped {project['path']}: the name {project['name']} is already used by {project['conflict']}. "
+            f"Rename the directory to register it."
+        )
+    if not new_projects:
+        CliOutput.info("No new projects to register.")
 
 
 @cmd.command('l | list')
 @cmd.command('ls', hidden=True)
-def list_all():
+def list_all(
+        template: str = typer.Option(None, "--template", "-t", help="Only show projects using this template."),
+        status: str = typer.Option(None, "--status", "-s", help="Only show projects with this last known status."),
+        sort: str = typer.Option("name", "--sort", help="Sort by name, path, template, last_used, or status."),
+        descending: bool = typer.Option(False, "--desc", help="Sort in descending order."),
+):
     """List all projects."""
-    ProjectHelpers.list_projects()
+    if sort not in ProjectRegistry.SORT_COLUMNS:
+        CliOutput.error(f"Cannot sort by {sort}. Use one of: {', '.join(ProjectRegistry.SORT_COLUMNS)}")
+    ProjectHelpers.list_projects(template, status, sort, descending)
 
 
 @cmd.command('u | up')
@@ -41,6 +163,7 @@ def list_all():
 def start():
     """Start or restart an existing project."""
     DockerHelpers.restart_composition()
+    Configuration().get_registry().set_status_by_path(os.getcwd(), 'running')
 
 
 @cmd.command('d | down')
@@ -49,6 +172,7 @@ def start():
 def stop():
     """Stop a running project."""
     DockerHelpers.stop_composition()
+    Configuration().get_registry().set_status_by_path(os.getcwd(), 'stopped')
 
 
 @cmd.command('g | logs')
@@ -72,6 +196,443 @@ def terminal(
     ProjectHelpers.open_shell(shell_command)
 
 
+@cmd.command('x | run', context_settings={"allow_extra_args": True, "ignore_unknown_options": True})
+@cmd.command('exec', hidden=True, context_settings={"allow_extra_args": True, "ignore_unknown_options": True})
+@ProjectHelpers.validate_project
+def run(
+        command: list[str] = typer.Argument(None, help="Command to run, e.g. `anydev project run -- php artisan list`."),
+        service: str = typer.Option(None, "--service", "-s", help="Compose service. Defaults to the main container."),
+        workdir: str = typer.Option(None, "--workdir", "-w", help="Working directory inside the container."),
+        tty: bool = typer.Option(None, "--tty/--no-tty", help="Allocate a TTY. Defaults to on in a terminal."),
+        batch: str = typer.Option(None, "--batch", "-b", help="Run each line of this file ('-' for stdin) in turn."),
+        keep_going: bool = typer.Option(False, "--keep-going", "-k", help="Don't stop a batch at the first failure."),
+        benchmark: int = typer.Option(0, "--benchmark", help="Compare per-command overhead with `docker compose exec` "
+                                                             "over N runs."),
+):
+    """Run a command in the project container (fast path through the Docker Engine API)."""
+    try:
+        engine = DockerEngine()
+    except DockerEngineError as e:
+        CliOutput.error(str(e))
+
+    if benchmark:
+        benchmark_exec(engine, service, benchmark)
+        return
+
+    if batch:
+        run_batch(engine, batch, service, workdir, keep_going)
+        return
+
+    if not command:
+        CliOutput.error("Nothing to run. Pass a command or --batch.")
+    interactive = sys.stdin.isatty() and sys.stdout.isatty()
+    exit_code = ProjectHelpers.run_in_container(
+        command,
+        service=service,
+        workdir=workdir,
+        tty=interactive if tty is None else tty,
+        stdin=True,
+        engine=engine
+    )
+    raise typer.Exit(code=exit_code)
+
+
+def run_batch(engine: DockerEngine, batch: str, service: str = None, workdir: str = None,
+              keep_going: bool = False) -> None:
+    """Runs one command per line of a file (skipping blanks and # comments) over a single engine client."""
+    try:
+        lines = sys.stdin.readlines() if batch == '-' else open(batch, 'r').readlines()
+    except OSError as e:
+        CliOutput.error(f"Unable to read {batch}: {e}")
+    commands = [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+    failures = 0
+    started = time.monotonic()
+    for line in commands:
+        CliOutput.info(f"$ {line}")
+        step = time.monotonic()
+        exit_code = ProjectHelpers.run_in_container(shlex.split(line), service=service, workdir=workdir, engine=engine)
+        if exit_code != 0:
+            failures += 1
+            CliOutput.warning(f"Exited with {exit_code} after {time.monotonic() - step:.2f}s")
+            if not keep_going:
+                CliOutput.error(f"Stopped after {line}", True, exit_code)
+
+    summary = f"Ran {len(commands)} command(s) in {time.monotonic() - started:.2f}s"
+    if failures:
+        CliOutput.error(f"{summary}; {failures} failed.")
+    CliOutput.success(f"{summary}.")
+
+
+def benchmark_exec(engine: DockerEngine, service: str = None, iterations: int = 20) -> None:
+    """Measures the per-command overhead of the engine API path and of `docker compose exec`."""
+    container_id = engine.get_cached_container(os.getcwd(), service,
+                                               ProjectHelpers.get_project_hostname(os.getcwd()))
+    if not container_id:
+        CliOutput.error('The project is not currently running.')
+    service = service or engine.request('GET', f"/containers/{container_id}/json")['Config']['Labels'] \
+        .get('com.docker.compose.service', 'app')
+
+    def measure(run_once) -> list:
+        timings = []
+        for _ in range(iterations):
+            step = time.perf_counter()
+            run_once()
+            timings.append(time.perf_counter() - step)
+        return sorted(timings)
+
+    engine_timings = measure(lambda: ProjectHelpers.run_in_container(['true'], service=service, engine=engine))
+    compose_timings = measure(lambda: subprocess.run(['docker', 'compose', 'exec', '-T', service, 'true'],
+                                                     capture_output=True))
+
+    table = Table(title=f"Per-command overhead ({iterations} runs of `true` in {service})")
+    table.add_column("Path", justify="left", style="cyan")
+    table.add_column("Median", justify="right")
+    table.add_column("p90", justify="right")
+    table.add_column("Mean", justify="right")
+    for label, timings in [("anydev project run", engine_timings), ("docker compose exec", compose_timings)]:
+        table.add_row(
+            label,
+            f"{timings[len(timings) // 2] * 1000:.1f} ms",
+            f"{timings[int(len(timings) * 0.9) - 1] * 1000:.1f} ms" if len(timings) >= 10 else '-',
+            f"{sum(timings) / len(timings) * 1000:.1f} ms"
+        )
+    Console().print(table)
+
+    speedup = compose_timings[len(compose_timings) // 2] / max(engine_timings[len(engine_timings) // 2], 1e-9)
+    CliOutput.info(f"The engine API path is {speedup:.1f}x faster per command.")
+
+
+@cmd.command('pc | precompress')
+@ProjectHelpers.validate_project
+def precompress(
+        watch: bool = typer.Option(False, "--watch", "-w", help="Keep running and refresh assets as they change."),
+        interval: float = typer.Option(1.0, "--interval", "-i", help="Seconds between checks when watching."),
+        jobs: int = typer.Option(None, "--jobs", "-j", help="Files compressed in parallel. Defaults to the CPU count."),
+        clean: bool = typer.Option(False, "--clean", help="Remove all generated .gz/.br files instead."),
+):
+    """Write .gz/.br copies of static assets in src/ for Apache to serve precompressed."""
+    precompressor = Precompressor(os.getcwd(), jobs=jobs)
+    if clean:
+        CliOutput.success(f"Removed precompressed copies of {precompressor.clean()} asset(s).")
+        return
+    if not precompressor.brotli_available():
+        CliOutput.warning("Brotli isn't available (pip install brotli, or install the brotli CLI). Writing .gz only.")
+
+    def report(summary: dict) -> None:
+        saved = 1 - summary['bytes_out'] / summary['bytes_in'] if summary['bytes_in'] else 0
+        CliOutput.info(
+            f"Compressed {summary['compressed']} asset(s) ({saved:.0%} smaller), {summary['unchanged']} unchanged, "
+            f"{summary['removed']} removed in {summary['seconds']:.2f}s."
+        )
+
+    report(precompressor.run())
+    if not watch:
+        return
+    CliOutput.info("Watching src/ for changes. Press Ctrl+C to exit.")
+    try:
+        precompressor.watch(interval, on_change=report)
+    except KeyboardInterrupt:
+        pass
+
+
+@cmd.command('vo | volumes')
+@cmd.command('vol', hidden=True)
+@ProjectHelpers.validate_project
+def volumes(
+        action: str = typer.Argument("list", help="list, seed (fill empty volumes from the host), refresh (replace "
+                                                  "their contents with the host's), or clean (remove them)."),
+        names: list[str] = typer.Option(None, "--volume", "-v", help="Only seed or refresh this volume."),
+):
+    """Manage the named volumes holding the project's dependencies and caches."""
+    project_volumes = ProjectVolumes(os.getcwd())
+    overlays = project_volumes.get_overlays()
+    if not overlays:
+        CliOutput.info("This project's docker-compose.yml doesn't use any named volumes.")
+        return
+    if action not in ['list', 'seed', 'refresh', 'clean']:
+        CliOutput.error(f"Unknown action {action}. Use list, seed, refresh, or clean.")
+    if not DockerHelpers.is_docker_running():
+        CliOutput.error("Docker isn't running.")
+
+    if action == 'clean':
+        if DockerHelpers.is_composition_running():
+            CliOutput.error("Stop the project first (`anydev project down`); its containers are using the volumes.")
+        try:
+            removed = project_volumes.remove()
+        except RuntimeError as e:
+            CliOutput.error(f"Could not remove volumes: {e}")
+        CliOutput.success(f"Removed {len(removed)} volume(s)." if removed else "No volumes to remove.")
+        return
+
+    if action in ['seed', 'refresh']:
+        for overlay, outcome in project_volumes.seed(refresh=action == 'refresh', volumes=names):
+            source = os.path.relpath(overlay['host_path'], os.getcwd())
+            if outcome in ['seeded', 'refreshed']:
+                CliOutput.success(f"{overlay['volume']}: {outcome} from {source}.")
+            elif outcome == 'kept':
+                CliOutput.info(f"{overlay['volume']}: already has contents (use refresh to replace them).")
+            elif outcome == 'no source':
+                CliOutput.info(f"{overlay['volume']}: nothing in {source} to copy; it's installed in the container.")
+            else:
+                CliOutput.warning(f"{overlay['volume']}: {outcome}")
+
+    sizes = project_volumes.get_sizes(overlays)
+    table = Table(title="Project Volumes")
+    table.add_column("Volume", justify="left", style="cyan", no_wrap=True)
+    table.add_column("Mounted At", justify="left")
+    table.add_column("Hides", justify="left")
+    table.add_column("Size", justify="right", style="green")
+    for overlay in overlays:
+        size = sizes.get(overlay['docker_volume'])
+        table.add_row(
+            overlay['volume'],
+            f"{overlay['service']}:{overlay['target']}",
+            os.path.relpath(overlay['host_path'], os.getcwd()) + ('' if overlay['seed'] else ' (not seeded)')
+            if overlay['host_path'] else '-',
+            ResourceStats.format_bytes(size) if size is not None else "[dim]not created[/dim]"
+        )
+    Console().print(table)
+
+
+@cmd.command('rm | remove')
+def remove(
+        name: str = typer.Argument(
+            ...,
+            help="The registered project to remove.",
+            shell_complete=ProjectHelpers.complete_project_name
+        ),
+        keep_volumes: bool = typer.Option(False, "--keep-volumes", help="Keep its dependency and cache volumes."),
+):
+    """Remove a project's containers and volumes, and forget it. Its files are left in place."""
+    config = Configuration()
+    project = config.get_registry().get(name)
+    if project is None:
+        CliOutput.error(f"No registered project named {name}.")
+
+    if os.path.isdir(project['path']) and DockerHelpers.is_docker_running():
+        down_cmd = ['docker', 'compose', '--profile', '*', 'down', '--remove-orphans']
+        result = subprocess.run(down_cmd + ([] if keep_volumes else ['--volumes']), cwd=project['path'])
+        if result.returncode != 0:
+            CliOutput.error(f"Could not remove {name}'s containers.", True, result.returncode)
+        if not keep_volumes:
+            # Volumes that were seeded but never mounted aren't known to `down`
+            try:
+                ProjectVolumes(project['path']).remove()
+            except RuntimeError as e:
+                CliOutput.warning(f"Could not remove all of {name}'s volumes: {e}")
+    else:
+        CliOutput.warning(f"Skipped removing {name}'s containers (Docker isn't running or {project['path']} is gone).")
+    config.unregister_project(name)
+
+
+@cmd.command('te | test')
+@ProjectHelpers.validate_project
+def test(
+        shards: int = typer.Option(min(4, os.cpu_count() or 1), "--shards", "-n", help="Number of parallel shards."),
+        command: str = typer.Option(None, "--command", "-c", help="Test runner command, with {files} and {junit} "
+                                                                  "placeholders. Defaults to the template's runner."),
+        patterns: list[str] = typer.Option(None, "--pattern", "-p", help="Test file name pattern (e.g. *Test.php)."),
+        database: str = typer.Option("auto", "--database", "-d", help="Database to copy per shard: auto, mysql, "
+                                                                      "postgres, or none."),
+        keep_databases: bool = typer.Option(False, "--keep-databases", help="Keep the shards' databases afterwards."),
+        dry_run: bool = typer.Option(False, "--dry-run", help="Only show how tests would be split."),
+):
+    """Run the test suite in parallel shards, each with its own copy of the database."""
+    try:
+        test_shards = TestShards(os.getcwd(), shards, command, patterns, database)
+    except ValueError as e:
+        CliOutput.error(str(e))
+    if not test_shards.command:
+        CliOutput.error("No default test runner for this template. Pass --command and --pattern.")
+    files = test_shards.discover()
+    if not files:
+        CliOutput.error(f"No test files matching {', '.join(test_shards.patterns) or '(no patterns)'} in src/.")
+    assignment = test_shards.assign(files)
+
+    table = Table(title=f"{len(files)} Test Files in {len(assignment)} Shards")
+    table.add_column("Shard", justify="right", style="cyan")
+    table.add_column("Files", justify="right")
+    table.add_column("Estimate", justify="right", style="magenta")
+    table.add_column("Database", justify="left")
+    for index, shard in enumerate(assignment):
+        table.add_row(str(index + 1), str(len(shard['files'])), f"{shard['estimate']:.1f}s",
+                      test_shards.get_shard_database(index) if test_shards.database else '-')
+    Console().print(table)
+    if dry_run:
+        return
+
+    try:
+        CliOutput.info(f"Copying {test_shards.database_name} for each shard..." if test_shards.database
+                       else "No database to copy; shards share the project's services.")
+        databases = test_shards.prepare_databases(len(assignment))
+    except RuntimeError as e:
+        CliOutput.error(f"Could not copy the database: {e}")
+
+    def progress(number: int, result: dict) -> None:
+        outcome = "[green]passed[/green]" if result['exit_code'] == 0 else f"[red]exit code {result['exit_code']}[/red]"
+        Console().print(f"Shard {number}: {outcome} in {result['seconds']:.1f}s "
+                        f"(estimated {result['estimate']:.1f}s, log: {os.path.relpath(result['log'])})")
+
+    started = time.monotonic()
+    try:
+        results = test_shards.run(assignment, databases, progress)
+    except (RuntimeError, DockerEngineError) as e:
+        CliOutput.error(str(e))
+    finally:
+        if test_shards.database and not keep_databases:
+            try:
+                test_shards.drop_databases(len(assignment))
+            except RuntimeError as e:
+                CliOutput.warning(f"Could not drop the shards' databases: {e}")
+    wall_time = time.monotonic() - started
+
+    totals = test_shards.merge_reports(results)
+    serial_time = sum(result['seconds'] for result in results)
+    CliOutput.info(
+        f"{totals['tests']} tests, {totals['failures']} failures, {totals['errors']} errors, {totals['skipped']} "
+        f"skipped in {wall_time:.1f}s ({serial_time:.1f}s of shard time). Merged report: reports/junit.xml"
+    )
+    if totals['missing']:
+        CliOutput.warning(f"{totals['missing']} shard(s) didn't write a JUnit report; see their logs.")
+    failed = [result for result in results if result['exit_code'] != 0]
+    if failed:
+        CliOutput.error(f"{len(failed)} of {len(results)} shard(s) failed.")
+    CliOutput.success("All shards passed.")
+
+
+@cmd.command('al | analyze-logs')
+@ProjectHelpers.validate_project
+def analyze_logs(
+        log_files: list[str] = typer.Argument(None, help="Access logs to read (plain or .gz). Defaults to "
+                                                         "reports/access.log."),
+        since: float = typer.Option(None, "--since", "-s", help="Only count requests from the last N minutes."),
+        sort: str = typer.Option("total", "--sort", help="Rank by total (time spent), count, p50, p95, p99, max, "
+                                                         "or bytes."),
+        top: int = typer.Option(20, "--top", "-n", help="Number of endpoints to list."),
+        min_count: int = typer.Option(1, "--min-count", help="Leave out endpoints with fewer requests."),
+):
+    """Show request counts, latency percentiles, and bytes per endpoint from the Apache access log."""
+    if sort not in ['total', 'count', 'p50', 'p95', 'p99', 'max', 'bytes']:
+        CliOutput.error(f"Cannot sort by {sort}. Use total, count, p50, p95, p99, max, or bytes.")
+    log_files = log_files or [os.path.join('reports', 'access.log')]
+    analyzer = AccessLogAnalyzer(since)
+    for log_file in log_files:
+        try:
+            analyzer.parse_file(log_file)
+        except OSError as e:
+            CliOutput.error(f"Unable to read {log_file}: {e}")
+
+    if not analyzer.total_requests:
+        CliOutput.info(f"No timed requests in {', '.join(log_files)}"
+                       + (f" from the last {since:g} minutes." if since else "."))
+        if analyzer.stats['untimed']:
+            CliOutput.info("The log has no request durations. Log with the anydev_timing format (see the "
+                           "apache-php template's app.conf) and restart the project.")
+        return
+
+    span = analyzer.get_span()
+    table = Table(title=f"Endpoints ({analyzer.total_requests} requests"
+                        + (f" over {span / 60:.1f} minutes)" if span else ")"))
+    table.add_column("Endpoint", justify="left", style="cyan", overflow="fold", ratio=1)
+    table.add_column("Requests", justify="right")
+    table.add_column("p50", justify="right", style="magenta")
+    table.add_column("p95", justify="right", style="magenta")
+    table.add_column("p99", justify="right", style="magenta")
+    table.add_column("Max", justify="right", style="red")
+    table.add_column("Avg Size", justify="right")
+    table.add_column("Total Size", justify="right", style="green")
+    table.add_column("5xx", justify="right", style="red")
+    for row in analyzer.report(sort, top, min_count):
+        table.add_row(
+            row['endpoint'],
+            str(row['count']),
+            TraefikMetrics.format_latency(row['p50']),
+            TraefikMetrics.format_latency(row['p95']),
+            TraefikMetrics.format_latency(row['p99']),
+            TraefikMetrics.format_latency(row['max']),
+            ResourceStats.format_bytes(row['bytes'] / row['count']),
+            ResourceStats.format_bytes(row['bytes']),
+            str(row['errors']) if row['errors'] else '-'
+        )
+    Console().print(table)
+    if analyzer.stats['untimed']:
+        CliOutput.info(f"Skipped {analyzer.stats['untimed']} line(s) without a request duration.")
+
+
+@cmd.command('op | opcache-preload')
+@ProjectHelpers.validate_project
+def opcache_preload(
+        from_profiles: bool = typer.Option(False, "--from-profiles", "-p", help="Preload the files seen in Xdebug "
+                                                                                "profiles instead of everything "
+                                                                                "Composer autoloads."),
+        profile_dir: str = typer.Option(OpcachePreload.PROFILE_DIR, "--profile-dir", help="Where Xdebug writes "
+                                                                                         "profiles in the container."),
+        limit: int = typer.Option(None, "--limit", "-l", help="Preload only this many of the most used profiled "
+                                                              "files."),
+        measure: bool = typer.Option(False, "--measure", "-m", help="Time cold and warm requests with OPcache alone "
+                                                                    "and with preloading."),
+        url: str = typer.Option(None, "--url", help="The page to time. Defaults to the project's home page."),
+        requests: int = typer.Option(20, "--requests", "-n", help="Warm requests to time in each mode."),
+        disable: bool = typer.Option(False, "--disable", help="Stop preloading and turn OPcache back off."),
+):
+    """Generate an OPcache preload script for the project, and turn on OPcache with it."""
+    try:
+        preload = OpcachePreload(os.getcwd())
+    except ValueError as e:
+        CliOutput.error(str(e))
+
+    if disable:
+        preload.disable()
+        if DockerHelpers.is_composition_running():
+            preload.restart()
+        CliOutput.success("OPcache preloading is off.")
+        return
+
+    if not DockerHelpers.is_composition_running():
+        CliOutput.error("The project isn't running. Start it with `anydev project start` first.")
+    try:
+        if from_profiles:
+            files = preload.order_files(preload.find_profiled_files(profile_dir, limit))
+        else:
+            files = preload.order_files()
+        if not files:
+            CliOutput.error("Nothing to preload: no Composer autoloader in vendor/. For projects without one "
+                            "(e.g. WordPress), profile some requests and use --from-profiles.")
+        CliOutput.info(f"Test-loading {len(files)} file(s)...")
+        files, skipped = preload.generate(files)
+    except RuntimeError as e:
+        CliOutput.error(str(e))
+
+    for file in skipped[:10]:
+        CliOutput.warning(f"Skipped {file}: PHP can't preload it.")
+    if len(skipped) > 10:
+        CliOutput.warning(f"...and {len(skipped) - 10} more.")
+    CliOutput.success(f"Wrote reports/{OpcachePreload.SCRIPT_NAME} with {len(files)} file(s).")
+
+    if measure:
+        url = url or f"https://{ProjectHelpers.get_project_hostname()}/"
+        CliOutput.info(f"Timing {url}, restarting the project for each mode...")
+        try:
+            results = preload.measure(url, requests)
+        except RuntimeError as e:
+            CliOutput.error(str(e))
+        table = Table(title=f"Request latency ({requests} warm requests per mode)")
+        table.add_column("Mode", justify="left", style="cyan")
+        table.add_column("Cold (first request)", justify="right", style="magenta")
+        table.add_column("Warm (median)", justify="right", style="green")
+        for mode, result in results.items():
+            table.add_row(mode, TraefikMetrics.format_latency(result['cold']),
+                          TraefikMetrics.format_latency(result['warm']))
+        Console().print(table)
+    else:
+        preload.enable()
+        preload.restart()
+    CliOutput.success("OPcache is on, with preloading, in server/php.local.ini.")
+    CliOutput.info("Preloaded files aren't re-read when they change: restart the project after editing them, and "
+                   "rerun this after updating dependencies.")
+
+
 @cmd.command('b | bash', hidden=True)
 def bash():
     terminal(shell_command="/bin/bash")
@@ -79,7 +640,24 @@ def bash():
 
 @cmd.command('v | view')
 @cmd.command('browser', hidden=True)
+def browser(
+        name: str = typer.Argument(
+            None,
+            help="A registered project to open. Defaults to the current project.",
+            shell_complete=ProjectHelpers.complete_project_name
+        ),
+):
+    """Open a project's site in your browser."""
+    if name:
+        project = Configuration().get_registry().get(name)
+        if project is None:
+            CliOutput.error(f"No registered project named {name}.")
+        ProjectHelpers.view_site(project['path'])
+        return
+    view_current_site()
+
+
 @ProjectHelpers.validate_project
-def browser():
+def view_current_site():
     ProjectHelpers.view_site()
 
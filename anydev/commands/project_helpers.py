@@ -1,11 +1,14 @@
+import datetime
 import os
 import re
 import subprocess
+import sys
 import webbrowser
 
 from anydev.configuration import Configuration
 from anydev.core.cli_output import CliOutput
 from anydev.core.docker_controls import DockerHelpers
+from anydev.core.docker_engine import DockerEngine, DockerEngineError
 from dotenv import load_dotenv, dotenv_values
 from functools import wraps
 from rich.console import Console
@@ -67,18 +70,18 @@ class ProjectHelpers:
         def wrapper(*args, **kwargs):
             # Execute is_project before the function
             if ProjectHelpers.is_project():
-                config = Configuration()
+                registry = Configuration().get_registry()
                 project_details = ProjectHelpers.get_project_details()
-                known_projects = config.get_registered_projects()
-                if project_details["name"] not in known_projects:
+                if registry.get(project_details["name"]) is None:
                     # Project isn't registered yet. So remember it.
-                    config.add_project(
+                    registry.add(
                         project_details["name"],
                         project_details["path"],
                         project_details["template"]
                     )
-                    config.save()
                     CliOutput.success(f"Project '{project_details['name']}' registered successfully.")
+                else:
+                    registry.touch(project_details["name"])
 
                 return f(*args, **kwargs)
             else:
@@ -103,13 +106,85 @@ class ProjectHelpers:
 
         return project_details
 
+    @staticmethod
+    def get_project_hostname(path: str = '.') -> None or str:
+        """
+        Gets the full hostname (e.g. foo.site.test) a project is served on.
+
+        Args:
+            path (str): The path to the project directory.
+
+        Returns:
+            str: The hostname, or None if the project doesn't define a HOSTNAME.
+        """
+        for filename in ['.env', '.env.example']:
+            env_file = os.path.join(path, filename)
+            if os.path.isfile(env_file):
+                hostname = dotenv_values(env_file).get('HOSTNAME')
+                if hostname:
+                    return f"{hostname}.site.test"
+        return None
+
+    @staticmethod
+    def complete_project_name(ctx, param, incomplete: str) -> list:
+        """Shell completion for registered project names (answered from the completion cache when it's fresh)."""
+        from click.shell_completion import CompletionItem
+        return [
+            CompletionItem(name, help=details.get('path'))
+            for name, details in Configuration().get_registered_projects().items() if name.startswith(incomplete)
+        ]
+
     @staticmethod
     def open_shell(shell_command: str) -> None:
         """Open shell for the current project container."""
-        proc_command = ['docker', 'compose', 'exec', 'app', shell_command]
-        result = subprocess.run(proc_command)
-        if result.returncode != 0:
-            CliOutput.error('Command failed: ' + ' '.join(proc_command), True)
+        try:
+            exit_code = ProjectHelpers.run_in_container([shell_command], tty=sys.stdin.isatty(), stdin=True)
+        except DockerEngineError:
+            # No usable engine socket (e.g. a remote DOCKER_HOST); let Compose handle it
+            proc_command = ['docker', 'compose', 'exec', 'app', shell_command]
+            exit_code = subprocess.run(proc_command).returncode
+        if exit_code not in [0, None]:
+            CliOutput.error(f"Command failed: {shell_command}", True, exit_code)
+
+    @staticmethod
+    def run_in_container(command: list, service: str = None, workdir: str = None, tty: bool = False,
+                         stdin: bool = False, engine: DockerEngine = None) -> int:
+        """
+        Runs a command in the current project's container through the Docker Engine API.
+
+        The container ID is cached per project, so repeated calls skip container lookup entirely. A stale ID (e.g.
+        after the project was recreated) is detected and resolved again once.
+
+        Args:
+            command (list): The command and its arguments.
+            service (str): Compose service to run in. Defaults to the project's main container.
+            workdir (str): Working directory inside the container.
+            tty (bool): Allocate a TTY.
+            stdin (bool): Forward stdin to the command.
+            engine (DockerEngine): Engine client to reuse (e.g. across a batch of commands).
+
+        Returns:
+            int: The command's exit code.
+
+        Raises:
+            DockerEngineError: If the engine can't be reached.
+        """
+        engine = engine or DockerEngine()
+        path = os.getcwd()
+        hostname = ProjectHelpers.get_project_hostname(path)
+
+        for refresh in [False, True]:
+            container_id = engine.get_cached_container(path, service, hostname, refresh=refresh)
+            if not container_id:
+                CliOutput.error('The project is not currently running.', True)
+            try:
+                exec_id = engine.exec_create(container_id, command, tty=tty, stdin=stdin, workdir=workdir)
+            except DockerEngineError as e:
+                # 404: container is gone, 409: container isn't running
+                if e.status in [404, 409] and not refresh:
+                    continue
+                CliOutput.error(str(e), True)
+            return engine.exec_start(exec_id, tty=tty, stdin=stdin)
 
     @staticmethod
     def sanitize_folder_name(folder_name: str) -> str:
@@ -164,45 +239,59 @@ class ProjectHelpers:
             CliOutput.error('The project is not currently running.', True)
 
     @staticmethod
-    def list_projects() -> None:
+    def list_projects(template: str = None, status: str = None, sort: str = 'name',
+                      descending: bool = False) -> None:
+        """
+        Prints registered projects, optionally filtered and sorted, removing any that are no longer valid.
+
+        Args:
+            template (str): Only show projects using this template.
+            status (str): Only show projects with this last known status.
+            sort (str): Column to sort by (name, path, template, last_used, or status).
+            descending (bool): Sort in descending order.
+        """
         table = Table(title="AnyDev Projects")
 
         table.add_column("Project", justify="left", style="cyan", no_wrap=True)
         table.add_column("Template", justify="left", style="magenta")
+        table.add_column("Status", justify="left")
+        table.add_column("Last Used", justify="left")
         table.add_column("Path", justify="left", style="green")
 
-        projects = Configuration().get_registered_projects()
+        registry = Configuration().get_registry()
+        projects = registry.all(template=template, status=status, sort=sort, descending=descending)
 
         # Remove any project whose path doesn't validate
         projects_to_remove = []
 
         # Process and validate registered projects
-        for name, details in projects.items():
-            path = details.get('path', 'Unknown')
-            template = details.get('template', 'Unknown')
+        for project in projects:
+            name = project['name']
+            path = project.get('path') or 'Unknown'
             if ProjectHelpers.is_project(path):
-                table.add_row(name, template, path)
+                last_used = datetime.datetime.fromtimestamp(project['last_used']).strftime('%Y-%m-%d %H:%M') \
+                    if project.get('last_used') else '-'
+                table.add_row(name, project.get('template') or 'Unknown', project.get('status') or '-', last_used,
+                              path)
             else:
                 projects_to_remove.append(name)
                 CliOutput.alert(f"Project {name} is no longer valid. Removing it from tracked projects.")
 
         # TODO: Make project validation optional?
-        # Remove invalid projects from the configuration
-        config = Configuration()
-        for project_name in projects_to_remove:
-            config.unregister_project(project_name)
-        config.save()
+        # Remove invalid projects from the registry in one batch
+        if projects_to_remove:
+            registry.remove_many(projects_to_remove)
 
         # Output the table
         console = Console()
         console.print(table)
 
     @staticmethod
-    def view_site() -> None:
-        """Open default browser to current project's .site.test URL."""
-        project_details = ProjectHelpers.get_project_details()
+    def view_site(path: str = None) -> None:
+        """Open default browser to a project's (by default, the current project's) .site.test URL."""
+        project_details = {'name': os.path.basename(path)} if path else ProjectHelpers.get_project_details()
         if 'name' in project_details:
-            project_name = project_details['name']
+            project_name = ProjectHelpers.get_project_hostname(path or '.') or project_details['name']
             url = f"https://{project_name}"
             CliOutput.info(f"Opening {url} in your default browser.")
             webbrowser.open(url)
@@ -1,8 +1,21 @@
+import os
 import typer
 
 from anydev.configuration import Configuration
+from anydev.core.cli_output import CliOutput
 from anydev.core.command_alias_group import CommandAliasGroup
+from anydev.core.compose_files import ComposeFiles
+from anydev.core.connection_poolers import ConnectionPoolers
 from anydev.core.docker_controls import DockerHelpers
+from anydev.core.docker_state import DockerState
+from anydev.core.ephemeral_databases import EphemeralDatabases
+from anydev.core.idle_scheduler import IdleScheduler
+from anydev.core.image_prefetch import ImagePrefetcher
+from anydev.core.service_snapshots import ServiceSnapshots
+from anydev.core.service_tuning import ServiceTuning
+from rich.console import Console
+from rich.progress import BarColumn, Progress, TextColumn, TimeElapsedColumn
+from rich.table import Table
 
 # Get config object
 config = Configuration()
@@ -16,16 +29,478 @@ cmd = typer.Typer(
 
 @cmd.command('r | restart')
 @cmd.command('u | up', hidden=True)
-def restart():
+def restart(
+        ephemeral: bool = typer.Option(False, "--ephemeral", "-e", help="Start fresh in-memory databases for tests "
+                                                                       "instead, alongside the persistent ones."),
+        databases: list[str] = typer.Option(None, "--database", "-db", help="With --ephemeral, the databases to "
+                                                                            "start. Defaults to the active ones."),
+):
     """Start or restart services."""
+    if ephemeral:
+        start_ephemeral(databases)
+        return
+    ConnectionPoolers().write_configs()
     DockerHelpers.restart_composition(
         config.cli_root_dir,
-        config.get_active_profiles()
+        config.get_active_profiles(),
+        config.get_service_compose_files()
     )
 
 @cmd.command('s | stop')
-@cmd.command('u | up', hidden=True)
-def restart():
+@cmd.command('d | down', hidden=True)
+def stop(
+        ephemeral: bool = typer.Option(False, "--ephemeral", "-e", help="Only stop the in-memory databases."),
+):
     """Stop the services."""
+    if ephemeral:
+        if EphemeralDatabases().stop().returncode != 0:
+            CliOutput.error("Failed to stop the ephemeral databases!")
+        return
     DockerHelpers.stop_composition(config.cli_root_dir)
 
+
+def start_ephemeral(databases: list = None) -> None:
+    """Starts empty in-memory instances of the chosen databases and prints where to reach them."""
+    if not DockerHelpers.is_docker_running():
+        CliOutput.error("Docker isn't running.")
+    ephemeral_databases = EphemeralDatabases()
+    try:
+        profiles = ephemeral_databases.get_profiles(databases)
+    except ValueError as e:
+        CliOutput.error(str(e))
+    if not profiles:
+        CliOutput.error(f"No database profile is active. Pass --database ({', '.join(EphemeralDatabases.DATABASES)}).")
+
+    CliOutput.info(f"Starting ephemeral {', '.join(profiles)}...")
+    if ephemeral_databases.start(profiles).returncode != 0:
+        CliOutput.error("Failed to start the ephemeral databases!")
+    for profile in profiles:
+        database = EphemeralDatabases.DATABASES[profile]
+        CliOutput.success(f"{profile}: 127.0.0.1:{database['ports'][1]} from the host, {database['containers'][1]} "
+                          f"from projects. Data is lost when it stops.")
+
+
+@cmd.command('cmp | compare', context_settings={"allow_extra_args": True, "ignore_unknown_options": True})
+def compare(
+        command: list[str] = typer.Argument(..., help="The test command, e.g. `anydev services compare -- "
+                                                      "vendor/bin/phpunit`. It runs in a shell with MYSQL_HOST and "
+                                                      "MYSQL_PORT (likewise POSTGRES_, MONGO_) set for each mode, "
+                                                      "and ANYDEV_MYSQL_HOST naming the container."),
+        repeat: int = typer.Option(3, "--repeat", "-n", help="Runs per mode."),
+        databases: list[str] = typer.Option(None, "--database", "-db", help="Databases to point the command at. "
+                                                                            "Defaults to the running ephemeral ones."),
+):
+    """Time a test command against the persistent and the ephemeral databases."""
+    if not DockerHelpers.is_docker_running():
+        CliOutput.error("Docker isn't running.")
+    ephemeral_databases = EphemeralDatabases()
+    running = ephemeral_databases.get_running()
+    try:
+        profiles = ephemeral_databases.get_profiles(databases) if databases else running
+    except ValueError as e:
+        CliOutput.error(str(e))
+    missing = [profile for profile in profiles if profile not in running]
+    if not profiles or missing:
+        CliOutput.error(f"Start the ephemeral databases first: `anydev services up --ephemeral`"
+                        + (f" --database {' --database '.join(missing)}" if missing else ''))
+
+    def progress(mode: str, run: int, seconds: float, exit_code: int) -> None:
+        outcome = "ok" if exit_code == 0 else f"exit code {exit_code}"
+        CliOutput.info(f"{mode} run {run}/{repeat}: {seconds:.2f}s ({outcome})")
+
+    results = ephemeral_databases.compare(' '.join(command), profiles, max(1, repeat), progress)
+
+    table = Table(title=f"Test Run Time ({', '.join(profiles)})")
+    table.add_column("Mode", justify="left", style="cyan")
+    table.add_column("Median", justify="right", style="green")
+    table.add_column("Fastest", justify="right")
+    table.add_column("Failed Runs", justify="right", style="red")
+    for mode, result in results.items():
+        table.add_row(mode, f"{result['median']:.2f}s", f"{result['min']:.2f}s",
+                      f"{result['failures']}/{len(result['times'])}")
+    Console().print(table)
+
+    speedup = results['persistent']['median'] / max(results['ephemeral']['median'], 1e-9)
+    CliOutput.info(f"The ephemeral databases ran the command {speedup:.2f}x as fast.")
+    if results['persistent']['failures'] != results['ephemeral']['failures']:
+        CliOutput.warning("The modes failed a different number of runs; the suite may depend on persisted data.")
+
+
+@cmd.command('st | status')
+@cmd.command('ps', hidden=True)
+def status():
+    """Show the state of each shared service."""
+    compose = ComposeFiles.load(os.path.join(config.cli_root_dir, 'docker-compose.yml'))
+    containers = {container.get('Names'): container for container in DockerState.get_containers()}
+    active_profiles = set(config.get_active_profiles())
+
+    table = Table(title="AnyDev Services")
+    table.add_column("Service", justify="left", style="cyan", no_wrap=True)
+    table.add_column("Profile", justify="left", style="magenta")
+    table.add_column("State", justify="left")
+    table.add_column("Status", justify="left")
+    table.add_column("Image", justify="left", style="green")
+
+    for name, service in (compose.get('services') or {}).items():
+        profiles = service.get('profiles') or []
+        enabled = not profiles or bool(active_profiles.intersection(profiles))
+        container = containers.get(service.get('container_name', ''), {})
+        state = container.get('State', 'not created')
+        if state == 'running':
+            state = f"[green]{state}[/green]"
+        elif enabled:
+            state = f"[red]{state}[/red]"
+        table.add_row(
+            name,
+            ', '.join(profiles) if profiles else 'required',
+            state if enabled or container else '[dim]disabled[/dim]',
+            container.get('Status', '-'),
+            service.get('image', '-')
+        )
+    Console().print(table)
+
+
+@cmd.command('p | prefetch')
+@cmd.command('pull', hidden=True)
+def prefetch(
+        jobs: int = typer.Option(4, "--jobs", "-j", help="Number of images to pull at the same time."),
+        force: bool = typer.Option(False, "--force", "-f", help="Pull images even if they're already present."),
+        mirror: bool = typer.Option(
+            None,
+            "--mirror/--no-mirror",
+            help="Pull Docker Hub images through the local registry mirror. Defaults to on when the "
+                 "registry-mirror profile is active."
+        ),
+        dry_run: bool = typer.Option(False, "--dry-run", help="Only list the images that would be pulled."),
+):
+    """Pull the images used by active services and registered projects, in parallel."""
+    if not DockerHelpers.is_docker_running():
+        CliOutput.error("Docker isn't running.")
+    if mirror is None:
+        mirror = 'registry-mirror' in config.get_active_profiles()
+    if mirror and not DockerHelpers.is_service_running('registry-mirror', config.cli_root_dir):
+        CliOutput.warning("The registry mirror isn't running. Enable the registry-mirror profile and restart "
+                          "services to use it. Pulling directly instead.")
+        mirror = False
+
+    prefetcher = ImagePrefetcher(jobs=jobs, force=force, mirror=mirror)
+    images = prefetcher.resolve_images()
+    missing = prefetcher.missing_images(list(images))
+
+    table = Table(title="Images")
+    table.add_column("Image", justify="left", style="cyan", no_wrap=True)
+    table.add_column("Used By", justify="left", style="magenta")
+    table.add_column("Status", justify="left")
+    for image, sources in images.items():
+        table.add_row(image, ', '.join(sources), "[yellow]pull[/yellow]" if image in missing else "[green]present[/green]")
+    Console().print(table)
+
+    if not missing or dry_run:
+        CliOutput.info(f"{len(missing)} of {len(images)} image(s) need pulling.")
+        return
+
+    with Progress(
+            TextColumn("[cyan]{task.fields[image]}"),
+            BarColumn(),
+            TextColumn("{task.completed}/{task.total} layers"),
+            TextColumn("{task.fields[status]}"),
+            TimeElapsedColumn(),
+    ) as progress_display:
+        tasks = {image: progress_display.add_task("", total=None, image=image, status="waiting") for image in missing}
+
+        def on_progress(image: str, done: int, total: int, status: str) -> None:
+            progress_display.update(tasks[image], completed=done, total=total or None, status=status)
+
+        results = prefetcher.prefetch(missing, on_progress)
+
+    failed = {image: error for image, error in results.items() if error}
+    for image, error in failed.items():
+        CliOutput.warning(f"{image}: {error}")
+    if failed:
+        CliOutput.error(f"Pulled {len(missing) - len(failed)} of {len(missing)} image(s).")
+    CliOutput.success(f"Pulled {len(missing)} image(s){' through the mirror' if mirror else ''}.")
+
+
+@cmd.command('t | tune')
+def tune(
+        budget: int = typer.Option(None, "--budget", "-b", help="Memory (MB) to share between tuned services."),
+        off: bool = typer.Option(False, "--off", help="Remove the tuning and go back to stock settings."),
+        show: bool = typer.Option(False, "--show", help="Only show the settings that would be used."),
+        benchmark: bool = typer.Option(False, "--benchmark", help="Benchmark the services before and after tuning."),
+):
+    """Tune MySQL, Postgres, Redis and Memcached for this machine."""
+    tuning = ServiceTuning()
+    services = tuning.get_tunable_services()
+
+    if off:
+        tuning.disable()
+        config.save()
+        DockerHelpers.restart_composition(config.cli_root_dir, config.get_active_profiles(),
+                                          config.get_service_compose_files())
+        return
+
+    if not services:
+        CliOutput.error("None of the active profiles have tunable services (mysql, postgres, redis, memcached).")
+
+    if show:
+        resources = tuning.get_host_resources()
+        budget = budget or config.get_tuning_settings()['budget_mb'] \
+            or int(resources['memory_mb'] * ServiceTuning.AUTO_BUDGET)
+        print_tuning_plans(tuning.plan(budget, resources, services), resources, budget)
+        return
+
+    if benchmark:
+        if not DockerHelpers.is_docker_running():
+            CliOutput.error("Docker isn't running.")
+        CliOutput.info("Benchmarking current settings...")
+        tuning.wait_until_ready(services)
+        tuning.save_benchmark('baseline', tuning.benchmark(services))
+
+    plans = tuning.apply(budget)
+    resources = tuning.get_host_resources()
+    print_tuning_plans(plans, resources, config.get_tuning_settings()['budget_mb'])
+    config.save()
+    DockerHelpers.restart_composition(config.cli_root_dir, config.get_active_profiles(),
+                                      config.get_service_compose_files())
+
+    if benchmark:
+        not_ready = tuning.wait_until_ready(services)
+        if not_ready:
+            CliOutput.warning(f"Not ready after restart: {', '.join(not_ready)}. Check `docker logs`.")
+        CliOutput.info("Benchmarking tuned settings...")
+        tuning.save_benchmark('tuned', tuning.benchmark(services))
+        print_benchmark_comparison(tuning.load_benchmarks())
+
+
+def print_tuning_plans(plans: dict, resources: dict, budget_mb: int) -> None:
+    """Prints the settings chosen for each service."""
+    table = Table(title=f"Service Tuning ({budget_mb} MB of {resources['memory_mb']} MB, {resources['cpus']} CPUs)")
+    table.add_column("Service", justify="left", style="cyan", no_wrap=True)
+    table.add_column("Memory", justify="right", style="magenta")
+    table.add_column("Settings", justify="left")
+    for service, plan in plans.items():
+        settings = ', '.join(key if value is None else f"{key}={value}" for key, value in plan['settings'].items())
+        table.add_row(service, f"{plan['memory_mb']} MB", settings)
+    Console().print(table)
+
+
+def print_benchmark_comparison(benchmarks: dict) -> None:
+    """Prints baseline vs. tuned benchmark results."""
+    baseline = benchmarks.get('baseline', {}).get('results', {})
+    tuned = benchmarks.get('tuned', {}).get('results', {})
+
+    table = Table(title="Benchmarks")
+    table.add_column("Service", justify="left", style="cyan", no_wrap=True)
+    table.add_column("Benchmark", justify="left")
+    table.add_column("Before", justify="right")
+    table.add_column("After", justify="right")
+    table.add_column("Change", justify="right")
+    for service in sorted(set(baseline) | set(tuned)):
+        before, after = baseline.get(service, {}), tuned.get(service, {})
+        if 'value' not in before or 'value' not in after:
+            table.add_row(service, '-', before.get('error', '-'), after.get('error', '-'), '-')
+            continue
+        change = (after['value'] - before['value']) / before['value'] * 100 if before['value'] else 0
+        improved = change < 0 if after['lower_is_better'] else change > 0
+        table.add_row(
+            service,
+            after['metric'],
+            f"{before['value']:,.2f} {before['unit']}",
+            f"{after['value']:,.2f} {after['unit']}",
+            f"[{'green' if improved else 'red'}]{change:+.1f}%[/]"
+        )
+    Console().print(table)
+
+
+@cmd.command('po | poolers')
+@cmd.command('pool', hidden=True)
+def poolers():
+    """Show connection reuse and wait times for the PgBouncer and ProxySQL poolers."""
+    connection_poolers = ConnectionPoolers()
+    active = connection_poolers.get_active_poolers()
+    if not active:
+        CliOutput.error("No connection pooler is active. Enable the 'pgbouncer' or 'proxysql' profile with "
+                        "`anydev configure`.")
+
+    for pooler in active:
+        try:
+            if pooler == 'pgbouncer':
+                print_pgbouncer_stats(connection_poolers.get_pgbouncer_stats())
+            else:
+                print_proxysql_stats(connection_poolers.get_proxysql_stats())
+        except (RuntimeError, OSError) as e:
+            CliOutput.warning(f"Could not read {pooler} stats: {e}")
+
+
+def print_pgbouncer_stats(stats: dict) -> None:
+    """Prints PgBouncer's pools (current connections and waits) and per-database totals."""
+    pools = Table(title="PgBouncer Pools")
+    pools.add_column("Database", justify="left", style="cyan", no_wrap=True)
+    pools.add_column("User", justify="left")
+    pools.add_column("Clients Active", justify="right")
+    pools.add_column("Clients Waiting", justify="right", style="red")
+    pools.add_column("Servers Active", justify="right")
+    pools.add_column("Servers Idle", justify="right", style="green")
+    pools.add_column("Longest Wait", justify="right", style="magenta")
+    for row in stats['pools']:
+        if row.get('database') == 'pgbouncer':
+            continue
+        max_wait = int(row.get('maxwait', 0) or 0) + int(row.get('maxwait_us', 0) or 0) / 1_000_000
+        pools.add_row(row.get('database', '?'), row.get('user', '?'), row.get('cl_active', '0'),
+                      row.get('cl_waiting', '0'), row.get('sv_active', '0'), row.get('sv_idle', '0'),
+                      f"{max_wait * 1000:.1f} ms")
+    Console().print(pools)
+
+    totals = Table(title="PgBouncer Totals")
+    totals.add_column("Database", justify="left", style="cyan", no_wrap=True)
+    totals.add_column("Transactions", justify="right")
+    totals.add_column("Queries", justify="right")
+    totals.add_column("Server Assignments", justify="right", style="green")
+    totals.add_column("Avg Wait", justify="right", style="magenta")
+    totals.add_column("Total Wait", justify="right", style="magenta")
+    for row in stats['stats']:
+        if row.get('database') == 'pgbouncer':
+            continue
+        totals.add_row(
+            row.get('database', '?'),
+            row.get('total_xact_count', '-'),
+            row.get('total_query_count', '-'),
+            row.get('total_server_assignment_count', '-'),
+            f"{int(row.get('avg_wait_time', 0) or 0) / 1000:.2f} ms",
+            f"{int(row.get('total_wait_time', 0) or 0) / 1_000_000:.2f} s"
+        )
+    Console().print(totals)
+
+
+def print_proxysql_stats(stats: dict) -> None:
+    """Prints ProxySQL's backend pool and how often client connections reused pooled server connections."""
+    pools = Table(title="ProxySQL Backend Pool")
+    pools.add_column("Server", justify="left", style="cyan", no_wrap=True)
+    pools.add_column("Status", justify="left")
+    pools.add_column("In Use", justify="right")
+    pools.add_column("Free", justify="right", style="green")
+    pools.add_column("Opened", justify="right")
+    pools.add_column("Errors", justify="right", style="red")
+    pools.add_column("Queries", justify="right")
+    pools.add_column("Latency", justify="right", style="magenta")
+    for row in stats['pools']:
+        pools.add_row(f"{row.get('srv_host', '?')}:{row.get('srv_port', '?')}", row.get('status', '?'),
+                      row.get('ConnUsed', '0'), row.get('ConnFree', '0'), row.get('ConnOK', '0'),
+                      row.get('ConnERR', '0'), row.get('Queries', '0'),
+                      f"{int(row.get('Latency_us', 0) or 0) / 1000:.2f} ms")
+    Console().print(pools)
+
+    counters = {key: int(value or 0) for key, value in stats['global'].items()}
+    client_connections = counters.get('Client_Connections_created', 0)
+    server_connections = counters.get('Server_Connections_created', 0)
+    requests = counters.get('ConnPool_get_conn_success', 0) + counters.get('ConnPool_get_conn_failure', 0)
+    CliOutput.info(
+        f"Client connections: {client_connections}, server connections opened: {server_connections} "
+        f"({client_connections / server_connections if server_connections else 0:.1f} clients per server connection)."
+    )
+    if requests:
+        CliOutput.info(
+            f"Pooled connections handed out without waiting: "
+            f"{counters.get('ConnPool_get_conn_immediate', 0) / requests:.1%} of {requests}, "
+            f"failures: {counters.get('ConnPool_get_conn_failure', 0)}."
+        )
+
+
+@cmd.command('a | autosuspend')
+@cmd.command('idle', hidden=True)
+def autosuspend(
+        timeout: float = typer.Option(None, "--timeout", "-t", help="Minutes without requests before suspending."),
+        action: str = typer.Option(None, "--action", "-a", help="How to suspend idle projects: stop or pause."),
+        interval: float = typer.Option(None, "--interval", "-i", help="Seconds between idle checks."),
+):
+    """Suspend idle projects and wake them on their next request."""
+    if action and action not in ['stop', 'pause']:
+        CliOutput.error(f"Unsupported action: {action}")
+    IdleScheduler(timeout, action, interval).run()
+
+
+@cmd.command('snap | snapshot')
+def snapshot(
+        service: str = typer.Argument(..., help="Shared service to snapshot (e.g. mysql, postgres, mongo)."),
+        name: str = typer.Argument(..., help="Name for the snapshot (replaces an existing one)."),
+        jobs: int = typer.Option(None, "--jobs", "-j", help="Parallel workers. Defaults to the CPU count."),
+        no_reflink: bool = typer.Option(False, "--no-reflink", help="Always use the deduplicating chunk store."),
+):
+    """Capture a service's data directory as a named snapshot."""
+    try:
+        manifest = ServiceSnapshots(service, jobs, not no_reflink).snapshot(name)
+    except (ValueError, FileNotFoundError, OSError) as e:
+        CliOutput.error(str(e))
+
+    if manifest['mode'] == 'reflink':
+        CliOutput.success(f"Saved snapshot '{name}' of {service} as a reflink copy in {manifest['seconds']:.2f}s.")
+    else:
+        CliOutput.success(
+            f"Saved snapshot '{name}' of {service} in {manifest['seconds']:.2f}s: "
+            f"{manifest['files']} files ({manifest['files_reused']} unchanged), "
+            f"{manifest['logical_bytes'] / (1024 * 1024):.1f} MB logical, "
+            f"{manifest['bytes_written'] / (1024 * 1024):.1f} MB of new chunks."
+        )
+
+
+@cmd.command('rest | restore')
+def restore(
+        service: str = typer.Argument(..., help="Shared service to restore (e.g. mysql, postgres, mongo)."),
+        name: str = typer.Argument(..., help="Name of the snapshot to restore."),
+        jobs: int = typer.Option(None, "--jobs", "-j", help="Parallel workers. Defaults to the CPU count."),
+        force: bool = typer.Option(False, "--force", "-f", help="Don't ask for confirmation."),
+):
+    """Replace a service's data directory with a named snapshot."""
+    if not force and not typer.confirm(f"This will replace all {service} data with snapshot '{name}'. Continue?"):
+        CliOutput.alert("Restore cancelled.", True)
+
+    try:
+        manifest = ServiceSnapshots(service, jobs).restore(name)
+    except (ValueError, FileNotFoundError, RuntimeError, OSError) as e:
+        CliOutput.error(str(e))
+
+    if manifest['files_written'] is None:
+        CliOutput.success(f"Restored snapshot '{name}' of {service} in {manifest['seconds']:.2f}s.")
+    else:
+        CliOutput.success(
+            f"Restored snapshot '{name}' of {service} in {manifest['seconds']:.2f}s: "
+            f"{manifest['files_written']} file(s) rewritten, {manifest['bytes_written'] / (1024 * 1024):.1f} MB."
+        )
+
+
+@cmd.command('snaps | snapshots')
+def snapshots(
+        service: str = typer.Argument(..., help="Shared service to list snapshots for."),
+        delete: str = typer.Option(None, "--delete", "-d", help="Delete the named snapshot."),
+):
+    """List (or delete) a service's data directory snapshots."""
+    try:
+        service_snapshots = ServiceSnapshots(service)
+    except ValueError as e:
+        CliOutput.error(str(e))
+
+    if delete:
+        try:
+            reclaimed = service_snapshots.delete(delete)
+        except FileNotFoundError as e:
+            CliOutput.error(str(e))
+        CliOutput.success(f"Deleted snapshot '{delete}' and reclaimed {reclaimed / (1024 * 1024):.1f} MB.", True)
+
+    table = Table(title=f"Snapshots of {service}")
+    table.add_column("Name", justify="left", style="cyan", no_wrap=True)
+    table.add_column("Created", justify="left", style="magenta")
+    table.add_column("Mode", justify="left")
+    table.add_column("Logical (MB)", justify="right", style="green")
+    table.add_column("New Chunks (MB)", justify="right", style="green")
+
+    for manifest in service_snapshots.list_snapshots():
+        logical = manifest.get('logical_bytes')
+        table.add_row(
+            manifest['name'],
+            manifest['created'],
+            manifest['mode'],
+            f"{logical / (1024 * 1024):.1f}" if logical is not None else '-',
+            f"{manifest['bytes_written'] / (1024 * 1024):.1f}",
+        )
+
+    Console().print(table)
@@ -4,6 +4,7 @@ import shutil
 import yaml
 
 from anydev.core.cli_output import CliOutput
+from anydev.core.project_registry import ProjectRegistry
 
 
 class Configuration:
@@ -67,6 +68,10 @@ class Configuration:
         self.certs_dir = os.path.join(self.config_dir, 'certs')
         # Persistent configuration data
         self.config_file = os.path.join(self.config_dir, 'config.yaml')
+        # Registry of known projects
+        self.registry_file = os.path.join(self.config_dir, 'projects.db')
+        # Generated compose override with host-specific service tuning
+        self.tuning_override_file = os.path.join(self.config_dir, 'tuning', 'docker-compose.tuning.yml')
 
         # Path to anydev's .env.example file
         self.cli_env_example = os.path.join(self.cli_root_dir, '.env.example')
@@ -75,6 +80,7 @@ class Configuration:
 
         self._os = None
         self._arch = None
+        self._registry = None
 
         self.get_os()
         self.get_architecture()
@@ -103,6 +109,10 @@ class Configuration:
             CliOutput.warning(f"Unable to parse config file at {self.config_file}: {error}!")
         return {}
 
+    def reload(self) -> None:
+        """Re-reads the config file (e.g. after it was changed by another process)."""
+        self._configs = self.load_configuration()
+
     def get_configs(self) -> dict:
         """Returns raw config data."""
         return self._configs
@@ -143,6 +153,11 @@ class Configuration:
             self._configs['organize_projects'] = False
         # self.save_configuration()
 
+    def get_discovery_roots(self) -> list:
+        """Gets extra directories (besides the projects directory) that `project add` scans for projects."""
+        return self._configs.get('discovery_roots', []) if self._configs \
+            else []
+
     def get_projects_organized(self) -> bool:
         """
         Checks whether project organization is enabled or disabled
@@ -153,9 +168,34 @@ class Configuration:
         return self._configs.get('organize_projects', True) if self._configs \
             else True
 
+    def get_registry(self) -> ProjectRegistry:
+        """
+        Gets the project registry, opening it (and migrating any projects from config.yaml) on first use.
+        """
+        if self._registry is None:
+            self._registry = ProjectRegistry(self.registry_file)
+            self._migrate_yaml_projects()
+        return self._registry
+
+    def _migrate_yaml_projects(self) -> None:
+        """
+        One-time move of the legacy `projects` map in config.yaml into the project registry.
+        """
+        if not self._configs or 'projects' not in self._configs:
+            return
+
+        legacy_projects = self._configs.get('projects') or {}
+        self._registry.add_many([
+            {'name': name, 'path': details.get('path'), 'template': details.get('template')}
+            for name, details in legacy_projects.items() if details and details.get('path')
+        ])
+        del self._configs['projects']
+        self.save()
+        CliOutput.info(f"Moved {len(legacy_projects)} project(s) from config.yaml into the project registry.")
+
     def add_project(self, name, path, template) -> None:
         """
-        Adds a new project to the configuration.
+        Adds a new project to the project registry.
 
         Args:
             name (str): The name of the project.
@@ -163,23 +203,125 @@ class Configuration:
             template (str): The template used for the project.
 
         """
-        if 'projects' not in self._configs:
-            self._configs['projects'] = {}
-        self._configs['projects'][name] = {}
-        self._configs['projects'][name]['path'] = path
-        self._configs['projects'][name]['template'] = template
-        self.save()
+        self.get_registry().add(name, path, template)
 
     def get_registered_projects(self) -> dict:
-        return self._configs.get('projects', {}) if self._configs \
-            else {}
+        """
+        Gets all registered projects, keyed by name.
+
+        Returns:
+            dict: name -> {'path', 'template', 'last_used', 'status'}
+        """
+        return {
+            project.pop('name'): project
+            for project in self.get_registry().all()
+        }
 
     def unregister_project(self, name) -> None:
-        if 'projects' in self._configs:
-            if name in self._configs['projects']:
-                del self._configs['projects'][name]
-                self.save()
-                CliOutput.success(f"Removed project {name} from settings.")
+        if self.get_registry().remove(name):
+            CliOutput.success(f"Removed project {name} from settings.")
+
+    def get_idle_settings(self) -> dict:
+        """
+        Gets the settings for suspending idle projects, filled in with defaults.
+
+        Returns:
+            dict: timeout_minutes, action ('stop' or 'pause'), and check_interval (seconds).
+        """
+        defaults = {
+            'timeout_minutes': 30,
+            'action':          'stop',
+            'check_interval':  60,
+        }
+        settings = self._configs.get('idle_suspend', {}) if self._configs \
+            else {}
+        return defaults | (settings or {})
+
+    def get_tuning_settings(self) -> dict:
+        """
+        Gets the settings for host-aware service tuning, filled in with defaults.
+
+        Returns:
+            dict: enabled (bool) and budget_mb (memory for the tuned services, or None for automatic).
+        """
+        defaults = {
+            'enabled':   False,
+            'budget_mb': None,
+        }
+        settings = self._configs.get('tuning', {}) if self._configs \
+            else {}
+        return defaults | (settings or {})
+
+    def set_tuning_settings(self, enabled: bool, budget_mb: int = None) -> None:
+        """Sets the host-aware service tuning settings."""
+        self._configs['tuning'] = {'enabled': enabled, 'budget_mb': budget_mb}
+
+    def get_groups(self) -> dict:
+        """
+        Gets the named project groups started together by `anydev up`.
+
+        Returns:
+            dict: name -> {'projects': [...], 'profiles': [...], 'concurrency': int}. Projects are registered project
+                  names, or mappings with a `name` and optional `depends_on` list and `ready_url`.
+        """
+        groups = self._configs.get('groups', {}) if self._configs \
+            else {}
+        return groups or {}
+
+    def get_pooler_settings(self) -> dict:
+        """
+        Gets the settings for the PgBouncer and ProxySQL connection poolers, filled in with defaults.
+
+        Returns:
+            dict: pool_mode (PgBouncer: session or transaction) and pool_size (server connections per pool).
+        """
+        defaults = {
+            'pool_mode': 'session',
+            'pool_size': 20,
+        }
+        settings = self._configs.get('poolers', {}) if self._configs \
+            else {}
+        return defaults | (settings or {})
+
+    def get_gc_settings(self) -> dict:
+        """
+        Gets the settings for reclaiming disk space with `anydev gc`, filled in with defaults.
+
+        Returns:
+            dict: budget (disk space AnyDev may use, e.g. '50GB', or None to only report) and protect_days (projects
+                  used this recently are never evicted).
+        """
+        defaults = {
+            'budget':       None,
+            'protect_days': 1,
+        }
+        settings = self._configs.get('gc', {}) if self._configs \
+            else {}
+        return defaults | (settings or {})
+
+    def get_pool_settings(self) -> dict:
+        """
+        Gets the settings for the warm pool of pre-started projects, filled in with defaults.
+
+        Returns:
+            dict: templates (the templates to keep slots of) and size (ready slots per template).
+        """
+        defaults = {
+            'templates': [],
+            'size':      1,
+        }
+        settings = self._configs.get('pool', {}) if self._configs \
+            else {}
+        return defaults | (settings or {})
+
+    def get_service_compose_files(self) -> list:
+        """
+        Gets the compose files for the shared services: docker-compose.yml, plus the tuning override when enabled.
+        """
+        compose_files = [os.path.join(self.cli_root_dir, 'docker-compose.yml')]
+        if self.get_tuning_settings()['enabled'] and os.path.isfile(self.tuning_override_file):
+            compose_files.append(self.tuning_override_file)
+        return compose_files
 
     def get_architecture(self) -> None or str:
         """
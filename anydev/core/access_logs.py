@@ -0,0 +1,144 @@
+import datetime
+import gzip
+import re
+
+from anydev.core.latency_histogram import LatencyHistogram
+
+
+class AccessLogAnalyzer:
+    """
+    Digests Apache access logs written in the apache-php template's anydev_timing format (combined, plus %D),
+    grouping requests by endpoint: the method and path with IDs collapsed, e.g. GET /orders/{id}/items.
+
+    Lines are streamed one at a time and each endpoint keeps a fixed-size latency histogram, so memory stays flat no
+    matter how large the log grows.
+    """
+
+    # Past this, new endpoints are counted together instead of individually
+    MAX_ENDPOINTS = 2000
+    OTHER = '(other endpoints)'
+
+    TIME_FORMAT = '%d/%b/%Y:%H:%M:%S %z'
+
+    _LINE_P = re.compile(r'^\S+ \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<target>\S+)[^"]*" '
+                         r'(?P<status>\d{3}) (?P<bytes>\d+|-) (?P<micros>\d+)')
+
+    # Path segments that identify a record rather than a route, most specific first
+    _SEGMENT_PATTERNS = [
+        (re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.I), '{uuid}'),
+        (re.compile(r'^\d+$'), '{id}'),
+        (re.compile(r'^[0-9a-f]{16,}$', re.I), '{hash}'),
+        (re.compile(r'^(?=.*\d)[\w-]{24,}$'), '{token}'),
+    ]
+
+    def __init__(self, since_minutes: float = None):
+        self.since = None
+        if since_minutes:
+            self.since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=since_minutes)
+        self.endpoints = {}
+        self.stats = {'lines': 0, 'untimed': 0, 'first': None, 'last': None}
+        self._first = self._last = None
+        # Neighbouring lines mostly share a timestamp, so the last one parsed is kept
+        self._parsed_time = (None, None)
+
+    @staticmethod
+    def route_pattern(target: str) -> str:
+        """Collapses a request target into its route: no query string, IDs and hashes replaced by placeholders."""
+        path = target.split('?', 1)[0].split('#', 1)[0] or '/'
+        segments = []
+        for segment in path.split('/'):
+            for pattern, placeholder in AccessLogAnalyzer._SEGMENT_PATTERNS:
+                if pattern.match(segment):
+                    segment = placeholder
+                    break
+            segments.append(segment)
+        return '/'.join(segments)
+
+    def parse_file(self, path: str) -> None:
+        """Streams a log file (optionally gzipped) into the digest."""
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', errors='replace') as lines:
+            self.parse(lines)
+
+    def parse(self, lines) -> None:
+        for line in lines:
+            self.stats['lines'] += 1
+            match = self._LINE_P.match(line)
+            if not match:
+                # e.g. lines written in the combined format, before the template logged durations
+                self.stats['untimed'] += 1
+                continue
+
+            # %t is when the request started, so lines aren't strictly in order (and rotated files come in any
+            # order): every line is checked against the window
+            timestamp = match.group('time')
+            logged_at = self._parse_time(timestamp)
+            if logged_at is None or (self.since and logged_at < self.since):
+                continue
+            if self._first is None or logged_at < self._first:
+                self._first, self.stats['first'] = logged_at, timestamp
+            if self._last is None or logged_at > self._last:
+                self._last, self.stats['last'] = logged_at, timestamp
+
+            self.add(match.group('method'), self.route_pattern(match.group('target')), int(match.group('status')),
+                     int(match.group('micros')) / 1_000_000,
+                     0 if match.group('bytes') == '-' else int(match.group('bytes')))
+
+    def _parse_time(self, timestamp: str) -> None or datetime.datetime:
+        if self._parsed_time[0] != timestamp:
+            try:
+                self._parsed_time = (timestamp, datetime.datetime.strptime(timestamp, self.TIME_FORMAT))
+            except ValueError:
+                return None
+        return self._parsed_time[1]
+
+    def add(self, method: str, route: str, status: int, seconds: float, size: int) -> None:
+        key = f"{method} {route}"
+        if key not in self.endpoints and len(self.endpoints) >= self.MAX_ENDPOINTS:
+            key = self.OTHER
+        endpoint = self.endpoints.get(key)
+        if endpoint is None:
+            endpoint = self.endpoints[key] = {'histogram': LatencyHistogram(), 'bytes': 0, 'errors': 0}
+        endpoint['histogram'].record(seconds)
+        endpoint['bytes'] += size
+        if status >= 500:
+            endpoint['errors'] += 1
+
+    def report(self, sort: str = 'total', top: int = 20, min_count: int = 1) -> list:
+        """
+        Lists endpoints with their figures.
+
+        Args:
+            sort (str): count, total (time spent), p50, p95, p99, max, or bytes.
+            top (int): How many to list.
+            min_count (int): Leave out endpoints with fewer requests.
+
+        Returns:
+            list: Dicts with endpoint, count, total, mean, p50, p95, p99, max, bytes, errors (5xx responses).
+        """
+        rows = []
+        for key, endpoint in self.endpoints.items():
+            histogram = endpoint['histogram']
+            if histogram.count < min_count:
+                continue
+            rows.append({
+                'endpoint': key,
+                'count':    histogram.count,
+                'total':    histogram.total,
+                'mean':     histogram.mean,
+                'max':      histogram.max,
+                'bytes':    endpoint['bytes'],
+                'errors':   endpoint['errors'],
+            } | {f"p{round(q * 100)}": histogram.quantile(q) for q in [0.5, 0.95, 0.99]})
+        rows.sort(key=lambda row: row[sort] or 0, reverse=True)
+        return rows[:top]
+
+    def get_span(self) -> None or float:
+        """Seconds between the first and last request counted."""
+        if self._first is None:
+            return None
+        return (self._last - self._first).total_seconds()
+
+    @property
+    def total_requests(self) -> int:
+        return sum(endpoint['histogram'].count for endpoint in self.endpoints.values())
@@ -0,0 +1,215 @@
+import os
+import re
+import shutil
+import time
+import yaml
+
+from anydev.configuration import Configuration
+from anydev.core.create_project import CreateProject
+from anydev.core.docker_controls import DockerHelpers
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import set_key
+
+
+class BulkProvisioner:
+    """
+    Creates many projects at once from a YAML manifest, without prompting.
+
+    The whole manifest is validated before anything is written, so a typo in the last entry doesn't leave half a
+    batch behind. Projects are then copied, configured and started in parallel with a bounded number of workers,
+    and registered in a single registry transaction.
+
+    Manifest format:
+
+        defaults:
+          template: apache-php
+          directory: ~/AnyDev Projects
+          start: true
+          env:
+            TAG_VERSION: "8.3"
+        projects:
+          - hostname: review-101
+          - hostname: api
+            template: python
+            folder: api.site.test
+            env:
+              DEBUG: "1"
+    """
+
+    HOSTNAME_P = re.compile(r'^[a-z0-9]([a-z0-9-]{0,61}[a-z0-9])?$')
+    PROJECT_KEYS = {'hostname', 'template', 'folder', 'directory', 'start', 'env'}
+
+    def __init__(self, manifest_file: str, concurrency: int = 4, start: bool = None):
+        self.config = Configuration()
+        self.manifest_file = manifest_file
+        self.concurrency = max(1, concurrency)
+        # Overrides every project's `start` setting when not None
+        self.start = start
+        self.projects = []
+
+    def validate(self) -> list:
+        """
+        Loads the manifest and resolves every project entry.
+
+        Returns:
+            list: Problems found. Empty if the manifest can be provisioned.
+        """
+        try:
+            with open(self.manifest_file, 'r') as f:
+                manifest = yaml.safe_load(f) or {}
+        except FileNotFoundError:
+            return [f"Manifest {self.manifest_file} not found."]
+        except yaml.YAMLError as e:
+            return [f"Manifest {self.manifest_file} is not valid YAML: {e}"]
+
+        if not isinstance(manifest, dict) or not isinstance(manifest.get('projects'), list):
+            return ["The manifest needs a 'projects' list."]
+        defaults = manifest.get('defaults') or {}
+        if not isinstance(defaults, dict):
+            return ["'defaults' must be a mapping."]
+
+        errors = []
+        hostnames = set()
+        paths = set()
+        registry = self.config.get_registry()
+        templates_dir = self.config.templates_dir
+
+        for index, entry in enumerate(manifest['projects'], start=1):
+            if not isinstance(entry, dict):
+                errors.append(f"Project #{index}: must be a mapping.")
+                continue
+            label = f"Project #{index} ({entry.get('hostname', '?')})"
+
+            unknown_keys = set(entry) - self.PROJECT_KEYS
+            if unknown_keys:
+                errors.append(f"{label}: unknown key(s) {', '.join(sorted(unknown_keys))}.")
+
+            hostname = str(entry.get('hostname', '')).strip()
+            if not self.HOSTNAME_P.match(hostname):
+                errors.append(f"{label}: '{hostname}' is not a valid simple hostname (e.g. foo, foo-bar).")
+            elif hostname in hostnames:
+                errors.append(f"{label}: hostname is used more than once.")
+            hostnames.add(hostname)
+
+            template = entry.get('template', defaults.get('template'))
+            if not template:
+                errors.append(f"{label}: no template given.")
+            elif not os.path.isdir(os.path.join(templates_dir, template)):
+                errors.append(f"{label}: template '{template}' not found in {templates_dir}.")
+
+            env = (defaults.get('env') or {}) | (entry.get('env') or {})
+            if not all(isinstance(value, (str, int, float, bool)) for value in env.values()):
+                errors.append(f"{label}: env values must be strings or numbers.")
+
+            directory = entry.get('directory', defaults.get('directory')) or self.config.get_project_directory()
+            folder = CreateProject.sanitize_folder_name(str(entry.get('folder') or f"{hostname}.site.test"))
+            path = os.path.join(os.path.abspath(os.path.expanduser(directory)), folder)
+            if path in paths:
+                errors.append(f"{label}: {path} is used by another project in the manifest.")
+            elif os.path.exists(path) and (not os.path.isdir(path) or os.listdir(path)):
+                errors.append(f"{label}: {path} already exists and is not empty.")
+            paths.add(path)
+
+            name = f"{hostname}.site.test"
+            if registry.get(name):
+                errors.append(f"{label}: a project named {name} is already registered.")
+
+            start = entry.get('start', defaults.get('start', True)) if self.start is None else self.start
+            self.projects.append({
+                'name':     name,
+                'hostname': hostname,
+                'template': template,
+                'path':     path,
+                'env':      {key: self._env_value(value) for key, value in env.items()},
+                'start':    bool(start),
+            })
+
+        if not manifest['projects']:
+            errors.append("The manifest doesn't list any projects.")
+        if any(project['start'] for project in self.projects) and not DockerHelpers.is_docker_running():
+            errors.append("Docker isn't running, so the projects can't be started.")
+        return errors
+
+    def provision(self, progress=None) -> list:
+        """
+        Provisions every validated project in parallel.
+
+        Args:
+            progress (callable): Optional callback, called with each result as it completes.
+
+        Returns:
+            list: One result dict per project, with per-step timings in seconds and any error.
+        """
+        results = []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(self._provision_project, project) for project in self.projects]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if progress:
+                    progress(result)
+
+        # Everything that made it to disk gets registered, even if it failed to start
+        created = [
+            {
+                'name':     result['project']['name'],
+                'path':     result['project']['path'],
+                'template': result['project']['template'],
+                'status':   'running' if result['started'] else 'stopped',
+            }
+            for result in results if result['created']
+        ]
+        if created:
+            self.config.get_registry().add_many(created)
+
+        order = {project['name']: index for index, project in enumerate(self.projects)}
+        return sorted(results, key=lambda result: order[result['project']['name']])
+
+    def _provision_project(self, project: dict) -> dict:
+        """Copies, configures and (optionally) starts a single project."""
+        result = {'project': project, 'created': False, 'started': False, 'error': None, 'timings': {}}
+        started = time.monotonic()
+
+        try:
+            step = time.monotonic()
+            source = os.path.join(self.config.templates_dir, project['template'])
+            shutil.copytree(source, project['path'], dirs_exist_ok=True)
+            result['created'] = True
+            result['timings']['copy'] = time.monotonic() - step
+
+            step = time.monotonic()
+            self._render_env(project)
+            result['timings']['env'] = time.monotonic() - step
+
+            if project['start']:
+                step = time.monotonic()
+                process = DockerHelpers.start_composition(project['path'])
+                result['timings']['start'] = time.monotonic() - step
+                if process.returncode != 0:
+                    output = (process.stderr or process.stdout or '').strip().splitlines()
+                    result['error'] = output[-1] if output else f"docker compose exited with {process.returncode}"
+                else:
+                    result['started'] = True
+        except Exception as e:
+            result['error'] = str(e)
+
+        result['timings']['total'] = time.monotonic() - started
+        return result
+
+    @staticmethod
+    def _render_env(project: dict) -> None:
+        """Writes the AnyDev values and manifest overrides to .env.example, then copies it to .env."""
+        env_example_path = os.path.join(project['path'], '.env.example')
+        if not os.path.exists(env_example_path):
+            open(env_example_path, 'a').close()
+
+        values = CreateProject.get_env_values(project['hostname'], project['template']) | project['env']
+        for key, value in values.items():
+            set_key(env_example_path, key, value)
+        shutil.copy(env_example_path, os.path.join(project['path'], '.env'))
+
+    @staticmethod
+    def _env_value(value) -> str:
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        return str(value)
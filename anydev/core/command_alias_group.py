@@ -1,25 +1,59 @@
+import click
 import re
-import typer
 import typer.core
 
+from click.shell_completion import CompletionItem
+
 
 class CommandAliasGroup(typer.core.TyperGroup):
     """Typer Group subclass that enables command aliases.
     1. Add to typer instance with cls=CommandAliasGroup
     2. specify names like @main.command(name="i | install")
+
+    Aliases are indexed once, as commands are registered, so lookups are a single dict access. Registering an alias
+    that already belongs to a different command raises a ValueError instead of silently shadowing it.
     """
 
     _CMD_SPLIT_P = re.compile(r"\s*\|\s*")
 
+    def __init__(self, *args, **kwargs):
+        # Alias -> full command name (e.g. "c" -> "c | configure")
+        self._alias_index = {}
+        super().__init__(*args, **kwargs)
+        for name in self.commands:
+            self._index_command_name(name)
+
+    def add_command(self, cmd, name=None):
+        super().add_command(cmd, name)
+        self._index_command_name(name or cmd.name)
+
     def get_command(self, ctx, cmd_name):
         """Find the command OBJECT matching the given name."""
-        cmd_name = self._group_cmd_name(self.commands.values(), cmd_name)
-        return super().get_command(ctx, cmd_name)
-
-    def _group_cmd_name(self, group_command_names, default_name):
-        """Find the command NAME matching the given default name."""
-        for cmd in group_command_names:
-            names = self._CMD_SPLIT_P.split(cmd.name)
-            if cmd.name and default_name in names:
-                return cmd.name
-        return default_name
+        return super().get_command(ctx, self._alias_index.get(cmd_name, cmd_name))
+
+    def get_aliases(self) -> dict:
+        """Gets the alias index (alias -> full command name)."""
+        return dict(self._alias_index)
+
+    def shell_complete(self, ctx, incomplete):
+        """Complete individual aliases (e.g. "project", "p") rather than full names like "p | project"."""
+        results = [
+            CompletionItem(alias, help=self.commands[name].get_short_help_str())
+            for alias, name in self._alias_index.items()
+            if alias.startswith(incomplete) and not self.commands[name].hidden
+        ]
+        results.extend(click.Command.shell_complete(self, ctx, incomplete))
+        return results
+
+    def _index_command_name(self, name: str) -> None:
+        """Adds each alias in a full command name to the index, refusing aliases that are already taken."""
+        if not name:
+            return
+        for alias in self._CMD_SPLIT_P.split(name):
+            existing = self._alias_index.get(alias)
+            if existing is not None and existing != name:
+                raise ValueError(
+                    f"Command alias '{alias}' in '{name}' is already used by '{existing}'"
+                    f"{f' in {self.name}' if self.name else ''}."
+                )
+            self._alias_index[alias] = name
@@ -0,0 +1,84 @@
+import click
+import json
+import os
+import typer.main
+
+from anydev import client
+from anydev.commands.project_helpers import ProjectHelpers
+from anydev.configuration import Configuration
+from anydev.core.command_alias_group import CommandAliasGroup
+from anydev.core.group_startup import GroupStartup
+
+
+class CompletionCache:
+    """
+    Writes the command tree, registered project names and group names to a JSON file that the thin client answers shell
+    completion from, without importing the CLI (see client.complete_from_cache).
+
+    The file records a fingerprint of the command definitions and configuration it was built from, and is rebuilt
+    by the next in-process completion once any of them change.
+    """
+
+    # Completion callbacks the cache knows how to answer, by name
+    COMPLETERS = {
+        'projects': ProjectHelpers.complete_project_name,
+        'groups':   GroupStartup.complete_group_name,
+    }
+
+    @staticmethod
+    def is_stale() -> bool:
+        try:
+            with open(client.COMPLETION_CACHE, 'r') as f:
+                return json.load(f).get('fingerprint') != client.completion_fingerprint()
+        except (FileNotFoundError, json.JSONDecodeError):
+            return True
+
+    @staticmethod
+    def write(typer_app: typer.Typer) -> None:
+        """Builds and saves the completion cache for a Typer app."""
+        config = Configuration()
+        cache = {
+            'tree':     CompletionCache.build(typer.main.get_command(typer_app)),
+            'projects': [[name, details.get('path', '')] for name, details in config.get_registered_projects().items()],
+            'groups':   [[name, ', '.join(GroupStartup.get_project_names(group))]
+                         for name, group in config.get_groups().items()],
+        }
+        # Fingerprint last, once reading the registry has settled its files
+        cache['fingerprint'] = client.completion_fingerprint()
+        os.makedirs(os.path.dirname(client.COMPLETION_CACHE), exist_ok=True)
+        temp_file = f"{client.COMPLETION_CACHE}.{os.getpid()}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(cache, f)
+        os.replace(temp_file, client.COMPLETION_CACHE)
+
+    @staticmethod
+    def build(command) -> dict:
+        """Describes a command (and, for groups, its sub-commands) for completion."""
+        node = {
+            'help':      command.get_short_help_str(),
+            'hidden':    bool(getattr(command, 'hidden', False)),
+            'options':   [],
+            'arguments': [],
+        }
+        for param in command.get_params(click.Context(command)):
+            completer = next(
+                (name for name, completer in CompletionCache.COMPLETERS.items()
+                 if getattr(param, '_custom_shell_complete', None) is completer),
+                None
+            )
+            if param.param_type_name == 'option':
+                node['options'].append({
+                    'opts':        param.opts + param.secondary_opts,
+                    'takes_value': not param.is_flag and not param.count,
+                    'hidden':      bool(param.hidden),
+                    'help':        param.help or '',
+                    'complete':    completer,
+                })
+            else:
+                node['arguments'].append({'name': param.name, 'nargs': param.nargs, 'complete': completer})
+
+        if isinstance(command, CommandAliasGroup):
+            node['aliases'] = command.get_aliases()
+            node['commands'] = {name: CompletionCache.build(sub_command)
+                                for name, sub_command in command.commands.items()}
+        return node
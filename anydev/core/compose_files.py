@@ -0,0 +1,176 @@
+import copy
+import os
+import re
+import yaml
+
+from dotenv import dotenv_values
+
+
+class ComposeFiles:
+    """
+    Reads docker-compose files the way Docker Compose does: with variables interpolated from the environment and
+    the `.env` file next to the compose file.
+    """
+
+    _NAME_P = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+    _EXPRESSION_P = re.compile(r'(?P<name>[A-Za-z_][A-Za-z0-9_]*)(?:(?P<operator>:?[-?+])(?P<operand>.*))?$', re.DOTALL)
+
+    # (compose file, file mtime, .env mtime) -> parsed model, for long-running processes like the daemon
+    _cache = {}
+
+    @staticmethod
+    def get_env(directory: str) -> dict:
+        """
+        Gets the variables available for interpolation in a compose directory.
+        The shell environment wins over the directory's .env file, like Docker Compose.
+        """
+        env_file = os.path.join(directory, '.env')
+        env = {key: value for key, value in dotenv_values(env_file).items() if value is not None} \
+            if os.path.isfile(env_file) else {}
+        return env | dict(os.environ)
+
+    @staticmethod
+    def interpolate(value, env: dict):
+        """
+        Recursively replaces ${VAR}, ${VAR:-default}, ${VAR-default}, ${VAR:+alternative}, and $VAR references.
+        Defaults may themselves contain references, e.g. ${VAR:-${OTHER}}.
+
+        Args:
+            value: A string, or a list/dict containing strings.
+            env (dict): The variables to substitute.
+
+        Returns:
+            The value with variables substituted.
+        """
+        if isinstance(value, dict):
+            return {key: ComposeFiles.interpolate(item, env) for key, item in value.items()}
+        if isinstance(value, list):
+            return [ComposeFiles.interpolate(item, env) for item in value]
+        if not isinstance(value, str):
+            return value
+
+        result = []
+        position = 0
+        while position < len(value):
+            start = value.find('$', position)
+            if start < 0:
+                result.append(value[position:])
+                break
+            result.append(value[position:start])
+
+            following = value[start + 1:start + 2]
+            if following == '$':
+                result.append('$')
+                position = start + 2
+            elif following == '{':
+                end = ComposeFiles._find_closing_brace(value, start + 2)
+                if end < 0:
+                    result.append(value[start:])
+                    break
+                result.append(ComposeFiles._resolve(value[start + 2:end], env))
+                position = end + 1
+            else:
+                plain = ComposeFiles._NAME_P.match(value, start + 1)
+                result.append(env.get(plain.group(0), '') if plain else '$')
+                position = plain.end() if plain else start + 1
+        return ''.join(result)
+
+    @staticmethod
+    def _find_closing_brace(value: str, position: int) -> int:
+        """Finds the brace closing a ${...} expression that starts at position, allowing nested expressions."""
+        depth = 1
+        while position < len(value):
+            if value.startswith('${', position):
+                depth += 1
+                position += 2
+                continue
+            if value[position] == '}':
+                depth -= 1
+                if depth == 0:
+                    return position
+            position += 1
+        return -1
+
+    @staticmethod
+    def _resolve(expression: str, env: dict) -> str:
+        """Evaluates the inside of a ${...} expression."""
+        match = ComposeFiles._EXPRESSION_P.match(expression)
+        if not match:
+            return ''
+        name, operator, operand = match.group('name'), match.group('operator'), match.group('operand') or ''
+        value = env.get(name)
+        if operator in [':-', ':?']:
+            return value if value else (ComposeFiles.interpolate(operand, env) if operator == ':-' else '')
+        if operator in ['-', '?']:
+            return value if value is not None else (ComposeFiles.interpolate(operand, env) if operator == '-' else '')
+        if operator == ':+':
+            return ComposeFiles.interpolate(operand, env) if value else ''
+        if operator == '+':
+            return ComposeFiles.interpolate(operand, env) if value is not None else ''
+        return value or ''
+
+    @staticmethod
+    def load(compose_file: str, env: dict = None) -> dict:
+        """
+        Loads and interpolates a compose file.
+
+        Args:
+            compose_file (str): Path to the compose file.
+            env (dict): Interpolation variables. Defaults to those of the compose file's directory.
+
+        Returns:
+            dict: The parsed compose model, or an empty dict if the file doesn't exist.
+        """
+        directory = os.path.dirname(os.path.abspath(compose_file))
+        cache_key = None
+        if env is None:
+            # Only models interpolated from the directory's own .env are cached; the shell environment is fixed
+            # for the life of the process
+            try:
+                env_mtime = os.stat(os.path.join(directory, '.env')).st_mtime_ns
+            except OSError:
+                env_mtime = None
+            try:
+                cache_key = (os.path.abspath(compose_file), os.stat(compose_file).st_mtime_ns, env_mtime)
+            except OSError:
+                return {}
+            if cache_key in ComposeFiles._cache:
+                return copy.deepcopy(ComposeFiles._cache[cache_key])
+
+        try:
+            with open(compose_file, 'r') as f:
+                data = yaml.safe_load(f) or {}
+        except FileNotFoundError:
+            return {}
+
+        model = ComposeFiles.interpolate(data, env if env is not None else ComposeFiles.get_env(directory))
+        if cache_key:
+            ComposeFiles._cache[cache_key] = copy.deepcopy(model)
+        return model
+
+    @staticmethod
+    def get_bind_mounts(service: dict, directory: str) -> list:
+        """
+        Lists a service's bind mounts as (host path, container path) tuples.
+
+        Args:
+            service (dict): A service definition from an interpolated compose model.
+            directory (str): The compose file's directory, for resolving relative paths.
+        """
+        mounts = []
+        for volume in service.get('volumes', []):
+            if isinstance(volume, dict):
+                if volume.get('type') != 'bind':
+                    continue
+                source, target = volume.get('source', ''), volume.get('target', '')
+            else:
+                parts = volume.split(':')
+                if len(parts) < 2:
+                    continue
+                source, target = parts[0], parts[1]
+                # Named volumes don't look like paths
+                if not (source.startswith(('/', '.', '~')) or os.sep in source):
+                    continue
+            source = os.path.expanduser(source)
+            mounts.append((os.path.normpath(os.path.join(directory, source)), target))
+        return mounts
@@ -4,8 +4,10 @@ import yaml
 
 from anydev.configuration import Configuration
 from anydev.core.cli_output import CliOutput
+from anydev.core.connection_poolers import ConnectionPoolers
 from anydev.core.docker_controls import DockerHelpers
 from anydev.core.questionary_styles import anydev_qsty_styles
+from anydev.core.service_tuning import ServiceTuning
 
 
 class ConfigureServices:
@@ -33,6 +35,12 @@ class ConfigureServices:
         # Ask for a default project directory
         self.prompt_projects_dir()
 
+        # Ask how much memory the shared services may use
+        self.prompt_tuning()
+
+        # Generate the connection pooler configs (from the shared services' credentials)
+        ConnectionPoolers().write_configs()
+
         # Save configs
         self.config.save()
 
@@ -132,6 +140,38 @@ class ConfigureServices:
             CliOutput.warning("Please set a directory to continue configuration.")
             return self.prompt_projects_dir()
 
+    def prompt_tuning(self) -> None:
+        """
+        Ask the user for a memory budget and tune the shared services for this machine (see ServiceTuning).
+        """
+        tuning = ServiceTuning()
+        if not tuning.get_tunable_services():
+            return
+
+        resources = tuning.get_host_resources()
+        budgets = {
+            f"Light ({int(resources['memory_mb'] * 0.125)} MB)":    int(resources['memory_mb'] * 0.125),
+            f"Balanced ({int(resources['memory_mb'] * 0.25)} MB)":  int(resources['memory_mb'] * 0.25),
+            f"Generous ({int(resources['memory_mb'] * 0.5)} MB)":   int(resources['memory_mb'] * 0.5),
+            "Stock settings (no tuning)":                           None,
+        }
+        choice = questionary.select(
+            f"How much of Docker's memory ({resources['memory_mb']} MB, {resources['cpus']} CPUs) should databases "
+            f"and caches use?",
+            choices=list(budgets),
+            default=list(budgets)[1],
+            use_indicator=True,
+            style=anydev_qsty_styles
+        ).unsafe_ask()
+
+        if budgets[choice] is None:
+            tuning.disable()
+            CliOutput.info("Shared services will use their stock settings.")
+        else:
+            tuning.apply(budgets[choice])
+            CliOutput.success(f"Shared services tuned for {budgets[choice]} MB. Run `anydev services tune --show` "
+                              f"to see the settings.")
+
     def prompt_restart(self) -> None:
         # Ask the user if they want to (re)start the service containers
         restart_services = questionary.confirm(
@@ -144,6 +184,7 @@ class ConfigureServices:
         if restart_services:
             DockerHelpers.restart_composition(
                 self.config.cli_root_dir,
-                self.config.get_active_profiles()
+                self.config.get_active_profiles(),
+                self.config.get_service_compose_files()
             )
 
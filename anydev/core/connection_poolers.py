@@ -0,0 +1,186 @@
+import os
+
+from anydev.configuration import Configuration
+from anydev.core.compose_files import ComposeFiles
+from anydev.core.docker_controls import DockerHelpers
+
+
+class ConnectionPoolers:
+    """
+    The optional connection poolers in front of the shared databases: PgBouncer (`pgbouncer` profile) for Postgres
+    and ProxySQL (`proxysql` profile) for MySQL.
+
+    Inside the anydev network each pooler listens on its database's usual port, so a project only has to swap the
+    host name (e.g. MYSQL_HOST="anydev-proxysql") to go through it. On the host they're published on 6432 (PgBouncer)
+    and 6033 (ProxySQL). Their configuration is generated from the root .env, because it holds the credentials.
+    """
+
+    # Profile -> the database it pools, the pooler's host name, and the env variables projects use for that database
+    POOLERS = {
+        'pgbouncer': {
+            'database':  'postgres',
+            'container': 'anydev-pgbouncer',
+            'host_keys': ['POSTGRES_HOST', 'DB_HOST'],
+        },
+        'proxysql':  {
+            'database':  'mysql',
+            'container': 'anydev-proxysql',
+            'host_keys': ['MYSQL_HOST', 'DB_HOST'],
+        },
+    }
+
+    # ProxySQL's admin interface only accepts the `admin` user from localhost
+    PROXYSQL_ADMIN = ('radmin', 'radmin')
+
+    def __init__(self):
+        self.config = Configuration()
+        self.pooler_dir = os.path.join(self.config.config_dir, 'poolers')
+
+    def get_active_poolers(self) -> list:
+        active_profiles = self.config.get_active_profiles()
+        return [profile for profile in self.POOLERS if profile in active_profiles]
+
+    @staticmethod
+    def get_host_overrides(template_keys: list, active_profiles: list) -> dict:
+        """
+        Gets the database host values a new project should use, when a pooler for its database is active.
+
+        Args:
+            template_keys (list): The env variable names the project's template defines.
+            active_profiles (list): The active service profiles.
+
+        Returns:
+            dict: Env variable names and pooler host names.
+        """
+        overrides = {}
+        for profile, pooler in ConnectionPoolers.POOLERS.items():
+            if profile not in active_profiles or pooler['database'] not in active_profiles:
+                continue
+            for key in pooler['host_keys']:
+                if key in template_keys:
+                    overrides[key] = pooler['container']
+        return overrides
+
+    def write_configs(self) -> None:
+        """
+        Writes the pooler configuration files mounted by docker-compose.yml. Always writes both, so the mounts exist
+        even if a pooler's profile is enabled later.
+        """
+        env = ComposeFiles.get_env(self.config.cli_root_dir)
+        settings = self.config.get_pooler_settings()
+        os.makedirs(self.pooler_dir, exist_ok=True)
+
+        postgres_password = env.get('POSTGRES_PASSWORD', '')
+        self._write('pgbouncer.ini', '\n'.join([
+            "; Generated by AnyDev from its .env. Changes will be overwritten.",
+            "[databases]",
+            "* = host=anydev-postgres port=5432",
+            "",
+            "[pgbouncer]",
+            "listen_addr = 0.0.0.0",
+            "listen_port = 5432",
+            "auth_type = scram-sha-256",
+            "auth_file = /etc/pgbouncer/userlist.txt",
+            "admin_users = postgres",
+            "stats_users = postgres",
+            f"pool_mode = {settings['pool_mode']}",
+            f"default_pool_size = {settings['pool_size']}",
+            "max_client_conn = 1000",
+            "ignore_startup_parameters = extra_float_digits,options",
+            "",
+        ]))
+        self._write('userlist.txt', f'"postgres" "{postgres_password.replace(chr(34), chr(34) * 2)}"\n')
+
+        mysql_password = env.get('MYSQL_ROOT_PASSWORD', '').replace('\\', '\\\\').replace('"', '\\"')
+        admin_user, admin_password = self.PROXYSQL_ADMIN
+        self._write('proxysql.cnf', '\n'.join([
+            "# Generated by AnyDev from its .env. Changes will be overwritten.",
+            'datadir="/var/lib/proxysql"',
+            "admin_variables=",
+            "{",
+            f'    admin_credentials="admin:admin;{admin_user}:{admin_password}"',
+            '    mysql_ifaces="0.0.0.0:6032"',
+            "}",
+            "mysql_variables=",
+            "{",
+            "    threads=2",
+            "    max_connections=1000",
+            '    interfaces="0.0.0.0:3306"',
+            '    server_version="8.0.0"',
+            '    monitor_username="root"',
+            f'    monitor_password="{mysql_password}"',
+            "    multiplexing=true",
+            "}",
+            "mysql_servers=",
+            "(",
+            f'    {{ address="anydev-mysql", port=3306, hostgroup=0, max_connections={settings["pool_size"]} }}',
+            ")",
+            "mysql_users=",
+            "(",
+            f'    {{ username="root", password="{mysql_password}", default_hostgroup=0 }}',
+            ")",
+            "",
+        ]))
+
+    def get_pgbouncer_stats(self) -> dict:
+        """
+        Reads PgBouncer's SHOW POOLS and SHOW STATS, through psql in the Postgres container.
+
+        Returns:
+            dict: {'pools': [row dicts], 'stats': [row dicts]}
+        """
+        password = ComposeFiles.get_env(self.config.cli_root_dir).get('POSTGRES_PASSWORD', '')
+        return {
+            command.split()[-1].lower(): self._query(
+                'anydev-postgres',
+                ['psql', '-h', 'anydev-pgbouncer', '-p', '5432', '-U', 'postgres', '-A', '-F', '\t', '-P',
+                 'footer=off', '-c', command, 'pgbouncer'],
+                {'PGPASSWORD': password}
+            )
+            for command in ['SHOW POOLS', 'SHOW STATS']
+        }
+
+    def get_proxysql_stats(self) -> dict:
+        """
+        Reads ProxySQL's connection pool and global counters from its admin interface, through the mysql client in
+        the MySQL container.
+
+        Returns:
+            dict: {'pools': [row dicts], 'global': {variable: value}}
+        """
+        admin_user, admin_password = self.PROXYSQL_ADMIN
+
+        def query(sql: str) -> list:
+            return self._query(
+                'anydev-mysql',
+                ['mysql', '-h', 'anydev-proxysql', '-P', '6032', f"-u{admin_user}", '--batch', '-e', sql],
+                {'MYSQL_PWD': admin_password}
+            )
+
+        counters = query(
+            "SELECT Variable_Name, Variable_Value FROM stats_mysql_global WHERE Variable_Name IN ("
+            "'Client_Connections_created', 'Client_Connections_connected', 'Server_Connections_created', "
+            "'Server_Connections_connected', 'ConnPool_get_conn_success', 'ConnPool_get_conn_immediate', "
+            "'ConnPool_get_conn_failure', 'Questions')"
+        )
+        return {
+            'pools':  query("SELECT * FROM stats_mysql_connection_pool"),
+            'global': {row['Variable_Name']: row['Variable_Value'] for row in counters},
+        }
+
+    @staticmethod
+    def _query(container: str, command: list, env: dict) -> list:
+        """Runs a client in a container and parses its tab-separated output (with a header row) into dicts."""
+        output = DockerHelpers.exec_in_container(container, command, env)
+        lines = [line for line in output.splitlines() if line.strip()]
+        if not lines:
+            return []
+        header = lines[0].split('\t')
+        return [dict(zip(header, line.split('\t'))) for line in lines[1:]]
+
+    def _write(self, filename: str, content: str) -> None:
+        path = os.path.join(self.pooler_dir, filename)
+        with open(path, 'w') as f:
+            f.write(content)
+        # The poolers run as unprivileged users
+        os.chmod(path, 0o644)
@@ -0,0 +1,52 @@
+import os
+
+from anydev.configuration import Configuration
+
+
+class ContainerOwners:
+    """
+    Maps Docker containers to the AnyDev project or shared service that owns them.
+
+    Ownership is determined from the labels Docker Compose puts on every container it creates, falling back to
+    AnyDev's container naming conventions (`anydev-<service>` and `<hostname>.site.test`).
+    """
+
+    SERVICE = 'service'
+    PROJECT = 'project'
+
+    def __init__(self):
+        self.config = Configuration()
+        self.services_dir = os.path.realpath(self.config.cli_root_dir)
+        self.projects_by_path = {
+            os.path.realpath(details.get('path', '')): name
+            for name, details in self.config.get_registered_projects().items()
+        }
+
+    def resolve(self, container: dict) -> None or tuple:
+        """
+        Finds the owner of a container.
+
+        Args:
+            container (dict): A container description as returned by `docker inspect`.
+
+        Returns:
+            tuple: A (kind, name) tuple where kind is SERVICE or PROJECT, or None if AnyDev doesn't own the container.
+        """
+        labels = container.get('Config', {}).get('Labels') or {}
+        container_name = container.get('Name', '').lstrip('/')
+
+        working_dir = labels.get('com.docker.compose.project.working_dir')
+        if working_dir:
+            working_dir = os.path.realpath(working_dir)
+            if working_dir == self.services_dir:
+                return self.SERVICE, labels.get('com.docker.compose.service', container_name)
+            if working_dir in self.projects_by_path:
+                return self.PROJECT, self.projects_by_path[working_dir]
+
+        # Not started from a known directory, so fall back to naming conventions
+        if container_name.startswith('anydev-'):
+            return self.SERVICE, container_name[len('anydev-'):]
+        if container_name.endswith('.site.test'):
+            return self.PROJECT, container_name
+
+        return None
@@ -2,14 +2,16 @@ import os
 import questionary
 import re
 import shutil
+import time
 import typer
 import webbrowser
 
-from anydev.commands.project_helpers import ProjectHelpers
 from anydev.configuration import Configuration
 from anydev.core.cli_output import CliOutput
+from anydev.core.connection_poolers import ConnectionPoolers
+from anydev.core.docker_controls import DockerHelpers
 from anydev.core.questionary_styles import anydev_qsty_styles
-from dotenv import set_key
+from dotenv import dotenv_values, set_key
 
 
 class CreateProject:
@@ -17,8 +19,12 @@ class CreateProject:
     Class to handle creation of new projects (including state during the process).
     """
 
-    def __init__(self):
+    def __init__(self, pool=None, wait: bool = True):
         self.config = Configuration()
+        # A WarmPool to adopt a pre-started project from, if one is ready for the chosen template
+        self.pool = pool
+        # Whether to time the first response of a project whose template is pooled
+        self.wait = wait
         self.entered_project_hostname = None
         self.entered_project_title = None
         self.sanitized_project_title = None
@@ -163,15 +169,34 @@ class CreateProject:
             typer.Exit: Exits the application after the configuration process.
         """
         if typer.confirm("Would you like me to configure and start the project for you?", default=True):
-            self._update_env()
-            self._create_env_file()
-            ProjectHelpers.restart_composition(self.project_path)
+            started = time.monotonic()
+            slot = self.pool.take(self.template_name) if self.pool else None
+            if slot:
+                CliOutput.info(f"Adopting {slot['hostname']} from the warm pool...")
+                try:
+                    self.pool.adopt(slot, self.project_path, self.entered_project_hostname)
+                except RuntimeError as e:
+                    CliOutput.error(f"Failed to start the adopted project: {e}")
+                self.pool.refill_in_background(self.template_name)
+            else:
+                self._update_env()
+                self._create_env_file()
+                DockerHelpers.restart_composition(self.project_path)
+            url = f"https://{self.entered_project_hostname}.site.test"
+            # Only pooled templates are timed, so other projects don't wait on a site that may never answer
+            if self.wait and self.pool and (slot or self.template_name in self.pool.settings['templates']):
+                if self.pool.wait_for_response(url, self.pool.FIRST_RESPONSE_TIMEOUT) is not None:
+                    CliOutput.info(f"First response {time.monotonic() - started:.1f}s after starting"
+                                   + (" (adopted from the warm pool)." if slot else "."))
+                else:
+                    CliOutput.warning(f"No response from {url} within {self.pool.FIRST_RESPONSE_TIMEOUT} seconds. "
+                                      f"It may still be starting.")
             CliOutput.success("Project configured and started!")
-            CliOutput.success(f"URL: https://{self.entered_project_hostname}.site.test")
+            CliOutput.success(f"URL: {url}")
             CliOutput.success(f"Project Location: {self.project_path}")
 
             # TODO: Make opening browser optional?
-            webbrowser.open(f"https://{self.entered_project_hostname}.site.test")
+            webbrowser.open(url)
         else:
             CliOutput.alert("Project configuration completed.")
         raise typer.Exit(code=0)
@@ -182,9 +207,9 @@ class CreateProject:
         # Location of env file for current project
         dotenv_path = f"{self.project_path}/{filename}"
 
-        # Change the value of the HOSTNAME variable
-        set_key(dotenv_path, 'HOSTNAME', self.entered_project_hostname)
-        set_key(dotenv_path, 'COMPOSE_PROJECT_NAME', f"anydev-{self.entered_project_hostname}")
+        # Change the value of the HOSTNAME variable (and friends)
+        for key, value in self.get_env_values(self.entered_project_hostname, self.template_name).items():
+            set_key(dotenv_path, key, value)
 
     def _create_env_file(self) -> None:
         """Copy .env.example to .env"""
@@ -199,6 +224,31 @@ class CreateProject:
         except Exception as e:
             CliOutput.error(f"Failed to create .env: {e}", True)
 
+    @staticmethod
+    def get_env_values(hostname: str, template_name: str) -> dict:
+        """
+        Gets the env values AnyDev sets in a new project's env files, including pooler hosts for its databases when
+        the PgBouncer or ProxySQL profiles are active.
+
+        Args:
+            hostname (str): The project's simple hostname (e.g. "foo" for foo.site.test).
+            template_name (str): The template the project was created from.
+
+        Returns:
+            dict: Env variable names and values.
+        """
+        values = {
+            'HOSTNAME':             hostname,
+            'COMPOSE_PROJECT_NAME': f"anydev-{hostname}",
+            'ANYDEV_TEMPLATE':      template_name,
+        }
+
+        # Point the project's database hosts at the connection poolers, when they're in use
+        config = Configuration()
+        template_env = os.path.join(config.templates_dir, template_name, '.env.example')
+        template_keys = list(dotenv_values(template_env)) if os.path.isfile(template_env) else []
+        return values | ConnectionPoolers.get_host_overrides(template_keys, config.get_active_profiles())
+
     @staticmethod
     def sanitize_folder_name(folder_name: str) -> str:
         """
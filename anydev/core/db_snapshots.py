@@ -0,0 +1,541 @@
+import datetime
+import gzip
+import json
+import math
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+from anydev.configuration import Configuration
+from anydev.core.cli_output import CliOutput
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import dotenv_values
+
+
+class DatabaseEngine:
+    """
+    Base class describing how to talk to one of AnyDev's shared database containers.
+    All commands run inside the container through `docker exec`, so no client tools are needed on the host.
+    """
+
+    name = None
+    container = None
+    # File extension used for data chunks
+    data_extension = 'sql'
+
+    def __init__(self, database: str, container: str = None):
+        self.database = database
+        self.container = container or self.container
+        self.env = self._get_exec_env()
+        # Set while export_snapshot() holds a snapshot the dump commands share
+        self.snapshot_id = None
+        self._snapshot_session = None
+
+    def _get_exec_env(self) -> dict:
+        return {}
+
+    def exec_cmd(self, args: list, interactive: bool = False) -> list:
+        """Wraps a command so it runs inside the database container."""
+        env_args = []
+        for key, value in self.env.items():
+            env_args.extend(['-e', f"{key}={value}"])
+        return ['docker', 'exec'] + (['-i'] if interactive else []) + env_args + [self.container] + args
+
+    def query(self, sql: str) -> list:
+        """Runs a query and returns rows as lists of strings."""
+        raise NotImplementedError
+
+    def list_tables(self) -> list:
+        """Returns (table, estimated_rows, integer_primary_key or None) tuples."""
+        raise NotImplementedError
+
+    def key_range(self, table: str, key: str) -> tuple:
+        """Returns the (min, max) of an integer key."""
+        rows = self.query(f"SELECT MIN({self.quote(key)}), MAX({self.quote(key)}) FROM {table}")
+        if not rows or not rows[0][0] or rows[0][0] in ('NULL', ''):
+            return None, None
+        return int(rows[0][0]), int(rows[0][1])
+
+    def quote(self, identifier: str) -> str:
+        raise NotImplementedError
+
+    def schema_cmd(self) -> list:
+        raise NotImplementedError
+
+    def post_schema_cmd(self) -> None or list:
+        return None
+
+    def sequences_cmd(self) -> None or list:
+        """A command printing SQL that sets sequences to their current values, run after the data is loaded."""
+        return None
+
+    def export_snapshot(self) -> None:
+        """Opens a session holding a snapshot for the dump commands to share, if the engine supports it."""
+        return None
+
+    def release_snapshot(self) -> None:
+        self.snapshot_id = None
+
+    def data_cmd(self, table: str, where: str = None) -> list:
+        raise NotImplementedError
+
+    def recreate_database(self) -> None:
+        raise NotImplementedError
+
+    def load_cmd(self) -> list:
+        raise NotImplementedError
+
+    def load_data_cmd(self, table: str) -> list:
+        return self.load_cmd()
+
+    def load_preamble(self) -> bytes:
+        return b''
+
+    def load_epilogue(self) -> bytes:
+        return b''
+
+
+class MysqlEngine(DatabaseEngine):
+    name = 'mysql'
+    container = 'anydev-mysql'
+
+    _INT_TYPES = ('tinyint', 'smallint', 'mediumint', 'int', 'bigint')
+
+    def _get_exec_env(self) -> dict:
+        env = dotenv_values(Configuration().cli_env_active)
+        return {'MYSQL_PWD': env.get('MYSQL_ROOT_PASSWORD', '')}
+
+    def query(self, sql: str) -> list:
+        result = subprocess.run(
+            self.exec_cmd(['mysql', '-uroot', '-N', '-B', '-e', sql, self.database]),
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip())
+        return [line.split('\t') for line in result.stdout.splitlines() if line]
+
+    def list_tables(self) -> list:
+        tables = self.query(
+            "SELECT TABLE_NAME, IFNULL(TABLE_ROWS, 0) FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE'"
+        )
+        key_columns = {}
+        for table, column, data_type in self.query(
+                "SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND COLUMN_KEY = 'PRI'"
+        ):
+            key_columns.setdefault(table, []).append((column, data_type))
+
+        results = []
+        for table, rows in tables:
+            keys = key_columns.get(table, [])
+            # Only single-column integer keys can be split into ranges
+            key = keys[0][0] if len(keys) == 1 and keys[0][1] in self._INT_TYPES else None
+            results.append((table, int(rows), key))
+        return results
+
+    def key_range(self, table: str, key: str) -> tuple:
+        return super().key_range(self.quote(table), key)
+
+    def quote(self, identifier: str) -> str:
+        return '`' + identifier.replace('`', '``') + '`'
+
+    def schema_cmd(self) -> list:
+        return self.exec_cmd([
+            'mysqldump', '-uroot', '--no-data', '--routines', '--triggers', '--events',
+            '--single-transaction', self.database
+        ])
+
+    def data_cmd(self, table: str, where: str = None) -> list:
+        # Chunks of a table load in parallel, so they mustn't lock the table or toggle its keys (LOCK TABLES and
+        # UNLOCK TABLES would also commit the loader's transaction early). mysqldump can't share a snapshot between
+        # processes, so each chunk is consistent on its own, not with the others.
+        args = [
+            'mysqldump', '-uroot', '--no-create-info', '--skip-triggers', '--single-transaction', '--quick',
+            '--skip-lock-tables', '--skip-add-locks', '--skip-disable-keys', '--extended-insert'
+        ]
+        if where:
+            args.append(f"--where={where}")
+        return self.exec_cmd(args + [self.database, table])
+
+    def recreate_database(self) -> None:
+        db = self.quote(self.database)
+        result = subprocess.run(
+            self.exec_cmd(['mysql', '-uroot', '-e', f"DROP DATABASE IF EXISTS {db}; CREATE DATABASE {db};"]),
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip())
+
+    def load_cmd(self) -> list:
+        return self.exec_cmd(['mysql', '-uroot', self.database], interactive=True)
+
+    def load_preamble(self) -> bytes:
+        # Loaders run in parallel, so skip per-row checks and commit once
+        return b"SET FOREIGN_KEY_CHECKS=0; SET UNIQUE_CHECKS=0; SET autocommit=0;\n"
+
+    def load_epilogue(self) -> bytes:
+        return b"\nCOMMIT;\n"
+
+
+class PostgresEngine(DatabaseEngine):
+    name = 'postgres'
+    container = 'anydev-postgres'
+    data_extension = 'copy'
+
+    def _get_exec_env(self) -> dict:
+        env = dotenv_values(Configuration().cli_env_active)
+        return {'PGPASSWORD': env.get('POSTGRES_PASSWORD', ''), 'PGUSER': 'postgres'}
+
+    def query(self, sql: str) -> list:
+        result = subprocess.run(
+            self.exec_cmd(['psql', '-v', 'ON_ERROR_STOP=1', '-At', '-F', '\t', '-d', self.database, '-c', sql]),
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip())
+        return [line.split('\t') for line in result.stdout.splitlines() if line]
+
+    def list_tables(self) -> list:
+        rows = self.query(
+            "SELECT c.oid::regclass::text, GREATEST(c.reltuples, 0)::bigint, ("
+            "  SELECT a.attname FROM pg_index i"
+            "  JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]"
+            "  WHERE i.indrelid = c.oid AND i.indisprimary AND i.indnatts = 1"
+            "  AND a.atttypid IN ('int2'::regtype, 'int4'::regtype, 'int8'::regtype)"
+            ") FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE c.relkind = 'r' AND n.nspname NOT IN ('pg_catalog', 'information_schema') "
+            "AND n.nspname NOT LIKE 'pg_toast%'"
+        )
+        return [(table, int(estimate), key or None) for table, estimate, key in rows]
+
+    def quote(self, identifier: str) -> str:
+        return '"' + identifier.replace('"', '""') + '"'
+
+    def schema_cmd(self) -> list:
+        return self.exec_cmd(['pg_dump', '--section=pre-data', '--no-owner'] + self._snapshot_args() + [self.database])
+
+    def post_schema_cmd(self) -> list:
+        # Indexes and constraints are restored after the data, which is much faster
+        return self.exec_cmd(['pg_dump', '--section=post-data', '--no-owner'] + self._snapshot_args()
+                             + [self.database])
+
+    def sequences_cmd(self) -> list:
+        # Sequence values are part of pg_dump's data section, which the COPY chunks replace
+        return self._psql_in_snapshot(
+            "SELECT format('SELECT pg_catalog.setval(%L, %s, %s);', format('%I.%I', schemaname, sequencename), "
+            "COALESCE(last_value, start_value), last_value IS NOT NULL) FROM pg_sequences", ['-At']
+        )
+
+    def data_cmd(self, table: str, where: str = None) -> list:
+        source = f"(SELECT * FROM {table} WHERE {where})" if where else table
+        return self._psql_in_snapshot(f"COPY {source} TO STDOUT")
+
+    def export_snapshot(self) -> None:
+        self._snapshot_session = subprocess.Popen(
+            self.exec_cmd(['psql', '-q', '-v', 'ON_ERROR_STOP=1', '-d', self.database], interactive=True),
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+        # The snapshot ID comes back as a notice on stderr, which isn't buffered, while the session stays open
+        self._snapshot_session.stdin.write(
+            "BEGIN ISOLATION LEVEL REPEATABLE READ READ ONLY;\n"
+            "DO $$ BEGIN RAISE NOTICE 'anydev-snapshot=%', pg_export_snapshot(); END $$;\n"
+        )
+        self._snapshot_session.stdin.flush()
+        line = self._snapshot_session.stderr.readline()
+        match = re.search(r'anydev-snapshot=(\S+)', line)
+        if not match:
+            self._snapshot_session.kill()
+            self._snapshot_session = None
+            raise RuntimeError(f"Unable to export a snapshot: {line.strip() or 'psql exited'}")
+        self.snapshot_id = match.group(1)
+
+    def release_snapshot(self) -> None:
+        if self._snapshot_session:
+            try:
+                self._snapshot_session.stdin.write("COMMIT;\n")
+                self._snapshot_session.stdin.close()
+            except BrokenPipeError:
+                pass
+            self._snapshot_session.wait()
+            self._snapshot_session = None
+        super().release_snapshot()
+
+    def _snapshot_args(self) -> list:
+        return [f"--snapshot={self.snapshot_id}"] if self.snapshot_id else []
+
+    def _psql_in_snapshot(self, sql: str, extra_args: list = None) -> list:
+        """A psql command running a query in the exported snapshot, if there is one."""
+        args = ['psql', '-q', '-v', 'ON_ERROR_STOP=1', '-d', self.database] + (extra_args or [])
+        if self.snapshot_id:
+            args += [
+                '-c', 'BEGIN ISOLATION LEVEL REPEATABLE READ READ ONLY',
+                '-c', f"SET TRANSACTION SNAPSHOT '{self.snapshot_id}'",
+                '-c', sql,
+                '-c', 'COMMIT',
+            ]
+        else:
+            args += ['-c', sql]
+        return self.exec_cmd(args)
+
+    def recreate_database(self) -> None:
+        for args in [['dropdb', '--if-exists', self.database], ['createdb', self.database]]:
+            result = subprocess.run(self.exec_cmd(args), capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.strip())
+
+    def load_cmd(self) -> list:
+        return self.exec_cmd(['psql', '-v', 'ON_ERROR_STOP=1', '-q', '-d', self.database], interactive=True)
+
+    def load_data_cmd(self, table: str) -> list:
+        return self.exec_cmd(
+            ['psql', '-v', 'ON_ERROR_STOP=1', '-q', '-d', self.database, '-c', f"COPY {table} FROM STDIN"],
+            interactive=True
+        )
+
+
+class DatabaseSnapshots:
+    """
+    Parallel logical snapshots of a single database on AnyDev's shared MySQL or Postgres service.
+
+    Snapshots are written to ~/.anydev/db-snapshots/<engine>/<database>/<name>/ as a schema file plus one
+    gzip-compressed file per data chunk. Large tables with an integer primary key are split into key ranges so
+    several dumpers (and later, loaders) can work on them at once. Dump output is compressed as it streams out of
+    the container, so nothing is staged in temporary files.
+
+    On Postgres every dump shares one exported snapshot, so the snapshot is consistent across chunks and tables. On
+    MySQL each chunk is dumped in its own transaction, so rows written during a snapshot may be caught by some chunks
+    and not others.
+    """
+
+    ENGINES = {
+        'mysql':    MysqlEngine,
+        'postgres': PostgresEngine,
+    }
+
+    # Streaming buffer size
+    BUFFER_SIZE = 1024 * 1024
+
+    def __init__(self, engine: str, database: str, jobs: int = 4, chunk_rows: int = 500_000,
+                 compress_level: int = 3, container: str = None):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unsupported database engine: {engine}")
+        self.engine = self.ENGINES[engine](database, container)
+        self.database = database
+        self.jobs = max(1, jobs)
+        self.chunk_rows = max(1, chunk_rows)
+        self.compress_level = compress_level
+        self.snapshots_dir = os.path.join(Configuration().config_dir, 'db-snapshots', engine, database)
+
+    def list_snapshots(self) -> list:
+        """Returns the manifests of all snapshots for this database, newest first."""
+        manifests = []
+        if not os.path.isdir(self.snapshots_dir):
+            return manifests
+        for name in os.listdir(self.snapshots_dir):
+            manifest_file = os.path.join(self.snapshots_dir, name, 'manifest.json')
+            if os.path.isfile(manifest_file):
+                with open(manifest_file, 'r') as f:
+                    manifests.append(json.load(f))
+        return sorted(manifests, key=lambda manifest: manifest.get('created', ''), reverse=True)
+
+    def plan_chunks(self) -> list:
+        """
+        Splits every table into dump chunks.
+
+        Returns:
+            list: (table, where) tuples, largest tables first so big chunks start early.
+        """
+        chunks = []
+        for table, estimated_rows, key in sorted(self.engine.list_tables(), key=lambda t: t[1], reverse=True):
+            if not key or estimated_rows <= self.chunk_rows:
+                chunks.append((table, None))
+                continue
+
+            low, high = self.engine.key_range(table, key)
+            if low is None:
+                chunks.append((table, None))
+                continue
+
+            pieces = math.ceil(estimated_rows / self.chunk_rows)
+            step = max(1, math.ceil((high - low + 1) / pieces))
+            quoted_key = self.engine.quote(key)
+            start = low
+            while start <= high:
+                end = start + step
+                # The last range is open-ended, so rows added after planning still make it in
+                where = f"{quoted_key} >= {start}" + (f" AND {quoted_key} < {end}" if end <= high else '')
+                chunks.append((table, where))
+                start = end
+        return chunks
+
+    def snapshot(self, name: str) -> dict:
+        """
+        Dumps the database into a new named snapshot.
+
+        Args:
+            name (str): The snapshot name. An existing snapshot with the same name is replaced.
+
+        Returns:
+            dict: The snapshot manifest, including sizes and timings.
+        """
+        started = time.monotonic()
+        target_dir = os.path.join(self.snapshots_dir, name)
+        partial_dir = target_dir + '.partial'
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        os.makedirs(partial_dir)
+
+        self.engine.export_snapshot()
+        try:
+            manifest = self._snapshot_into(name, partial_dir)
+        finally:
+            self.engine.release_snapshot()
+
+        manifest |= self._summarize(manifest, time.monotonic() - started)
+        with open(os.path.join(partial_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Only replace an existing snapshot once the new one is complete
+        shutil.rmtree(target_dir, ignore_errors=True)
+        os.rename(partial_dir, target_dir)
+        return manifest
+
+    def _snapshot_into(self, name: str, partial_dir: str) -> dict:
+        """Dumps the schema, data chunks, and sequences into a directory, returning the manifest."""
+        manifest = {
+            'name':     name,
+            'engine':   self.engine.name,
+            'database': self.database,
+            'created':  datetime.datetime.now().isoformat(timespec='seconds'),
+            'schema':   self._dump(self.engine.schema_cmd(), os.path.join(partial_dir, 'schema.sql.gz')),
+            'post_schema': None,
+            'sequences': None,
+            'chunks':   [],
+        }
+
+        chunks = self.plan_chunks()
+        CliOutput.info(f"Dumping {len(chunks)} chunk(s) with {self.jobs} parallel job(s)...")
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = []
+            for index, (table, where) in enumerate(chunks):
+                filename = f"{index:05d}.{self.engine.data_extension}.gz"
+                futures.append((table, where, filename, executor.submit(
+                    self._dump, self.engine.data_cmd(table, where), os.path.join(partial_dir, filename)
+                )))
+            for table, where, filename, future in futures:
+                manifest['chunks'].append({'table': table, 'where': where, 'file': filename} | future.result())
+
+        post_schema_cmd = self.engine.post_schema_cmd()
+        if post_schema_cmd:
+            manifest['post_schema'] = self._dump(post_schema_cmd, os.path.join(partial_dir, 'post-schema.sql.gz'))
+
+        sequences_cmd = self.engine.sequences_cmd()
+        if sequences_cmd:
+            manifest['sequences'] = self._dump(sequences_cmd, os.path.join(partial_dir, 'sequences.sql.gz'))
+        return manifest
+
+    def restore(self, name: str) -> dict:
+        """
+        Replaces the database with the contents of a named snapshot.
+
+        Args:
+            name (str): The snapshot to restore.
+
+        Returns:
+            dict: The snapshot manifest, with timings for this restore.
+        """
+        snapshot_dir = os.path.join(self.snapshots_dir, name)
+        try:
+            with open(os.path.join(snapshot_dir, 'manifest.json'), 'r') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No snapshot named '{name}' for {self.engine.name} database {self.database}.")
+
+        started = time.monotonic()
+        self.engine.recreate_database()
+        self._load(self.engine.load_cmd(), os.path.join(snapshot_dir, 'schema.sql.gz'))
+
+        CliOutput.info(f"Loading {len(manifest['chunks'])} chunk(s) with {self.jobs} parallel job(s)...")
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = [
+                executor.submit(
+                    self._load,
+                    self.engine.load_data_cmd(chunk['table']),
+                    os.path.join(snapshot_dir, chunk['file']),
+                    self.engine.name == 'mysql'
+                )
+                for chunk in manifest['chunks']
+            ]
+            for future in futures:
+                future.result()
+
+        if manifest.get('post_schema'):
+            self._load(self.engine.load_cmd(), os.path.join(snapshot_dir, 'post-schema.sql.gz'))
+        if manifest.get('sequences'):
+            self._load(self.engine.load_cmd(), os.path.join(snapshot_dir, 'sequences.sql.gz'))
+
+        return manifest | self._summarize(manifest, time.monotonic() - started)
+
+    def _dump(self, command: list, target: str) -> dict:
+        """Streams a dump command's output straight into a gzip file."""
+        raw_bytes = 0
+        # stderr goes to a file, so a chatty dumper can't fill its pipe and stall while stdout is streamed
+        with tempfile.TemporaryFile() as stderr_file:
+            proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file)
+            with gzip.open(target, 'wb', compresslevel=self.compress_level) as out:
+                while True:
+                    block = proc.stdout.read(self.BUFFER_SIZE)
+                    if not block:
+                        break
+                    raw_bytes += len(block)
+                    out.write(block)
+            returncode = proc.wait()
+            stderr = self._read_stderr(stderr_file)
+        if returncode != 0:
+            raise RuntimeError(f"Dump failed ({' '.join(command[-3:])}): {stderr}")
+        return {'raw_bytes': raw_bytes, 'compressed_bytes': os.path.getsize(target)}
+
+    def _load(self, command: list, source: str, wrap: bool = True) -> None:
+        """Streams a gzip file into a loader command's stdin."""
+        with tempfile.TemporaryFile() as stderr_file:
+            proc = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=stderr_file)
+            try:
+                if wrap:
+                    proc.stdin.write(self.engine.load_preamble())
+                with gzip.open(source, 'rb') as f:
+                    while True:
+                        block = f.read(self.BUFFER_SIZE)
+                        if not block:
+                            break
+                        proc.stdin.write(block)
+                if wrap:
+                    proc.stdin.write(self.engine.load_epilogue())
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+            returncode = proc.wait()
+            stderr = self._read_stderr(stderr_file)
+        if returncode != 0:
+            raise RuntimeError(f"Restore failed ({os.path.basename(source)}): {stderr}")
+
+    @staticmethod
+    def _read_stderr(stderr_file) -> str:
+        stderr_file.seek(0)
+        return stderr_file.read().decode(errors='replace').strip()
+
+    @staticmethod
+    def _summarize(manifest: dict, seconds: float) -> dict:
+        """Totals sizes and throughput for a manifest."""
+        parts = [manifest['schema'], manifest.get('post_schema'), manifest.get('sequences')] + manifest['chunks']
+        raw_bytes = sum(part['raw_bytes'] for part in parts if part)
+        compressed_bytes = sum(part['compressed_bytes'] for part in parts if part)
+        return {
+            'raw_bytes':        raw_bytes,
+            'compressed_bytes': compressed_bytes,
+            'seconds':          round(seconds, 3),
+            'throughput_mbs':   round(raw_bytes / (1024 * 1024) / seconds, 2) if seconds else 0,
+        }
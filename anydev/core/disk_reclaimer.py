@@ -0,0 +1,458 @@
+import datetime
+import json
+import os
+import re
+import subprocess
+import time
+
+from anydev.configuration import Configuration
+from anydev.core.compose_files import ComposeFiles
+from anydev.core.ephemeral_databases import EphemeralDatabases
+from anydev.core.project_volumes import ProjectVolumes
+from anydev.core.resource_stats import ResourceStats
+
+
+class DiskReclaimer:
+    """
+    Finds the disk space AnyDev's projects and services use, by owner, and frees the least recently used of it.
+
+    Artifacts are containers, images, and volumes (attributed by their compose project, or by the image names compose
+    and the services' compose file give them), shared service data directories left behind by other versions (e.g.
+    ~/.anydev/mysql-5.7), and Docker's unused build cache. Owners are registered projects, projects that have since
+    been removed, service versions, and the build cache.
+
+    Last-used times come from the project registry and are recorded for owners with running containers on every scan,
+    so service versions and removed projects age too. Running owners, the configured service versions, and projects
+    used within `protect_days` are never evicted.
+    """
+
+    PROJECT = 'project'
+    REMOVED_PROJECT = 'removed project'
+    SERVICE = 'service'
+    BUILD_CACHE = 'build cache'
+
+    # Within an owner, containers go first: they hold on to their images and volumes
+    KINDS = ['container', 'image', 'volume', 'data directory', 'build cache']
+
+    # Versioned service data directories in ~/.anydev
+    _DATA_DIR_P = re.compile(r'^(?P<prefix>mysql|postgresql|mongodb)-(?P<version>.+)$')
+
+    def __init__(self):
+        self.config = Configuration()
+        self.settings = self.config.get_gc_settings()
+        self.state_file = os.path.join(self.config.config_dir, 'gc.json')
+        self.state = self._load_state()
+        # The root .env names the services' compose project, whatever the checkout is called
+        self.services_compose_names = {self._get_compose_name(self.config.cli_root_dir),
+                                       EphemeralDatabases.PROJECT_NAME}
+        self.configured_versions = set()
+
+    @staticmethod
+    def parse_budget(value) -> int:
+        """Parses a disk budget: a size such as '50GB' or '1.5TiB', or a number of gigabytes."""
+        value = str(value).strip()
+        if re.fullmatch(r'[\d.]+', value):
+            return int(float(value) * 1000 ** 3)
+        size = ResourceStats.parse_size(value)
+        if not size:
+            raise ValueError(f"Invalid disk budget: {value}. Use a size such as 50GB.")
+        return int(size)
+
+    # ---------
+    # Scanning
+    # ---------
+
+    def scan(self) -> list:
+        """
+        Lists AnyDev's artifacts and records last-used times for owners that are running.
+
+        Returns:
+            list: Dicts with kind, id, name, size (bytes), owner_type, owner, last_used (timestamp or None), and
+                  protected (the reason it's kept, or None).
+
+        Raises:
+            RuntimeError: If Docker isn't running.
+        """
+        result = subprocess.run(['docker', 'system', 'df', '-v', '--format', '{{json .}}'], capture_output=True,
+                                text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Unable to read Docker's disk usage: {result.stderr.strip() or 'is Docker running?'}")
+        usage = json.loads(result.stdout)
+
+        owners = self._get_project_owners()
+        service_images = self._get_service_images()
+        self.configured_versions = {f"{details['service']} {details['tag']}" for details in service_images.values()}
+        artifacts = (
+            self._scan_containers(owners, service_images)
+            + self._scan_images(usage.get('Images') or [], owners, service_images)
+            + self._scan_volumes(usage.get('Volumes') or [], owners)
+            + self._scan_data_directories(service_images)
+            + self._scan_build_cache(usage.get('BuildCache') or [])
+        )
+
+        now = time.time()
+        running = {artifact['owner_key'] for artifact in artifacts if artifact.pop('running', False)}
+        for key in running:
+            self.state['last_used'][key] = now
+        self._save_state()
+
+        protect_after = now - float(self.settings['protect_days']) * 86400
+        by_owner = {}
+        for artifact in artifacts:
+            by_owner.setdefault(artifact['owner_key'], []).append(artifact)
+        for key, owned in by_owner.items():
+            recorded = [self.state['last_used'].get(key)] + [artifact.pop('touched', None) for artifact in owned]
+            last_used = max([when for when in recorded if when] or [0]) or None
+            for artifact in owned:
+                artifact['last_used'] = last_used
+                if key in running:
+                    artifact['protected'] = 'running'
+                elif not artifact['protected'] and artifact['owner_type'] == self.PROJECT and last_used \
+                        and last_used > protect_after:
+                    artifact['protected'] = 'recently used'
+        return artifacts
+
+    def summarize(self, artifacts: list) -> list:
+        """
+        Totals artifacts by owner, least recently used first.
+
+        Returns:
+            list: Dicts with owner_type, owner, last_used, artifacts, size, reclaimable, and protected.
+        """
+        owners = {}
+        for artifact in artifacts:
+            owner = owners.setdefault(artifact['owner_key'], {
+                'owner_type':  artifact['owner_type'],
+                'owner':       artifact['owner'],
+                'last_used':   artifact['last_used'],
+                'artifacts':   0,
+                'size':        0,
+                'reclaimable': 0,
+                'protected':   None,
+            })
+            owner['artifacts'] += 1
+            owner['size'] += artifact['size']
+            if artifact['protected']:
+                owner['protected'] = owner['protected'] or artifact['protected']
+            else:
+                owner['reclaimable'] += artifact['size']
+        return sorted(owners.values(), key=lambda owner: owner['last_used'] or 0)
+
+    # ---------
+    # Eviction
+    # ---------
+
+    @classmethod
+    def plan(cls, artifacts: list, budget: int) -> list:
+        """
+        Picks the artifacts to remove to bring AnyDev's disk usage down to the budget: the least recently used
+        owners' unprotected artifacts first.
+
+        Returns:
+            list: The artifacts to remove, in order. May not reach the budget if too much is protected.
+        """
+        total = sum(artifact['size'] for artifact in artifacts)
+        candidates = sorted(
+            (artifact for artifact in artifacts if not artifact['protected']),
+            key=lambda artifact: (artifact['last_used'] or 0, artifact['owner_key'], cls.KINDS.index(artifact['kind']))
+        )
+        evictions = []
+        for artifact in candidates:
+            if total <= budget:
+                break
+            evictions.append(artifact)
+            total -= artifact['size']
+        return evictions
+
+    def evict(self, artifacts: list, progress: callable = None) -> list:
+        """
+        Removes artifacts, in order.
+
+        Returns:
+            list: (artifact, error) tuples, where error is None on success.
+        """
+        results = []
+        for artifact in artifacts:
+            error = self._remove(artifact)
+            results.append((artifact, error))
+            if progress:
+                progress(artifact, error)
+        return results
+
+    def _remove(self, artifact: dict) -> None or str:
+        if artifact['kind'] == 'data directory':
+            # Database files belong to the container's user, so remove them from a container
+            command = ['docker', 'run', '--rm', '-v', f"{self.config.config_dir}:/anydev", ProjectVolumes.HELPER_IMAGE,
+                       'rm', '-rf', f"/anydev/{artifact['name']}"]
+        else:
+            command = {
+                'container':   ['docker', 'rm', artifact['id']],
+                'image':       ['docker', 'image', 'rm', artifact['id']],
+                'volume':      ['docker', 'volume', 'rm', artifact['id']],
+                'build cache': ['docker', 'builder', 'prune', '--force'],
+            }[artifact['kind']]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            error = (result.stderr or result.stdout).strip().splitlines()
+            return error[-1] if error else f"exited with {result.returncode}"
+        return None
+
+    # ---------
+    # Owners
+    # ---------
+
+    def _get_project_owners(self) -> dict:
+        """
+        Maps compose project names to their owners. Projects seen registered before are remembered, so their
+        leftovers can still be attributed once they've been removed.
+        """
+        owners = {}
+        for name, details in self.config.get_registered_projects().items():
+            compose_name = self._get_compose_name(details.get('path', ''))
+            owners[compose_name] = (self.PROJECT, name)
+            self.state['projects'][compose_name] = name
+            key = self._owner_key(self.PROJECT, name)
+            if details.get('last_used'):
+                self.state['last_used'][key] = max(self.state['last_used'].get(key) or 0, details['last_used'])
+        for compose_name, name in self.state['projects'].items():
+            if compose_name not in owners:
+                owners[compose_name] = (self.REMOVED_PROJECT, name)
+        return owners
+
+    def _get_service_images(self) -> dict:
+        """
+        Maps the shared services' image repositories to their service, configured tag, data directory prefix, and
+        whether the tag is a setting (so other tags are the service's other versions).
+        """
+        images = {}
+        compose_file = os.path.join(self.config.cli_root_dir, 'docker-compose.yml')
+        uninterpolated = ComposeFiles.load(compose_file, env={}).get('services') or {}
+        for service_name, service in (ComposeFiles.load(compose_file).get('services') or {}).items():
+            repository, _, tag = (service.get('image') or '').rpartition(':')
+            if not repository or '/' in tag:
+                continue
+            prefix, data_dirs = None, set()
+            for host_path, _ in ComposeFiles.get_bind_mounts(service, self.config.cli_root_dir):
+                match = self._DATA_DIR_P.match(os.path.basename(host_path))
+                if match and os.path.dirname(os.path.realpath(host_path)) == os.path.realpath(self.config.config_dir):
+                    prefix = match.group('prefix')
+                    data_dirs.add(match.group(0))
+            images[repository] = {
+                'service':   service_name,
+                'tag':       tag,
+                'versioned': (uninterpolated.get(service_name) or {}).get('image') != service.get('image'),
+                'prefix':    prefix,
+                'data_dirs': data_dirs,
+            }
+        return images
+
+    # ---------
+    # Artifacts
+    # ---------
+
+    def _scan_containers(self, owners: dict, service_images: dict) -> list:
+        result = subprocess.run(['docker', 'ps', '-a', '--size', '--no-trunc', '--format', '{{json .}}'],
+                                capture_output=True, text=True)
+        artifacts = []
+        for line in result.stdout.splitlines():
+            try:
+                container = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            labels = self._parse_labels(container.get('Labels'))
+            compose_name = labels.get('com.docker.compose.project', '')
+            if compose_name in self.services_compose_names:
+                owner = self._get_service_owner(container.get('Image', ''), service_images)
+            else:
+                owner = owners.get(compose_name)
+            if owner is None:
+                continue
+            artifacts.append(self._artifact(
+                'container', container['ID'], container.get('Names', ''),
+                # "12kB (virtual 1.2GB)": only the writable layer belongs to the container
+                ResourceStats.parse_size((container.get('Size') or '').split(' (')[0]),
+                owner, running=container.get('State') in ['running', 'paused', 'restarting'],
+                touched=self._parse_time(container.get('CreatedAt'))
+            ))
+        return artifacts
+
+    def _scan_images(self, images: list, owners: dict, service_images: dict) -> list:
+        dangling = [image['ID'] for image in images if image.get('Repository') == '<none>']
+        dangling_projects = self._get_image_projects(dangling)
+
+        artifacts = []
+        for image in images:
+            repository, tag = image.get('Repository', ''), image.get('Tag', '')
+            owner = None
+            if repository in service_images and (service_images[repository]['versioned']
+                                                 or tag == service_images[repository]['tag']):
+                owner = self._get_service_owner(f"{repository}:{tag}", service_images)
+            elif repository == '<none>':
+                owner = owners.get(dangling_projects.get(self._short_id(image['ID'])))
+            else:
+                # Compose names the images it builds <project>-<service> (or <project>_<service> before v2)
+                for name in sorted(owners, key=len, reverse=True):
+                    if repository.startswith((f"{name}-", f"{name}_")):
+                        owner = owners[name]
+                        break
+            if owner is None:
+                continue
+            artifacts.append(self._artifact(
+                'image', image['ID'], f"{repository}:{tag}" if repository != '<none>' else image['ID'][:19],
+                # Layers shared with other images aren't freed by removing this one
+                ResourceStats.parse_size(image.get('UniqueSize') or image.get('Size') or ''),
+                owner, touched=self._parse_time(image.get('CreatedAt'))
+            ))
+        return artifacts
+
+    def _scan_volumes(self, volumes: list, owners: dict) -> list:
+        artifacts = []
+        for volume in volumes:
+            labels = self._parse_labels(volume.get('Labels'))
+            owner = owners.get(labels.get('com.docker.compose.project'))
+            if owner is None:
+                continue
+            artifacts.append(self._artifact('volume', volume['Name'], volume['Name'],
+                                            ResourceStats.parse_size(volume.get('Size') or ''), owner))
+        return artifacts
+
+    def _scan_data_directories(self, service_images: dict) -> list:
+        services = {details['prefix']: (repository, details) for repository, details in service_images.items()
+                    if details['prefix']}
+        directories = []
+        for entry in sorted(os.listdir(self.config.config_dir)) if os.path.isdir(self.config.config_dir) else []:
+            match = self._DATA_DIR_P.match(entry)
+            if match and match.group('prefix') in services \
+                    and os.path.isdir(os.path.join(self.config.config_dir, entry)):
+                directories.append((entry, match))
+        if not directories:
+            return []
+
+        # Measured in a container: database files usually belong to the container's user
+        script = ('for d in "$@"; do echo "$(du -sk "$d" | cut -f1) '
+                  '$(find "$d" -maxdepth 2 -type f -exec stat -c %Y {} + 2>/dev/null | sort -n | tail -1) $d"; done')
+        result = subprocess.run(['docker', 'run', '--rm', '-v', f"{self.config.config_dir}:/anydev:ro",
+                                 ProjectVolumes.HELPER_IMAGE, 'sh', '-c', script, 'sh']
+                                + [f"/anydev/{entry}" for entry, _ in directories], capture_output=True, text=True)
+        measured = {}
+        for line in result.stdout.splitlines():
+            parts = line.split(' ', 2)
+            if len(parts) == 3 and parts[0].isdigit():
+                measured[os.path.basename(parts[2])] = (int(parts[0]) * 1024, float(parts[1]) if parts[1] else None)
+
+        artifacts = []
+        for entry, match in directories:
+            repository, details = services[match.group('prefix')]
+            active = entry in details['data_dirs']
+            version = details['tag'] if active else match.group('version')
+            size, modified = measured.get(entry, (0, None))
+            artifacts.append(self._artifact(
+                'data directory', entry, entry, size, (self.SERVICE, f"{details['service']} {version}"),
+                touched=modified, protected='configured' if active else None
+            ))
+        return artifacts
+
+    def _scan_build_cache(self, records: list) -> list:
+        unused = [record for record in records if not record.get('InUse')]
+        if not unused:
+            return []
+        size = sum(ResourceStats.parse_size(record.get('Size') or '') for record in unused)
+        last_used = max((self._parse_time(record.get('LastUsedAt') or record.get('CreatedAt')) or 0
+                         for record in unused), default=0)
+        return [self._artifact('build cache', 'build-cache', f"{len(unused)} unused record(s)", size,
+                               (self.BUILD_CACHE, 'Docker build cache'), touched=last_used or None)]
+
+    # -------
+    # Helpers
+    # -------
+
+    def _get_service_owner(self, image: str, service_images: dict) -> tuple:
+        repository, _, tag = image.rpartition(':')
+        details = service_images.get(repository)
+        if details is None:
+            return self.SERVICE, image
+        return self.SERVICE, f"{details['service']} {tag}"
+
+    def _artifact(self, kind: str, artifact_id: str, name: str, size: float, owner: tuple, running: bool = False,
+                  touched: float = None, protected: str = None) -> dict:
+        owner_type, owner_name = owner
+        if protected is None and owner_type == self.SERVICE and owner_name in self.configured_versions:
+            protected = 'configured'
+        return {
+            'kind':       kind,
+            'id':         artifact_id,
+            'name':       name,
+            'size':       int(size),
+            'owner_type': owner_type,
+            'owner':      owner_name,
+            'owner_key':  self._owner_key(owner_type, owner_name),
+            'protected':  protected,
+            'running':    running,
+            'touched':    touched,
+        }
+
+    def _get_image_projects(self, image_ids: list) -> dict:
+        """Reads the compose project label of images that have lost their name (replaced by a rebuild)."""
+        if not image_ids:
+            return {}
+        result = subprocess.run(['docker', 'image', 'inspect', '--format',
+                                 '{{.Id}} {{index .Config.Labels "com.docker.compose.project"}}'] + image_ids,
+                                capture_output=True, text=True)
+        projects = {}
+        for line in result.stdout.splitlines():
+            image_id, _, project = line.partition(' ')
+            if project and project != '<no value>':
+                projects[self._short_id(image_id)] = project
+        return projects
+
+    def _get_compose_name(self, path: str) -> str:
+        env = ComposeFiles.get_env(path) if os.path.isdir(path) else {}
+        compose = ComposeFiles.load(os.path.join(path, 'docker-compose.yml'))
+        return self._normalize(env.get('COMPOSE_PROJECT_NAME') or compose.get('name') or os.path.basename(path))
+
+    @staticmethod
+    def _normalize(name: str) -> str:
+        # Compose's own normalization of project names
+        return re.sub(r'[^a-z0-9_-]', '', name.lower())
+
+    @staticmethod
+    def _short_id(image_id: str) -> str:
+        return image_id.split(':', 1)[-1][:12]
+
+    @staticmethod
+    def _owner_key(owner_type: str, owner: str) -> str:
+        return f"{owner_type}:{owner}"
+
+    @staticmethod
+    def _parse_labels(labels) -> dict:
+        """Parses Docker's "key=value,key=value" label strings."""
+        if isinstance(labels, dict):
+            return labels
+        parsed = {}
+        for pair in (labels or '').split(','):
+            key, _, value = pair.partition('=')
+            if key:
+                parsed[key.strip()] = value
+        return parsed
+
+    @staticmethod
+    def _parse_time(value: str) -> None or float:
+        """Parses Docker's "2024-05-01 12:00:00 +0000 UTC" timestamps."""
+        try:
+            return datetime.datetime.strptime((value or '')[:25], '%Y-%m-%d %H:%M:%S %z').timestamp()
+        except ValueError:
+            return None
+
+    def _load_state(self) -> dict:
+        state = {'projects': {}, 'last_used': {}}
+        try:
+            with open(self.state_file, 'r') as f:
+                state |= json.load(f)
+        except (OSError, ValueError):
+            pass
+        return state
+
+    def _save_state(self) -> None:
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        with open(self.state_file, 'w') as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
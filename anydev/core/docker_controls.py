@@ -1,5 +1,6 @@
 import json
 import subprocess
+import time
 
 from anydev.core.cli_output import CliOutput
 
@@ -8,7 +9,7 @@ class DockerHelpers:
     """Helper functions for AnyDev projects."""
 
     @staticmethod
-    def restart_composition(path: str = '.', profiles: list = []) -> None:
+    def restart_composition(path: str = '.', profiles: list = [], compose_files: list = None) -> None:
 
         # Stop if already running
         DockerHelpers.stop_composition(path)
@@ -24,8 +25,13 @@ class DockerHelpers:
         for profile in profiles:
             profile_args.extend(["--profile", profile])
 
+        # Layer any extra compose files (e.g. overrides) on top of the default one
+        file_args = []
+        for compose_file in compose_files or []:
+            file_args.extend(["-f", compose_file])
+
         # Create the up command using profile args
-        up_cmd = ['docker-compose'] + profile_args + ['up', '-d']
+        up_cmd = ['docker-compose'] + file_args + profile_args + ['up', '-d']
 
         # Run the up command with any profiles
         result = subprocess.run(up_cmd, cwd=path)
@@ -36,6 +42,34 @@ class DockerHelpers:
         else:
             CliOutput.success('Composition containers successfully started!')
 
+    @staticmethod
+    def start_composition(path: str = '.', profiles: list = None, extra_args: list = None,
+                          capture: bool = True, compose_files: list = None,
+                          project_name: str = None) -> subprocess.CompletedProcess:
+        """
+        Starts (or updates) a composition without stopping it first and without exiting on failure.
+        Useful when several compositions are started at once and the caller reports the results.
+
+        Args:
+            path (str): The path to the Docker composition directory.
+            profiles (list): Profiles to enable.
+            extra_args (list): Extra arguments for `docker compose up` (e.g. service names).
+            capture (bool): Capture output instead of printing it.
+            compose_files (list): Compose files to use instead of the directory's default (e.g. with overrides).
+            project_name (str): Compose project name, overriding the directory's COMPOSE_PROJECT_NAME.
+
+        Returns:
+            subprocess.CompletedProcess: The result of `docker compose up -d`.
+        """
+        file_args = ['-p', project_name] if project_name else []
+        for compose_file in compose_files or []:
+            file_args.extend(["-f", compose_file])
+        profile_args = []
+        for profile in profiles or []:
+            profile_args.extend(["--profile", profile])
+        up_cmd = ['docker', 'compose'] + file_args + profile_args + ['up', '-d'] + (extra_args or [])
+        return subprocess.run(up_cmd, cwd=path, capture_output=capture, text=True)
+
     @staticmethod
     def stop_composition(path: str = '.') -> None:
         """
@@ -85,6 +119,199 @@ class DockerHelpers:
 
         return False
 
+    @staticmethod
+    def get_composition_containers(path: str = '.', include_stopped: bool = False,
+                                   compose_files: list = None, project_name: str = None) -> list:
+        """
+        Lists the containers of the composition at the specified path.
+
+        Args:
+            path (str): The path to the Docker composition directory. Defaults to the current directory.
+            include_stopped (bool): Include stopped containers.
+            compose_files (list): Compose files to use instead of the directory's default.
+            project_name (str): Compose project name, overriding the directory's COMPOSE_PROJECT_NAME.
+
+        Returns:
+            list: One dict per container, as reported by `docker compose ps --format json`.
+        """
+        file_args = ['-p', project_name] if project_name else []
+        for compose_file in compose_files or []:
+            file_args.extend(["-f", compose_file])
+        proc_command = ['docker', 'compose'] + file_args + ['ps', '--format', 'json'] + (['--all'] if include_stopped else [])
+        result = subprocess.run(proc_command, capture_output=True, text=True, cwd=path)
+        output = result.stdout.strip()
+        if not output:
+            return []
+
+        try:
+            # Older compose versions print a single JSON array instead of one object per line
+            if output.startswith('['):
+                return json.loads(output)
+            return [json.loads(line) for line in output.splitlines() if line.strip()]
+        except json.JSONDecodeError as e:
+            CliOutput.warning(f"Failed to parse Docker ps output: {e}")
+            return []
+
+    @staticmethod
+    def exec_in_container(container: str, command: list, env: dict = None, include_stderr: bool = False) -> str:
+        """
+        Runs a command in a running container and returns its output.
+
+        Args:
+            container (str): The container name.
+            command (list): The command and its arguments.
+            env (dict): Environment variables to set for the command (e.g. passwords, kept off the command line).
+            include_stderr (bool): Append stderr to the output (for tools that report results there).
+
+        Raises:
+            RuntimeError: With the last line of the command's error output, if it fails.
+        """
+        env_args = []
+        for key, value in (env or {}).items():
+            env_args += ['-e', f"{key}={value}"]
+        result = subprocess.run(['docker', 'exec'] + env_args + [container] + command, capture_output=True, text=True)
+        if result.returncode != 0:
+            error = (result.stderr or result.stdout).strip().splitlines()
+            raise RuntimeError(error[-1] if error else f"{command[0]} failed in {container}")
+        return result.stdout + result.stderr if include_stderr else result.stdout
+
+    @staticmethod
+    def is_service_running(service: str, path: str = '.') -> bool:
+        """
+        Is a single service of the composition at the specified path running?
+        """
+        result = subprocess.run(
+            ['docker', 'compose', '--profile', '*', 'ps', '--status', 'running', '-q', service],
+            capture_output=True, text=True, cwd=path
+        )
+        return bool(result.stdout.strip())
+
+    @staticmethod
+    def stop_service(service: str, path: str = '.') -> None:
+        """
+        Stops (without removing) a single service of the composition at the specified path.
+        """
+        result = subprocess.run(['docker', 'compose', '--profile', '*', 'stop', service], cwd=path)
+        if result.returncode != 0:
+            CliOutput.error(f"Failed to stop {service}!", True, result.returncode)
+
+    @staticmethod
+    def start_service(service: str, path: str = '.') -> None:
+        """
+        Starts a single, previously created service of the composition at the specified path.
+        """
+        result = subprocess.run(['docker', 'compose', '--profile', '*', 'start', service], cwd=path)
+        if result.returncode != 0:
+            CliOutput.error(f"Failed to start {service}!", True, result.returncode)
+
+    @staticmethod
+    def suspend_composition(path: str = '.', action: str = 'stop') -> bool:
+        """
+        Suspends a composition without removing its containers, so it can be resumed quickly.
+
+        Args:
+            path (str): The path to the Docker composition directory.
+            action (str): Either 'stop' (frees memory) or 'pause' (freezes processes, keeps memory).
+
+        Returns:
+            bool: True if Docker suspended the composition.
+        """
+        result = subprocess.run(['docker', 'compose', action], capture_output=True, text=True, cwd=path)
+        return result.returncode == 0
+
+    @staticmethod
+    def resume_composition(path: str = '.', action: str = 'stop') -> bool:
+        """
+        Resumes a composition previously suspended with `suspend_composition`.
+
+        Args:
+            path (str): The path to the Docker composition directory.
+            action (str): The action used to suspend it ('stop' or 'pause').
+
+        Returns:
+            bool: True if Docker resumed the composition.
+        """
+        resume_cmd = 'unpause' if action == 'pause' else 'start'
+        result = subprocess.run(['docker', 'compose', resume_cmd], capture_output=True, text=True, cwd=path)
+        return result.returncode == 0
+
+    @staticmethod
+    def wait_for_composition(path: str = '.', timeout: float = 60, interval: float = 0.25) -> bool:
+        """
+        Waits until every container in a composition is running and, where a healthcheck exists, healthy.
+
+        Args:
+            path (str): The path to the Docker composition directory.
+            timeout (float): Maximum number of seconds to wait.
+            interval (float): Seconds between checks.
+
+        Returns:
+            bool: True if the composition became ready before the timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            containers = DockerHelpers.get_composition_containers(path, include_stopped=True)
+            if containers and all(
+                    container.get('State') == 'running' and container.get('Health', '') in ('', 'healthy')
+                    for container in containers
+            ):
+                return True
+            time.sleep(interval)
+        return False
+
+    @staticmethod
+    def wait_for_containers(names: list, timeout: float = 60, interval: float = 0.25) -> bool:
+        """
+        Waits until the named containers are running and, where a healthcheck exists, healthy.
+        Unlike wait_for_composition, only the given containers count (e.g. the shared services of some profiles).
+
+        Args:
+            names (list): Container names.
+            timeout (float): Maximum number of seconds to wait.
+            interval (float): Seconds between checks.
+
+        Returns:
+            bool: True if every container became ready before the timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            containers = DockerHelpers.inspect_containers(names) if names else []
+            if len(containers) == len(names) and all(
+                    container.get('State', {}).get('Running')
+                    and container.get('State', {}).get('Health', {}).get('Status', 'healthy') == 'healthy'
+                    for container in containers
+            ):
+                return True
+            time.sleep(interval)
+        return False
+
+    @staticmethod
+    def inspect_containers(container_ids: list = None, include_stopped: bool = False) -> list:
+        """
+        Gets full `docker inspect` details (including labels) for containers in a single call.
+
+        Args:
+            container_ids (list): Container IDs or names to inspect. Defaults to all running containers.
+            include_stopped (bool): Include stopped containers when no IDs are given.
+
+        Returns:
+            list: A list of container description dicts. Empty if nothing matched or Docker is unavailable.
+        """
+        if container_ids is None:
+            ps_cmd = ['docker', 'ps', '-q', '--no-trunc'] + (['-a'] if include_stopped else [])
+            result = subprocess.run(ps_cmd, capture_output=True, text=True)
+            container_ids = result.stdout.split()
+
+        if not container_ids:
+            return []
+
+        result = subprocess.run(['docker', 'inspect'] + list(container_ids), capture_output=True, text=True)
+        try:
+            return json.loads(result.stdout) if result.stdout.strip() else []
+        except json.JSONDecodeError as e:
+            CliOutput.warning(f"Failed to parse Docker inspect output: {e}")
+            return []
+
     @staticmethod
     def is_docker_running() -> bool:
         """
@@ -0,0 +1,332 @@
+import http.client
+import json
+import os
+import select
+import shutil
+import signal
+import socket
+import struct
+import sys
+import threading
+import urllib.parse
+
+from anydev.configuration import Configuration
+
+
+class DockerEngineError(Exception):
+    """Raised when the Docker Engine API returns an error."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a unix domain socket."""
+
+    def __init__(self, socket_path: str, timeout: float = None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class DockerEngine:
+    """
+    Minimal Docker Engine API client for running commands in project containers.
+
+    Talks to the engine's unix socket directly, so running a command costs a couple of API round trips instead of
+    starting the docker CLI and having Compose load the project. API calls share one keep-alive connection; each
+    exec's output is streamed over its own hijacked connection, as the engine requires.
+    """
+
+    API_VERSION = 'v1.41'
+
+    SOCKET_PATHS = [
+        '/var/run/docker.sock',
+        '~/.docker/run/docker.sock',        # Docker Desktop (macOS)
+        '~/.orbstack/run/docker.sock',      # OrbStack
+        '~/.colima/default/docker.sock',    # Colima
+    ]
+
+    def __init__(self, socket_path: str = None):
+        self.socket_path = socket_path or self.find_socket()
+        if not self.socket_path:
+            raise DockerEngineError(0, "Unable to find the Docker socket. Is Docker running?")
+        self._conn = _UnixHTTPConnection(self.socket_path)
+
+        config = Configuration()
+        self.cache_file = os.path.join(config.config_dir, 'cache', 'containers.json')
+
+    @classmethod
+    def find_socket(cls) -> None or str:
+        """Finds the engine's unix socket, honoring DOCKER_HOST."""
+        docker_host = os.environ.get('DOCKER_HOST', '')
+        if docker_host.startswith('unix://'):
+            return docker_host[len('unix://'):]
+        if docker_host:
+            # TCP/SSH engines aren't supported by this client
+            return None
+        for path in cls.SOCKET_PATHS:
+            path = os.path.expanduser(path)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def request(self, method: str, path: str, body: dict = None, query: dict = None) -> None or dict or list:
+        """
+        Makes an API request on the shared keep-alive connection.
+
+        Returns:
+            The decoded JSON response, or None for empty responses.
+        """
+        url = f"/{self.API_VERSION}{path}"
+        if query:
+            url += '?' + urllib.parse.urlencode(query)
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload is not None else {}
+
+        for attempt in range(2):
+            try:
+                self._conn.request(method, url, body=payload, headers=headers)
+                response = self._conn.getresponse()
+                data = response.read()
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # The engine closed the idle connection; reconnect once
+                self._conn.close()
+                if attempt:
+                    raise
+
+        if response.status >= 400:
+            try:
+                message = json.loads(data).get('message', data.decode())
+            except (ValueError, AttributeError):
+                message = data.decode(errors='replace')
+            raise DockerEngineError(response.status, message)
+        return json.loads(data) if data else None
+
+    # ----------
+    # Containers
+    # ----------
+
+    def find_project_container(self, path: str, service: str = None, hostname: str = None) -> None or str:
+        """
+        Finds the running container for a project's service (or, without a service, the project's main container).
+
+        Args:
+            path (str): The project directory.
+            service (str): Compose service name.
+            hostname (str): The project's hostname, whose container is the main one (e.g. foo.site.test).
+
+        Returns:
+            str: The container ID, or None if it isn't running.
+        """
+        filters = {'label': [f"com.docker.compose.project.working_dir={os.path.abspath(path)}"]}
+        if service:
+            filters['label'].append(f"com.docker.compose.service={service}")
+        containers = self.request('GET', '/containers/json', query={'filters': json.dumps(filters)})
+        if not containers:
+            return None
+        if not service and hostname:
+            for container in containers:
+                if f"/{hostname}" in container.get('Names', []):
+                    return container['Id']
+        if not service:
+            for container in containers:
+                if container.get('Labels', {}).get('com.docker.compose.service') == 'app':
+                    return container['Id']
+        return containers[0]['Id']
+
+    def get_cached_container(self, path: str, service: str = None, hostname: str = None,
+                             refresh: bool = False) -> None or str:
+        """
+        Gets a project's container ID from the cache, resolving (and caching) it if needed.
+        """
+        key = f"{os.path.abspath(path)}#{service or ''}"
+        cache = self._load_cache()
+        if not refresh and key in cache:
+            return cache[key]
+
+        container_id = self.find_project_container(path, service, hostname)
+        if container_id:
+            cache[key] = container_id
+        else:
+            cache.pop(key, None)
+        self._save_cache(cache)
+        return container_id
+
+    # -----
+    # Exec
+    # -----
+
+    def exec_create(self, container_id: str, command: list, tty: bool = False, stdin: bool = False,
+                    workdir: str = None, env: dict = None) -> str:
+        """Creates an exec instance and returns its ID."""
+        body = {
+            'Cmd':          command,
+            'AttachStdin':  stdin,
+            'AttachStdout': True,
+            'AttachStderr': True,
+            'Tty':          tty,
+        }
+        if workdir:
+            body['WorkingDir'] = workdir
+        if env:
+            body['Env'] = [f"{key}={value}" for key, value in env.items()]
+        return self.request('POST', f"/containers/{container_id}/exec", body)['Id']
+
+    def exec_start(self, exec_id: str, tty: bool = False, stdin: bool = False, stdout=None, stderr=None) -> int:
+        """
+        Starts an exec instance, streaming its output (and optionally this process's stdin) until it exits.
+
+        Args:
+            exec_id (str): ID from exec_create().
+            tty (bool): Whether the exec was created with a TTY. The local terminal is put in raw mode.
+            stdin (bool): Forward this process's stdin to the command.
+            stdout: Binary stream for the command's stdout. Defaults to sys.stdout.
+            stderr: Binary stream for the command's stderr. Defaults to sys.stderr.
+
+        Returns:
+            int: The command's exit code.
+        """
+        stdout = stdout or sys.stdout.buffer
+        stderr = stderr or sys.stderr.buffer
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.socket_path)
+        body = json.dumps({'Detach': False, 'Tty': tty}).encode()
+        sock.sendall(
+            f"POST /{self.API_VERSION}/exec/{exec_id}/start HTTP/1.1\r\n"
+            f"Host: localhost\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: Upgrade\r\n"
+            f"Upgrade: tcp\r\n\r\n".encode() + body
+        )
+
+        # Read the response headers; whatever follows is the raw stream
+        buffer = b''
+        while b'\r\n\r\n' not in buffer:
+            data = sock.recv(4096)
+            if not data:
+                raise DockerEngineError(0, "The engine closed the connection.")
+            buffer += data
+        headers, buffer = buffer.split(b'\r\n\r\n', 1)
+        status = int(headers.split(b' ', 2)[1])
+        if status not in [101, 200]:
+            raise DockerEngineError(status, headers.decode(errors='replace'))
+
+        restore_terminal = None
+        if tty:
+            restore_terminal = self._enter_raw_mode(exec_id)
+        if stdin:
+            threading.Thread(target=self._forward_stdin, args=(sock,), daemon=True).start()
+
+        try:
+            self._copy_output(sock, buffer, tty, stdout, stderr)
+        finally:
+            if restore_terminal:
+                restore_terminal()
+            sock.close()
+
+        return self.request('GET', f"/exec/{exec_id}/json").get('ExitCode') or 0
+
+    def run(self, container_id: str, command: list, tty: bool = False, stdin: bool = False, workdir: str = None,
+            env: dict = None, stdout=None, stderr=None) -> int:
+        """Runs a command in a container, like `docker exec`. Returns its exit code."""
+        exec_id = self.exec_create(container_id, command, tty, stdin, workdir, env)
+        return self.exec_start(exec_id, tty, stdin, stdout, stderr)
+
+    @staticmethod
+    def _copy_output(sock: socket.socket, buffer: bytes, tty: bool, stdout, stderr) -> None:
+        """Copies the exec stream to stdout/stderr, demultiplexing it when there's no TTY."""
+        if tty:
+            if buffer:
+                stdout.write(buffer)
+                stdout.flush()
+            while data := sock.recv(65536):
+                stdout.write(data)
+                stdout.flush()
+            return
+
+        # Multiplexed frames: 1 byte stream type, 3 bytes padding, 4 bytes big-endian length, then the payload
+        while True:
+            while len(buffer) < 8:
+                data = sock.recv(65536)
+                if not data:
+                    return
+                buffer += data
+            stream_type, length = struct.unpack('>BxxxL', buffer[:8])
+            while len(buffer) < 8 + length:
+                data = sock.recv(max(65536, 8 + length - len(buffer)))
+                if not data:
+                    return
+                buffer += data
+            target = stderr if stream_type == 2 else stdout
+            target.write(buffer[8:8 + length])
+            target.flush()
+            buffer = buffer[8 + length:]
+
+    @staticmethod
+    def _forward_stdin(sock: socket.socket) -> None:
+        """Copies this process's stdin to the exec, then half-closes the socket so the command sees EOF."""
+        fd = sys.stdin.fileno()
+        try:
+            while True:
+                readable, _, _ = select.select([fd], [], [])
+                if not readable:
+                    continue
+                data = os.read(fd, 65536)
+                if not data:
+                    break
+                sock.sendall(data)
+            sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+    def _enter_raw_mode(self, exec_id: str):
+        """Puts the local terminal in raw mode and keeps the exec's TTY size in sync. Returns a restore callback."""
+        import termios
+        import tty as tty_module
+
+        fd = sys.stdin.fileno()
+        if not os.isatty(fd):
+            return None
+        saved = termios.tcgetattr(fd)
+        tty_module.setraw(fd)
+
+        def resize(*args):
+            size = shutil.get_terminal_size()
+            try:
+                self.request('POST', f"/exec/{exec_id}/resize", query={'h': size.lines, 'w': size.columns})
+            except DockerEngineError:
+                pass
+
+        resize()
+        previous_handler = signal.signal(signal.SIGWINCH, resize) if hasattr(signal, 'SIGWINCH') else None
+
+        def restore():
+            termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+            if previous_handler is not None:
+                signal.signal(signal.SIGWINCH, previous_handler)
+
+        return restore
+
+    def _load_cache(self) -> dict:
+        try:
+            with open(self.cache_file, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_cache(self, cache: dict) -> None:
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        temp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(cache, f)
+        os.replace(temp_file, self.cache_file)
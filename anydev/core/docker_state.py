@@ -0,0 +1,102 @@
+import json
+import subprocess
+import threading
+
+
+class DockerState:
+    """
+    Container state, either queried on demand or kept current from `docker events`.
+
+    A normal `anydev` run calls `docker ps` when it needs container state. Inside the daemon, `watch()` keeps a
+    snapshot in memory and refreshes it (debounced) whenever Docker reports a container event, so lookups cost no
+    Docker round trip at all.
+    """
+
+    # The watching instance, when running inside the daemon
+    _live = None
+
+    def __init__(self, debounce: float = 0.2):
+        self.debounce = debounce
+        self._containers = []
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._stop = threading.Event()
+        self._events_process = None
+
+    @classmethod
+    def get_containers(cls) -> list:
+        """
+        Lists all containers (running or not), like `docker ps -a`.
+
+        Returns:
+            list: Container dicts from `docker ps --format json` (Names, State, Status, Image, Labels, ...).
+        """
+        if cls._live is not None:
+            with cls._live._lock:
+                return list(cls._live._containers)
+        return cls.snapshot()
+
+    @staticmethod
+    def snapshot() -> list:
+        """Queries Docker for every container."""
+        try:
+            result = subprocess.run(['docker', 'ps', '-a', '--no-trunc', '--format', '{{json .}}'],
+                                    capture_output=True, text=True)
+        except OSError:
+            return []
+        if result.returncode != 0:
+            return []
+
+        containers = []
+        for line in result.stdout.splitlines():
+            try:
+                containers.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return containers
+
+    def watch(self) -> None:
+        """Starts keeping the snapshot current in background threads."""
+        self._containers = self.snapshot()
+        DockerState._live = self
+        threading.Thread(target=self._follow_events, daemon=True).start()
+        threading.Thread(target=self._refresh_on_change, daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._changed.set()
+        if self._events_process:
+            self._events_process.terminate()
+        if DockerState._live is self:
+            DockerState._live = None
+
+    def _follow_events(self) -> None:
+        """Follows `docker events`, restarting it if Docker goes away and comes back."""
+        while not self._stop.is_set():
+            try:
+                self._events_process = subprocess.Popen(
+                    ['docker', 'events', '--filter', 'type=container', '--format', '{{.Action}}'],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    text=True
+                )
+                for _ in self._events_process.stdout:
+                    self._changed.set()
+                self._events_process.wait()
+            except OSError:
+                pass
+            # Docker stopped (or isn't installed). Resync and retry shortly.
+            self._changed.set()
+            self._stop.wait(5)
+
+    def _refresh_on_change(self) -> None:
+        while not self._stop.is_set():
+            self._changed.wait()
+            if self._stop.is_set():
+                return
+            # Let bursts of events (e.g. a compose up) settle into a single refresh
+            self._stop.wait(self.debounce)
+            self._changed.clear()
+            containers = self.snapshot()
+            with self._lock:
+                self._containers = containers
@@ -0,0 +1,126 @@
+import os
+import statistics
+import subprocess
+import time
+
+from anydev.configuration import Configuration
+from anydev.core.docker_controls import DockerHelpers
+
+
+class EphemeralDatabases:
+    """
+    In-memory copies of the shared databases for test runs, defined in docker-compose.ephemeral.yml.
+
+    They use the same profiles as their persistent counterparts, but run as a separate compose project
+    (anydev-ephemeral) with their own container names and host ports, so both can run at once. Starting them again
+    recreates the containers, which gives every run an empty database.
+    """
+
+    COMPOSE_FILE = 'docker-compose.ephemeral.yml'
+
+    # Passed explicitly: the root .env's COMPOSE_PROJECT_NAME would otherwise win over the file's `name:` and put the
+    # ephemeral containers in the persistent services' project
+    PROJECT_NAME = 'anydev-ephemeral'
+
+    # Profile -> where each instance can be reached: host port (persistent, ephemeral), in-network host name
+    # (persistent, ephemeral), and the env variable prefix used to point tests at it
+    DATABASES = {
+        'mysql':    {'ports': (3306, 3307), 'containers': ('anydev-mysql', 'anydev-mysql-ephemeral'), 'env': 'MYSQL'},
+        'postgres': {'ports': (5432, 5433), 'containers': ('anydev-postgres', 'anydev-postgres-ephemeral'),
+                     'env': 'POSTGRES'},
+        'mongo':    {'ports': (27017, 27018), 'containers': ('anydev-mongo', 'anydev-mongo-ephemeral'),
+                     'env': 'MONGO'},
+    }
+
+    def __init__(self):
+        self.config = Configuration()
+        self.compose_file = os.path.join(self.config.cli_root_dir, self.COMPOSE_FILE)
+
+    def get_profiles(self, databases: list = None) -> list:
+        """
+        Gets the database profiles to run ephemerally: the ones asked for, or the active ones.
+
+        Raises:
+            ValueError: If a requested database doesn't have an ephemeral instance.
+        """
+        unknown = [database for database in databases or [] if database not in self.DATABASES]
+        if unknown:
+            raise ValueError(f"No ephemeral instance for {', '.join(unknown)}. Use {', '.join(self.DATABASES)}.")
+        if databases:
+            return list(dict.fromkeys(databases))
+        active_profiles = self.config.get_active_profiles()
+        return [profile for profile in self.DATABASES if profile in active_profiles]
+
+    def start(self, profiles: list) -> subprocess.CompletedProcess:
+        """Starts fresh (empty) ephemeral instances of the given databases."""
+        return DockerHelpers.start_composition(
+            self.config.cli_root_dir,
+            profiles,
+            extra_args=['--force-recreate', '--renew-anon-volumes'],
+            capture=False,
+            compose_files=[self.compose_file],
+            project_name=self.PROJECT_NAME
+        )
+
+    def stop(self) -> subprocess.CompletedProcess:
+        """Stops and removes every ephemeral instance, discarding their data."""
+        return subprocess.run(
+            ['docker', 'compose', '-p', self.PROJECT_NAME, '-f', self.compose_file, '--profile', '*', 'down'],
+            cwd=self.config.cli_root_dir
+        )
+
+    def get_running(self) -> list:
+        """Lists the profiles whose ephemeral instance is running."""
+        containers = DockerHelpers.get_composition_containers(self.config.cli_root_dir,
+                                                              compose_files=[self.compose_file],
+                                                              project_name=self.PROJECT_NAME)
+        running = {container.get('Service') for container in containers}
+        return [profile for profile in self.DATABASES if f"{profile}-ephemeral" in running]
+
+    def get_env(self, profiles: list, ephemeral: bool) -> dict:
+        """
+        Gets the variables that point a test run at one mode's instances.
+
+        From the host, <DB>_HOST and <DB>_PORT (e.g. MYSQL_HOST=127.0.0.1, MYSQL_PORT=3307). Inside the anydev
+        network, ANYDEV_<DB>_HOST names the container (the port is the database's usual one).
+        """
+        index = 1 if ephemeral else 0
+        env = {'ANYDEV_DB_MODE': 'ephemeral' if ephemeral else 'persistent'}
+        for profile in profiles:
+            database = self.DATABASES[profile]
+            env[f"{database['env']}_HOST"] = '127.0.0.1'
+            env[f"{database['env']}_PORT"] = str(database['ports'][index])
+            env[f"ANYDEV_{database['env']}_HOST"] = database['containers'][index]
+        return env
+
+    def compare(self, command: str, profiles: list, repeat: int = 1, progress: callable = None) -> dict:
+        """
+        Times a command against the persistent and the ephemeral instances, alternating between them so both see
+        the same conditions (warm caches, background load).
+
+        Args:
+            command (str): A shell command, e.g. the project's test suite.
+            profiles (list): The databases to point it at.
+            repeat (int): Runs per mode.
+            progress (callable): Called with (mode, run number, seconds, exit code) after each run.
+
+        Returns:
+            dict: Mode -> {'times': [seconds], 'failures': count, 'median', 'min'}
+        """
+        results = {mode: {'times': [], 'failures': 0} for mode in ['persistent', 'ephemeral']}
+        for run in range(1, repeat + 1):
+            for mode in results:
+                env = os.environ | self.get_env(profiles, mode == 'ephemeral')
+                started = time.monotonic()
+                exit_code = subprocess.run(command, shell=True, env=env).returncode
+                seconds = time.monotonic() - started
+                results[mode]['times'].append(seconds)
+                if exit_code != 0:
+                    results[mode]['failures'] += 1
+                if progress:
+                    progress(mode, run, seconds, exit_code)
+
+        for result in results.values():
+            result['median'] = statistics.median(result['times'])
+            result['min'] = min(result['times'])
+        return results
@@ -0,0 +1,304 @@
+import os
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from anydev.configuration import Configuration
+from anydev.core.compose_files import ComposeFiles
+from anydev.core.connection_poolers import ConnectionPoolers
+from anydev.core.docker_controls import DockerHelpers
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class GroupStartup:
+    """
+    Starts a named group of projects (from the `groups` section of config.yaml) as a dependency graph.
+
+    The shared services, with the group's profiles added to the active ones, come first. Each project then starts as
+    soon as everything it depends on is ready, with independent projects started in parallel (bounded by the
+    group's concurrency). A project is ready once its containers are running and healthy and, if it has a
+    `ready_url`, that URL answers without a server error. Projects are brought up with `docker compose up -d`, without
+    the stop/start cycle of `anydev project up`.
+
+    Config format:
+
+        groups:
+          shop:
+            profiles: [mysql, redis]
+            concurrency: 4
+            projects:
+              - api.site.test
+              - name: storefront.site.test
+                depends_on: [api.site.test]
+                ready_url: https://storefront.site.test/health
+    """
+
+    # The shared services node, which every project depends on
+    SERVICES = '@services'
+
+    DEFAULT_CONCURRENCY = 4
+    PROJECT_KEYS = {'name', 'depends_on', 'ready_url'}
+
+    def __init__(self, group: str, concurrency: int = None, ready_timeout: float = 120):
+        self.config = Configuration()
+        self.group = group
+        self.concurrency = concurrency
+        self.ready_timeout = ready_timeout
+        # Node name -> {'path', 'depends_on', 'ready_url'}
+        self.nodes = {}
+        self.profiles = []
+
+    @staticmethod
+    def complete_group_name(ctx, param, incomplete: str) -> list:
+        """Shell completion for group names (answered from the completion cache when it's fresh)."""
+        from click.shell_completion import CompletionItem
+        return [
+            CompletionItem(name, help=', '.join(GroupStartup.get_project_names(group)))
+            for name, group in Configuration().get_groups().items() if name.startswith(incomplete)
+        ]
+
+    @staticmethod
+    def get_project_names(group: dict) -> list:
+        """Lists the project names in a group's config, whatever form each entry takes."""
+        return [entry.get('name', '?') if isinstance(entry, dict) else str(entry)
+                for entry in (group or {}).get('projects') or []]
+
+    def validate(self, require_docker: bool = True) -> list:
+        """
+        Resolves the group's projects and checks the dependency graph.
+
+        Args:
+            require_docker (bool): Also check that Docker is running (not needed just to plan).
+
+        Returns:
+            list: Problems found. Empty if the group can be started.
+        """
+        groups = self.config.get_groups()
+        if self.group not in groups:
+            return [f"No group named '{self.group}' in {self.config.config_file}."]
+        group = groups[self.group] or {}
+        if not isinstance(group, dict) or not isinstance(group.get('projects'), list) or not group['projects']:
+            return [f"Group '{self.group}' needs a 'projects' list."]
+
+        errors = []
+        self.profiles = list(group.get('profiles') or [])
+        self.concurrency = max(1, int(self.concurrency or group.get('concurrency') or self.DEFAULT_CONCURRENCY))
+
+        registry = self.config.get_registry()
+        self.nodes = {self.SERVICES: {'path': self.config.cli_root_dir, 'depends_on': [], 'ready_url': None}}
+        for entry in group['projects']:
+            entry = entry if isinstance(entry, dict) else {'name': str(entry)}
+            name = str(entry.get('name', ''))
+            unknown_keys = set(entry) - self.PROJECT_KEYS
+            if unknown_keys:
+                errors.append(f"{name or 'Project'}: unknown key(s) {', '.join(sorted(unknown_keys))}.")
+            if name in self.nodes:
+                errors.append(f"{name}: listed more than once.")
+                continue
+            project = registry.get(name)
+            if project is None:
+                errors.append(f"{name}: not a registered project.")
+                continue
+            if not os.path.isdir(project['path']):
+                errors.append(f"{name}: {project['path']} doesn't exist.")
+            depends_on = entry.get('depends_on') or []
+            self.nodes[name] = {
+                'path':       project['path'],
+                'depends_on': [self.SERVICES] + [str(dependency) for dependency in
+                                                 (depends_on if isinstance(depends_on, list) else [depends_on])],
+                'ready_url':  entry.get('ready_url'),
+            }
+
+        for name, node in self.nodes.items():
+            for dependency in node['depends_on']:
+                if dependency not in self.nodes:
+                    errors.append(f"{name}: depends on {dependency}, which isn't in the group.")
+        if not errors:
+            cycle = self.find_cycle()
+            if cycle:
+                errors.append(f"Dependency cycle: {' -> '.join(cycle)}.")
+        if require_docker and not DockerHelpers.is_docker_running():
+            errors.append("Docker isn't running.")
+        return errors
+
+    def find_cycle(self) -> list:
+        """Returns one dependency cycle as a list of node names (first node repeated at the end), or []."""
+        visiting, visited = [], set()
+
+        def visit(name: str) -> list:
+            if name in visiting:
+                return visiting[visiting.index(name):] + [name]
+            if name in visited:
+                return []
+            visiting.append(name)
+            for dependency in self.nodes[name]['depends_on']:
+                cycle = visit(dependency)
+                if cycle:
+                    return cycle
+            visiting.pop()
+            visited.add(name)
+            return []
+
+        for name in self.nodes:
+            cycle = visit(name)
+            if cycle:
+                return cycle
+        return []
+
+    def plan(self) -> list:
+        """
+        Groups the nodes into stages: each stage only depends on earlier ones.
+
+        Returns:
+            list: A list of stages, each a list of node names.
+        """
+        stages, placed = [], set()
+        while len(placed) < len(self.nodes):
+            stage = sorted(name for name, node in self.nodes.items()
+                           if name not in placed and set(node['depends_on']) <= placed)
+            stages.append(stage)
+            placed.update(stage)
+        return stages
+
+    def run(self, progress: callable = None) -> dict:
+        """
+        Starts every node as soon as its dependencies are ready.
+
+        Args:
+            progress (callable): Optional callback, called with (node name, result) when a node starts and finishes.
+
+        Returns:
+            dict: Node name -> result with 'status' (ready, failed, or skipped), 'error', 'waited_on' (the dependency
+                  that finished last), and times in seconds since the start: 'queued', 'started', 'up', 'finished'.
+        """
+        started = time.monotonic()
+        results = {name: {'status': 'pending', 'error': None, 'waited_on': None} for name in self.nodes}
+        lock = threading.Lock()
+
+        def start_node(name: str) -> str:
+            result = results[name]
+            result['started'] = time.monotonic() - started
+            if progress:
+                progress(name, result)
+            try:
+                error = self._start(name)
+                result['up'] = time.monotonic() - started
+                if not error and not self._wait_until_ready(name):
+                    error = f"not ready after {self.ready_timeout:g}s"
+            except Exception as e:
+                error = str(e)
+            with lock:
+                result['finished'] = time.monotonic() - started
+                result['status'] = 'failed' if error else 'ready'
+                result['error'] = error
+            if progress:
+                progress(name, result)
+            return name
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            running = set()
+            while True:
+                with lock:
+                    for name, node in self.nodes.items():
+                        result = results[name]
+                        if result['status'] != 'pending':
+                            continue
+                        dependencies = [results[dependency] for dependency in node['depends_on']]
+                        if any(dependency['status'] in ['failed', 'skipped'] for dependency in dependencies):
+                            result['status'] = 'skipped'
+                            result['error'] = 'a dependency failed'
+                            if progress:
+                                progress(name, result)
+                        elif all(dependency['status'] == 'ready' for dependency in dependencies):
+                            result['status'] = 'queued'
+                            result['queued'] = time.monotonic() - started
+                            if node['depends_on']:
+                                result['waited_on'] = max(node['depends_on'],
+                                                          key=lambda dependency: results[dependency]['finished'])
+                            running.add(executor.submit(start_node, name))
+                if not running:
+                    break
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+
+        # Anything still pending depended on something skipped in the last round
+        for result in results.values():
+            if result['status'] == 'pending':
+                result['status'] = 'skipped'
+                result['error'] = 'a dependency failed'
+        return results
+
+    @staticmethod
+    def critical_path(results: dict) -> list:
+        """
+        Finds the chain of nodes that determined the total wall time: the node that finished last, the dependency
+        it waited for, and so on back to the start.
+
+        Returns:
+            list: Node names, first to last.
+        """
+        finished = {name: result for name, result in results.items() if result.get('finished') is not None}
+        if not finished:
+            return []
+        path = [max(finished, key=lambda name: finished[name]['finished'])]
+        while results[path[0]].get('waited_on'):
+            path.insert(0, results[path[0]]['waited_on'])
+        return path
+
+    def _start(self, name: str) -> None or str:
+        """Brings one node's containers up. Returns an error message, or None."""
+        if name == self.SERVICES:
+            ConnectionPoolers().write_configs()
+            process = DockerHelpers.start_composition(
+                self.config.cli_root_dir,
+                self._get_profiles(),
+                compose_files=self.config.get_service_compose_files()
+            )
+        else:
+            process = DockerHelpers.start_composition(self.nodes[name]['path'])
+        if process.returncode != 0:
+            output = (process.stderr or process.stdout or '').strip().splitlines()
+            return output[-1] if output else f"docker compose exited with {process.returncode}"
+        return None
+
+    def _wait_until_ready(self, name: str) -> bool:
+        deadline = time.monotonic() + self.ready_timeout
+        if name == self.SERVICES:
+            compose = ComposeFiles.load(os.path.join(self.config.cli_root_dir, 'docker-compose.yml'))
+            profiles = set(self._get_profiles())
+            containers = [
+                service['container_name'] for service in (compose.get('services') or {}).values()
+                if service.get('container_name')
+                and (not service.get('profiles') or profiles.intersection(service['profiles']))
+            ]
+            return DockerHelpers.wait_for_containers(containers, self.ready_timeout)
+
+        if not DockerHelpers.wait_for_composition(self.nodes[name]['path'], self.ready_timeout):
+            return False
+        ready_url = self.nodes[name]['ready_url']
+        return self._wait_for_url(ready_url, deadline - time.monotonic()) if ready_url else True
+
+    def _get_profiles(self) -> list:
+        """The active profiles plus the group's own."""
+        active_profiles = self.config.get_active_profiles()
+        return active_profiles + [profile for profile in self.profiles if profile not in active_profiles]
+
+    @staticmethod
+    def _wait_for_url(url: str, timeout: float, interval: float = 0.5) -> bool:
+        """Polls a URL until it answers with anything but a server error."""
+        # Local certificates may not be trusted by Python's CA bundle
+        context = ssl._create_unverified_context()
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                with urllib.request.urlopen(url, timeout=max(interval, 2), context=context):
+                    return True
+            except urllib.error.HTTPError as e:
+                if e.code < 500:
+                    return True
+            except (urllib.error.URLError, OSError):
+                pass
+            if time.monotonic() + interval > deadline:
+                return False
+            time.sleep(interval)
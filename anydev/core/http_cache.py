@@ -0,0 +1,184 @@
+import datetime
+import json
+import os
+import re
+import subprocess
+
+from anydev.configuration import Configuration
+from dotenv import dotenv_values, set_key, unset_key
+
+
+class HttpCache:
+    """
+    The shared HTTP cache (`cache` profile): an nginx proxy_cache that projects can route their requests through.
+
+    A project opts in by setting ANYDEV_HTTP_SERVICE=http-cache@file in its .env, which points its Traefik routers at
+    the cache instead of its own container. The cache forwards misses to the container named in the X-Cache-Upstream
+    header the project's routers add, and writes a JSON access log (see services/http-cache.conf) that stats() reads.
+    """
+
+    ENV_KEY = 'ANYDEV_HTTP_SERVICE'
+    TRAEFIK_SERVICE = 'http-cache@file'
+    CONTAINER = 'anydev-http-cache'
+    CACHE_DIR = '/var/cache/nginx/anydev'
+
+    # nginx $upstream_cache_status values answered from the cache
+    HIT_STATUSES = {'HIT', 'STALE', 'UPDATING', 'REVALIDATED'}
+
+    _MAX_AGE_P = re.compile(r'(?:s-maxage|max-age)\s*=\s*"?(\d+)')
+
+    def __init__(self):
+        self.config = Configuration()
+        self.log_file = os.path.join(self.config.config_dir, 'logs', 'http-cache.log')
+
+    def read_log(self, host: str = None, since_minutes: float = None):
+        """
+        Yields entries from the cache's access log.
+
+        Args:
+            host (str): Only yield requests for this hostname (e.g. foo.site.test).
+            since_minutes (float): Only yield requests from the last N minutes.
+        """
+        if not os.path.isfile(self.log_file):
+            return
+        cutoff = None
+        if since_minutes:
+            cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=since_minutes)
+
+        with open(self.log_file, 'r', errors='replace') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if host and entry.get('host') != host:
+                    continue
+                if cutoff:
+                    try:
+                        if datetime.datetime.fromisoformat(entry.get('time', '')) < cutoff:
+                            continue
+                    except ValueError:
+                        continue
+                yield entry
+
+    def stats(self, host: str = None, since_minutes: float = None) -> dict:
+        """
+        Summarizes the access log: totals, per-host figures, and per-URL hit rates and cacheability.
+
+        Returns:
+            dict: {'total': {...}, 'hosts': {host: {...}}, 'urls': {(host, uri): {...}}}. Each summary has
+                  requests, cached (requests that went through the cache), hits, bytes and hit_bytes. URL summaries
+                  also have a cacheability verdict, from the most recent response that came from the application.
+        """
+        def summary() -> dict:
+            return {'requests': 0, 'cached': 0, 'hits': 0, 'bytes': 0, 'hit_bytes': 0}
+
+        result = {'total': summary(), 'hosts': {}, 'urls': {}}
+        for entry in self.read_log(host, since_minutes):
+            entry_host = entry.get('host', '')
+            url_key = (entry_host, entry.get('uri', ''))
+            if url_key not in result['urls']:
+                result['urls'][url_key] = summary() | {'verdict': None}
+
+            cache_status = entry.get('cache', '')
+            hit = cache_status in self.HIT_STATUSES
+            size = self._to_int(entry.get('bytes'))
+            for bucket in [result['total'], result['hosts'].setdefault(entry_host, summary()), result['urls'][url_key]]:
+                bucket['requests'] += 1
+                bucket['cached'] += 1 if cache_status else 0
+                bucket['hits'] += 1 if hit else 0
+                bucket['bytes'] += size
+                bucket['hit_bytes'] += size if hit else 0
+
+            # Hits don't carry fresh response headers worth judging; keep the verdict from the response that filled
+            # the cache
+            if not hit or result['urls'][url_key]['verdict'] is None:
+                result['urls'][url_key]['verdict'] = self.cacheability(entry)
+        return result
+
+    @staticmethod
+    def cacheability(entry: dict) -> tuple:
+        """
+        Judges whether a response could be stored by the cache, the way nginx decides.
+
+        Args:
+            entry (dict): An access log entry.
+
+        Returns:
+            tuple: (cacheable, reason). The reason explains why a response isn't cacheable, or is empty.
+        """
+        if entry.get('cache') in HttpCache.HIT_STATUSES:
+            return True, ''
+        if entry.get('method') not in ['GET', 'HEAD']:
+            return False, f"{entry.get('method')} request"
+        if entry.get('cache') == 'BYPASS':
+            return False, 'bypassed'
+
+        cache_control = (entry.get('cache_control') or '').lower()
+        for directive in ['no-store', 'private', 'no-cache']:
+            if directive in cache_control:
+                return False, f"Cache-Control: {directive}"
+        if str(entry.get('set_cookie')) == '1':
+            return False, 'sets cookies'
+        if (entry.get('vary') or '').strip() == '*':
+            return False, 'Vary: *'
+
+        max_ages = [int(value) for value in HttpCache._MAX_AGE_P.findall(cache_control)]
+        if max_ages:
+            return (True, '') if max(max_ages) > 0 else (False, 'max-age=0')
+        if entry.get('expires'):
+            return True, ''
+        return False, 'no caching headers'
+
+    @staticmethod
+    def is_enabled(path: str) -> bool:
+        """Checks whether a project routes its requests through the cache."""
+        env_file = os.path.join(path, '.env')
+        if not os.path.isfile(env_file):
+            return False
+        return dotenv_values(env_file).get(HttpCache.ENV_KEY) == HttpCache.TRAEFIK_SERVICE
+
+    @staticmethod
+    def set_enabled(path: str, enabled: bool) -> None:
+        """
+        Opts a project in or out of the cache. Takes effect when the project's containers are next (re)created.
+
+        Args:
+            path (str): The project directory.
+            enabled (bool): Whether to route the project's requests through the cache.
+        """
+        env_file = os.path.join(path, '.env')
+        if enabled:
+            set_key(env_file, HttpCache.ENV_KEY, HttpCache.TRAEFIK_SERVICE)
+        elif os.path.isfile(env_file) and HttpCache.ENV_KEY in dotenv_values(env_file):
+            unset_key(env_file, HttpCache.ENV_KEY)
+
+    @staticmethod
+    def purge(host: str = None) -> bool:
+        """
+        Removes cached responses, for every site or just one host.
+
+        nginx keeps each response's cache key ("<scheme><host><uri>") in its cache file, so files for a host are
+        found by their KEY line. Cache file names are hex digests, so they're safe to pass through xargs.
+
+        Returns:
+            bool: Whether the purge ran.
+        """
+        if host:
+            pattern = f"^KEY: https\\?{re.escape(host)}/"
+            script = f"grep -rl -e '{pattern}' {HttpCache.CACHE_DIR} | xargs -r rm -f"
+        else:
+            script = f"find {HttpCache.CACHE_DIR} -type f -delete"
+        try:
+            result = subprocess.run(['docker', 'exec', HttpCache.CONTAINER, 'sh', '-c', script],
+                                    capture_output=True, text=True)
+        except OSError:
+            return False
+        return result.returncode == 0
+
+    @staticmethod
+    def _to_int(value) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return 0
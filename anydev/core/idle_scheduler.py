@@ -0,0 +1,306 @@
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+
+from anydev.commands.project_helpers import ProjectHelpers
+from anydev.configuration import Configuration
+from anydev.core.cli_output import CliOutput
+from anydev.core.docker_controls import DockerHelpers
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class IdleScheduler:
+    """
+    Suspends idle projects and wakes them up again on their next request.
+
+    Activity is read from Traefik's JSON access log. Projects with no requests for the configured timeout are
+    stopped (or paused) through DockerHelpers. Once suspended, Traefik has no route for the project's host, so its
+    next request falls through to the low-priority `anydev-wake` route (see services/traefik.dynamic.yml), which
+    points at the small HTTP server run here. That server resumes the project, waits for it to be ready and
+    redirects the browser back to the original URL.
+    """
+
+    # Fixed, because services/traefik.dynamic.yml points the anydev-wake route at it
+    WAKE_PORT = 7780
+
+    def __init__(self, timeout_minutes: float = None, action: str = None, check_interval: float = None):
+        self.config = Configuration()
+        settings = self.config.get_idle_settings()
+
+        self.timeout = float(timeout_minutes if timeout_minutes is not None else settings['timeout_minutes']) * 60
+        self.action = action or settings['action']
+        self.check_interval = float(check_interval or settings['check_interval'])
+
+        self.access_log = os.path.join(self.config.config_dir, 'logs', 'traefik-access.log')
+        self.state_file = os.path.join(self.config.config_dir, 'suspended.json')
+
+        # Hostname -> project path, for every registered project
+        self.projects = {}
+        # Hostname -> monotonic time of last request
+        self.last_seen = {}
+        # Hostname -> suspend action, for projects suspended by AnyDev
+        self.suspended = self._load_suspended()
+        # Resume latencies, in seconds
+        self.resume_latencies = []
+
+        self._lock = threading.Lock()
+        self._project_locks = {}
+        self._stop = threading.Event()
+
+    def run(self) -> None:
+        """
+        Runs the log follower, the wake server and the idle checks until interrupted.
+        """
+        self.refresh_projects()
+
+        # Every project gets a full timeout's grace period from startup
+        now = time.monotonic()
+        for hostname in self.projects:
+            self.last_seen[hostname] = now
+
+        follower = threading.Thread(target=self.follow_access_log, daemon=True)
+        follower.start()
+
+        address = self.get_wake_address()
+        server = ThreadingHTTPServer((address, self.WAKE_PORT), self._make_handler())
+        server.daemon_threads = True
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+
+        CliOutput.info(
+            f"Suspending projects idle for {self.timeout / 60:g} minutes ({self.action}). "
+            f"Wake server listening on {address}:{self.WAKE_PORT}. Press Ctrl+C to exit."
+        )
+
+        try:
+            while not self._stop.wait(self.check_interval):
+                self.refresh_projects()
+                self.suspend_idle_projects()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._stop.set()
+            server.shutdown()
+            self.report()
+
+    @staticmethod
+    def get_wake_address() -> str:
+        """
+        The address Traefik reaches the host on (host.docker.internal), so the wake server isn't open to the rest of
+        the network. On Linux that's the default bridge's gateway; Docker Desktop forwards it to the host's localhost.
+        """
+        if platform.system() == 'Linux':
+            result = subprocess.run(
+                ['docker', 'network', 'inspect', 'bridge', '--format', '{{range .IPAM.Config}}{{.Gateway}} {{end}}'],
+                capture_output=True, text=True
+            )
+            gateways = [gateway for gateway in result.stdout.split() if '.' in gateway] if result.returncode == 0 \
+                else []
+            if gateways:
+                return gateways[0]
+        return '127.0.0.1'
+
+    def refresh_projects(self) -> None:
+        """Rebuilds the hostname -> path map from the registered projects."""
+        projects = {}
+        for name, details in self.config.get_registered_projects().items():
+            path = details.get('path')
+            if not path or not os.path.isdir(path):
+                continue
+            hostname = ProjectHelpers.get_project_hostname(path)
+            if hostname:
+                projects[hostname] = path
+        with self._lock:
+            self.projects = projects
+
+    def follow_access_log(self) -> None:
+        """
+        Follows Traefik's access log (like `tail -F`) and records the last request time for each host.
+        """
+        log_file = None
+        inode = None
+        while not self._stop.is_set():
+            if log_file is None:
+                try:
+                    log_file = open(self.access_log, 'r')
+                    inode = os.fstat(log_file.fileno()).st_ino
+                    # Only new requests matter
+                    log_file.seek(0, os.SEEK_END)
+                except FileNotFoundError:
+                    self._stop.wait(1)
+                    continue
+
+            line = log_file.readline()
+            if line:
+                self.record_request(line)
+                continue
+
+            # Nothing new. Reopen if the log was rotated or truncated.
+            try:
+                stat = os.stat(self.access_log)
+                if stat.st_ino != inode or stat.st_size < log_file.tell():
+                    log_file.close()
+                    log_file = None
+                    continue
+            except FileNotFoundError:
+                pass
+            self._stop.wait(0.5)
+
+        if log_file:
+            log_file.close()
+
+    def record_request(self, line: str) -> None:
+        """Parses one JSON access log entry and marks its host as active."""
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            return
+        hostname = str(entry.get('RequestHost', '')).split(':')[0].lower()
+        if hostname:
+            with self._lock:
+                self.last_seen[hostname] = time.monotonic()
+
+    def suspend_idle_projects(self) -> None:
+        """Suspends every running project that hasn't received a request within the timeout."""
+        now = time.monotonic()
+        with self._lock:
+            projects = dict(self.projects)
+
+        for hostname, path in projects.items():
+            with self._lock:
+                idle_for = now - self.last_seen.setdefault(hostname, now)
+                if idle_for < self.timeout or hostname in self.suspended:
+                    continue
+
+            containers = DockerHelpers.get_composition_containers(path)
+            if not any(container.get('State') == 'running' for container in containers):
+                continue
+
+            CliOutput.info(f"{hostname} has been idle for {idle_for / 60:.0f} minutes. Suspending ({self.action})...")
+            if DockerHelpers.suspend_composition(path, self.action):
+                with self._lock:
+                    self.suspended[hostname] = self.action
+                    self._save_suspended()
+                self.config.get_registry().set_status_by_path(path, 'suspended')
+                CliOutput.success(f"Suspended {hostname}.")
+            else:
+                CliOutput.warning(f"Unable to suspend {hostname}.")
+
+    def wake(self, hostname: str) -> tuple:
+        """
+        Resumes a suspended project and waits for it to be ready.
+
+        Args:
+            hostname (str): The requested hostname.
+
+        Returns:
+            tuple: (status, latency) where status is 'resumed', 'running', 'unknown', or 'failed'.
+        """
+        with self._lock:
+            path = self.projects.get(hostname)
+            project_lock = self._project_locks.setdefault(hostname, threading.Lock())
+            self.last_seen[hostname] = time.monotonic()
+        if not path:
+            return 'unknown', 0.0
+
+        # Concurrent requests for the same host wait for a single resume
+        with project_lock:
+            started = time.monotonic()
+            with self._lock:
+                action = self.suspended.get(hostname)
+
+            if action is None and any(
+                    container.get('State') == 'running' for container in DockerHelpers.get_composition_containers(path)
+            ):
+                # Already up; Traefik just hasn't picked up its route yet
+                return 'running', 0.0
+
+            if not DockerHelpers.resume_composition(path, action or 'stop') \
+                    or not DockerHelpers.wait_for_composition(path):
+                return 'failed', time.monotonic() - started
+
+            latency = time.monotonic() - started
+            with self._lock:
+                self.suspended.pop(hostname, None)
+                self._save_suspended()
+                self.resume_latencies.append(latency)
+            self.config.get_registry().set_status_by_path(path, 'running')
+            CliOutput.success(f"Resumed {hostname} in {latency:.2f}s.")
+            return 'resumed', latency
+
+    def report(self) -> None:
+        """Prints a summary of resume latencies."""
+        if not self.resume_latencies:
+            CliOutput.info("No projects were resumed.")
+            return
+        latencies = sorted(self.resume_latencies)
+        CliOutput.info(
+            f"Resumed {len(latencies)} time(s). "
+            f"Latency avg {sum(latencies) / len(latencies):.2f}s, "
+            f"median {latencies[len(latencies) // 2]:.2f}s, max {latencies[-1]:.2f}s."
+        )
+
+    def _load_suspended(self) -> dict:
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_suspended(self) -> None:
+        os.makedirs(self.config.config_dir, exist_ok=True)
+        with open(self.state_file, 'w') as f:
+            json.dump(self.suspended, f)
+
+    def _make_handler(self):
+        """Builds the request handler class for the wake server."""
+        scheduler = self
+
+        class WakeRequestHandler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                hostname = (self.headers.get('X-Forwarded-Host') or self.headers.get('Host') or '')
+                hostname = hostname.split(':')[0].lower()
+                status, latency = scheduler.wake(hostname)
+
+                if status == 'unknown':
+                    self._respond(404, f"{hostname} is not a registered AnyDev project.")
+                elif status == 'failed':
+                    self._respond(502, f"AnyDev was unable to start {hostname}.")
+                elif status == 'resumed':
+                    scheme = self.headers.get('X-Forwarded-Proto', 'https')
+                    self.send_response(307)
+                    self.send_header('Location', f"{scheme}://{hostname}{self.path}")
+                    self.send_header('X-AnyDev-Resume-Latency', f"{latency:.3f}")
+                    self.send_header('Cache-Control', 'no-store')
+                    self.end_headers()
+                else:
+                    # Give Traefik a moment to add the project's route, then retry
+                    self._respond(503, f"Waking up {hostname}...", retry=True)
+
+            do_HEAD = do_GET
+            do_POST = do_GET
+            do_PUT = do_GET
+            do_DELETE = do_GET
+            do_PATCH = do_GET
+            do_OPTIONS = do_GET
+
+            def _respond(self, code: int, message: str, retry: bool = False):
+                refresh = '<meta http-equiv="refresh" content="1">' if retry else ''
+                body = f"<html><head>{refresh}<title>AnyDev</title></head><body><p>{message}</p></body></html>"
+                self.send_response(code)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Cache-Control', 'no-store')
+                if retry:
+                    self.send_header('Retry-After', '1')
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(body.encode())
+
+            def log_message(self, format, *args):
+                pass
+
+        return WakeRequestHandler
@@ -0,0 +1,223 @@
+import os
+import re
+import subprocess
+
+from anydev.configuration import Configuration
+from anydev.core.compose_files import ComposeFiles
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class ImagePrefetcher:
+    """
+    Pulls the images AnyDev needs before they're needed.
+
+    Images are resolved from the shared services in the active profiles and from every registered project's compose
+    file, including the base images (FROM lines) of services that are built from a Dockerfile. Missing images are
+    then pulled concurrently. With a mirror, Docker Hub images are pulled through AnyDev's local pull-through
+    registry (the `registry-mirror` profile) and tagged with their usual names, so repeated pulls never leave the
+    machine.
+    """
+
+    COMPOSE_FILES = ['docker-compose.yml', 'docker-compose.yaml', 'compose.yml', 'compose.yaml']
+    MIRROR = 'localhost:5000'
+
+    _FROM_P = re.compile(r'^\s*FROM\s+(?:--platform=\S+\s+)?(?P<image>\S+)(?:\s+AS\s+(?P<stage>\S+))?', re.IGNORECASE)
+    _ARG_P = re.compile(r'^\s*ARG\s+(?P<name>[A-Za-z_][A-Za-z0-9_]*)(?:=(?P<default>\S*))?', re.IGNORECASE)
+    _LAYER_P = re.compile(r'^(?P<layer>[0-9a-f]{12}): (?P<status>.+)$')
+
+    def __init__(self, jobs: int = 4, force: bool = False, mirror: bool = False):
+        self.config = Configuration()
+        self.jobs = max(1, jobs)
+        self.force = force
+        self.mirror = mirror
+
+    def resolve_images(self) -> dict:
+        """
+        Finds every image referenced by the active shared services and registered projects.
+
+        Returns:
+            dict: Image reference -> list of where it's used (e.g. "services/mysql", "foo.site.test/app").
+        """
+        images = {}
+
+        def add(image: str, source: str) -> None:
+            if image and '$' not in image:
+                images.setdefault(self.normalize(image), []).append(source)
+
+        # Shared services: those without a profile, plus the active profiles
+        active_profiles = set(self.config.get_active_profiles())
+        for service_name, image in self._compose_images(self.config.cli_root_dir, active_profiles):
+            add(image, f"services/{service_name}")
+
+        for name, details in self.config.get_registered_projects().items():
+            path = details.get('path')
+            if not path or not os.path.isdir(path):
+                continue
+            env = ComposeFiles.get_env(path)
+            profiles = {profile for profile in env.get('COMPOSE_PROFILES', '').split(',') if profile}
+            for service_name, image in self._compose_images(path, profiles):
+                add(image, f"{name}/{service_name}")
+
+        return dict(sorted(images.items()))
+
+    def missing_images(self, images: list) -> list:
+        """Lists the images that aren't available locally (or all of them, when forcing)."""
+        if self.force:
+            return list(images)
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            present = dict(zip(images, executor.map(self.is_present, images)))
+        return [image for image in images if not present[image]]
+
+    def prefetch(self, images: list, progress=None) -> dict:
+        """
+        Pulls images concurrently.
+
+        Args:
+            images (list): Image references to pull.
+            progress (callable): Called as progress(image, completed_layers, total_layers, status).
+
+        Returns:
+            dict: Image -> None if pulled, otherwise an error message.
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = {executor.submit(self.pull, image, progress): image for image in images}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        return results
+
+    def pull(self, image: str, progress=None) -> None or str:
+        """
+        Pulls one image, through the mirror when enabled and possible.
+
+        Returns:
+            None or str: None on success, otherwise the error.
+        """
+        mirror_image = self.mirror_reference(image) if self.mirror else None
+        if mirror_image:
+            if self._pull(mirror_image, image, progress) is None:
+                tag = subprocess.run(['docker', 'tag', mirror_image, image], capture_output=True, text=True)
+                if tag.returncode == 0:
+                    subprocess.run(['docker', 'image', 'rm', mirror_image], capture_output=True)
+                    return None
+            if progress:
+                progress(image, 0, 0, "mirror unavailable, pulling directly")
+        return self._pull(image, image, progress)
+
+    def _pull(self, reference: str, image: str, progress=None) -> None or str:
+        """Runs `docker pull`, reporting layer progress for the image."""
+        process = subprocess.Popen(
+            ['docker', 'pull', reference],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True
+        )
+        layers = {}
+        output = []
+        for line in process.stdout:
+            line = line.strip()
+            output.append(line)
+            match = self._LAYER_P.match(line)
+            if match:
+                layers[match.group('layer')] = match.group('status')
+                if progress:
+                    done = sum(1 for status in layers.values() if status in ['Pull complete', 'Already exists'])
+                    progress(image, done, len(layers), match.group('status'))
+        process.wait()
+
+        if process.returncode != 0:
+            return output[-1] if output else f"docker pull exited with {process.returncode}"
+        if progress:
+            progress(image, len(layers), len(layers), "done")
+        return None
+
+    @staticmethod
+    def is_present(image: str) -> bool:
+        result = subprocess.run(['docker', 'image', 'inspect', '--format', '{{.Id}}', image], capture_output=True)
+        return result.returncode == 0
+
+    @staticmethod
+    def normalize(image: str) -> str:
+        """Adds the implicit :latest tag, so the same image isn't pulled twice under two names."""
+        name = image.split('@')[0]
+        if '@' not in image and ':' not in name.rsplit('/', 1)[-1]:
+            return f"{image}:latest"
+        return image
+
+    @classmethod
+    def mirror_reference(cls, image: str) -> None or str:
+        """
+        Gets the mirror's name for a Docker Hub image, or None for images from other registries (the pull-through
+        cache only proxies Docker Hub).
+        """
+        first = image.split('/', 1)[0]
+        if '/' in image and ('.' in first or ':' in first or first == 'localhost'):
+            return None
+        if '/' not in image:
+            image = f"library/{image}"
+        return f"{cls.MIRROR}/{image}"
+
+    def _compose_images(self, directory: str, profiles: set) -> list:
+        """Lists (service, image) pairs for a compose directory, including Dockerfile base images."""
+        compose_file = next(
+            (os.path.join(directory, name) for name in self.COMPOSE_FILES
+             if os.path.isfile(os.path.join(directory, name))),
+            None
+        )
+        if not compose_file:
+            return []
+
+        images = []
+        for service_name, service in (ComposeFiles.load(compose_file).get('services') or {}).items():
+            service = service or {}
+            service_profiles = service.get('profiles') or []
+            if service_profiles and not profiles.intersection(service_profiles):
+                continue
+
+            build = service.get('build')
+            if build:
+                if isinstance(build, str):
+                    build = {'context': build}
+                context = os.path.join(directory, build.get('context', '.'))
+                dockerfile = os.path.join(context, build.get('dockerfile', 'Dockerfile'))
+                args = build.get('args') or {}
+                if isinstance(args, list):
+                    args = dict(arg.split('=', 1) if '=' in arg else (arg, '') for arg in args)
+                images += [(service_name, image) for image in self.dockerfile_base_images(dockerfile, args)]
+            elif service.get('image'):
+                images.append((service_name, service['image']))
+        return images
+
+    @classmethod
+    def dockerfile_base_images(cls, dockerfile: str, build_args: dict = None) -> list:
+        """
+        Reads a Dockerfile's external base images, substituting ARG defaults and build args.
+
+        Args:
+            dockerfile (str): Path to the Dockerfile.
+            build_args (dict): Build args from the compose file (empty values fall back to the ARG default).
+        """
+        try:
+            with open(dockerfile, 'r') as f:
+                lines = f.readlines()
+        except (FileNotFoundError, IsADirectoryError):
+            return []
+
+        build_args = {key: str(value) for key, value in (build_args or {}).items() if value not in [None, '']}
+        args = {}
+        stages = set()
+        images = []
+        for line in lines:
+            arg = cls._ARG_P.match(line)
+            if arg:
+                args[arg.group('name')] = build_args.get(arg.group('name'), (arg.group('default') or '').strip('"\''))
+                continue
+            base = cls._FROM_P.match(line)
+            if not base:
+                continue
+            image = ComposeFiles.interpolate(base.group('image'), args)
+            if base.group('stage'):
+                stages.add(base.group('stage'))
+            if image and image != 'scratch' and image not in stages:
+                images.append(image)
+        return images
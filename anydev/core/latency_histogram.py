@@ -0,0 +1,67 @@
+import math
+
+
+class LatencyHistogram:
+    """
+    A fixed-size histogram of durations, for percentiles over any number of samples in constant memory.
+
+    Buckets grow geometrically (each one about 9% wider than the last), so a percentile read from it is within ~4.5%
+    of the true value, from microseconds to hours. Durations outside the range land in the first or last bucket.
+    """
+
+    # Bucket layout: 8 buckets per doubling, from 1 microsecond up to about 2.3 hours (in seconds)
+    MIN_VALUE = 1e-6
+    BUCKETS_PER_DOUBLING = 8
+    BUCKET_COUNT = 8 * 33
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        """Adds another histogram's samples to this one."""
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> None or float:
+        """
+        Estimates a quantile (0-1) as the midpoint of the bucket it falls in, capped at the largest sample.
+
+        Returns:
+            float: The estimate, or None without samples.
+        """
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                lower, upper = self._bounds(index)
+                return min((lower + upper) / 2, self.max)
+        return self.max
+
+    @property
+    def mean(self) -> None or float:
+        return self.total / self.count if self.count else None
+
+    def _index(self, value: float) -> int:
+        if value <= self.MIN_VALUE:
+            return 0
+        index = int(math.log2(value / self.MIN_VALUE) * self.BUCKETS_PER_DOUBLING)
+        return min(index, self.BUCKET_COUNT - 1)
+
+    def _bounds(self, index: int) -> tuple:
+        lower = self.MIN_VALUE * 2 ** (index / self.BUCKETS_PER_DOUBLING)
+        return (0.0 if index == 0 else lower), self.MIN_VALUE * 2 ** ((index + 1) / self.BUCKETS_PER_DOUBLING)
@@ -0,0 +1,455 @@
+import datetime
+import json
+import os
+import re
+import ssl
+import statistics
+import subprocess
+import time
+import urllib.error
+import urllib.request
+
+from anydev.core.compose_files import ComposeFiles
+from anydev.core.docker_controls import DockerHelpers
+from dotenv import dotenv_values
+
+
+class OpcachePreload:
+    """
+    Generates an OPcache preload script for an apache-php project and wires it into the project's php.local.ini.
+
+    Files to preload come from Xdebug profiles (the files requests actually ran) or from Composer's classmap and
+    PSR-4 directories. They're ordered inside the container, where vendor/ lives, so each file follows the files
+    declaring its parents, interfaces, and traits. The script is then test-loaded with the CLI, and files PHP can't
+    preload are left out.
+
+    Preloaded files aren't checked for changes, so Apache has to be restarted to pick up edits to them.
+    """
+
+    # Written to reports/ so it isn't served from the document root
+    SCRIPT_NAME = 'opcache-preload.php'
+
+    BLOCK_START = '; BEGIN anydev opcache-preload (managed by `anydev project opcache-preload`)'
+    BLOCK_END = '; END anydev opcache-preload'
+
+    # Rounds of test-loading and dropping failing files before giving up
+    MAX_VALIDATION_ROUNDS = 10
+
+    # The template's xdebug.profiler_output_dir
+    PROFILE_DIR = '/var/www/xdebug-profiles'
+
+    # Xdebug's debug mode would try to reach an IDE on every CLI run
+    PHP_ARGS = ['-d', 'xdebug.mode=off']
+
+    # Orders files dependencies first. Run with `php -- <project root> [files...]`; prints the files as JSON.
+    SCANNER = r'''<?php
+$root = $argv[1];
+$composer = "$root/vendor/composer";
+$classmap = is_file("$composer/autoload_classmap.php") ? require "$composer/autoload_classmap.php" : [];
+$classmap = array_change_key_case($classmap);
+$psr4 = is_file("$composer/autoload_psr4.php") ? require "$composer/autoload_psr4.php" : [];
+$candidates = array_slice($argv, 2);
+if (!$candidates) {
+    $candidates = array_values($classmap);
+    foreach ($psr4 as $dirs) {
+        foreach ($dirs as $dir) {
+            if (!is_dir($dir)) {
+                continue;
+            }
+            $files = new RecursiveIteratorIterator(new RecursiveDirectoryIterator($dir, FilesystemIterator::SKIP_DOTS));
+            foreach ($files as $file) {
+                if ($file->getExtension() === 'php') {
+                    $candidates[] = $file->getPathname();
+                }
+            }
+        }
+    }
+    // Test suites aren't loaded by requests
+    $candidates = preg_grep('#/[Tt]ests?/#', $candidates, PREG_GREP_INVERT);
+}
+
+// The file Composer would load a class from
+function locate(string $class): ?string {
+    global $classmap, $psr4;
+    if (isset($classmap[strtolower($class)])) {
+        return realpath($classmap[strtolower($class)]) ?: null;
+    }
+    foreach ($psr4 as $prefix => $dirs) {
+        if (strncmp($class, $prefix, strlen($prefix)) === 0) {
+            foreach ($dirs as $dir) {
+                $file = $dir . '/' . str_replace('\\', '/', substr($class, strlen($prefix))) . '.php';
+                if (is_file($file)) {
+                    return realpath($file);
+                }
+            }
+        }
+    }
+    return null;
+}
+
+// The classes a file's classes extend, implement, or use as traits
+function dependencies(string $file): array {
+    $tokens = token_get_all((string) @file_get_contents($file));
+    $count = count($tokens);
+    $namespace = '';
+    $imports = [];
+    $dependencies = [];
+    $depth = 0;
+    $classDepth = null;
+    $previous = null;
+    $ignored = [T_WHITESPACE, T_COMMENT, T_DOC_COMMENT];
+    $declarations = array_filter([T_CLASS, T_INTERFACE, T_TRAIT, defined('T_ENUM') ? T_ENUM : null]);
+
+    $resolve = function (string $name) use (&$namespace, &$imports): string {
+        if ($name === '' || $name[0] === '\\') {
+            return ltrim($name, '\\');
+        }
+        $first = explode('\\', $name)[0];
+        if (isset($imports[strtolower($first)])) {
+            return $imports[strtolower($first)] . substr($name, strlen($first));
+        }
+        return ltrim("$namespace\\$name", '\\');
+    };
+    // Reads the name starting at $i, leaving $i on the token after it
+    $readName = function (int &$i) use ($tokens, $count, $ignored): string {
+        $name = '';
+        for (; $i < $count; $i++) {
+            $token = $tokens[$i];
+            if (is_array($token) && in_array($token[0], [T_STRING, T_NAME_QUALIFIED, T_NAME_FULLY_QUALIFIED, T_NS_SEPARATOR], true)) {
+                $name .= $token[1];
+            } elseif ($name !== '' || !is_array($token) || !in_array($token[0], $ignored, true)) {
+                break;
+            }
+        }
+        return $name;
+    };
+    $skipTo = function (int &$i, string $end) use ($tokens, $count) {
+        while ($i < $count && $tokens[$i] !== $end) {
+            $i++;
+        }
+    };
+
+    for ($i = 0; $i < $count; $i++) {
+        $token = $tokens[$i];
+        $type = is_array($token) ? $token[0] : $token;
+        if ($type === '{' || $type === T_CURLY_OPEN || $type === T_DOLLAR_OPEN_CURLY_BRACES) {
+            $depth++;
+        } elseif ($type === '}') {
+            $depth--;
+            if ($depth === $classDepth) {
+                $classDepth = null;
+            }
+        } elseif ($type === T_NAMESPACE && $depth === 0) {
+            $i++;
+            $namespace = $readName($i);
+            $imports = [];
+            $i--;
+        } elseif ($type === T_USE && $classDepth === null && $previous !== ')') {
+            // Imports: use A\B [as C], D\E;
+            do {
+                $i++;
+                $name = ltrim($readName($i), '\\');
+                $alias = substr($name, strrpos("\\$name", '\\'));
+                while ($i < $count && is_array($tokens[$i]) && in_array($tokens[$i][0], $ignored, true)) {
+                    $i++;
+                }
+                if (is_array($tokens[$i] ?? null) && $tokens[$i][0] === T_AS) {
+                    $i++;
+                    $alias = $readName($i);
+                }
+                if ($name !== '') {
+                    $imports[strtolower($alias)] = $name;
+                }
+            } while (($tokens[$i] ?? ';') === ',');
+            // Past group imports and `use function`
+            $skipTo($i, ';');
+        } elseif ($type === T_USE && $classDepth !== null && $depth === $classDepth + 1) {
+            // Traits: use A, B [{ conflict resolution }]
+            do {
+                $i++;
+                $dependencies[] = $resolve($readName($i));
+            } while (($tokens[$i] ?? ';') === ',');
+            $skipTo($i, ($tokens[$i] ?? ';') === '{' ? '}' : ';');
+        } elseif (in_array($type, $declarations, true) && !in_array($previous, [T_DOUBLE_COLON, T_NEW], true)) {
+            $classDepth = $depth;
+            for ($i++; $i < $count && $tokens[$i] !== '{'; $i++) {
+                if ((is_array($tokens[$i]) && in_array($tokens[$i][0], [T_EXTENDS, T_IMPLEMENTS], true)) || $tokens[$i] === ',') {
+                    $i++;
+                    $dependencies[] = $resolve($readName($i));
+                    $i--;
+                }
+            }
+            $i--;
+        }
+        if (!is_array($token) || !in_array($token[0], $ignored, true)) {
+            $previous = $type;
+        }
+    }
+    return array_filter($dependencies);
+}
+
+$order = [];
+$visited = [];
+$visit = function (string $file) use (&$visit, &$order, &$visited) {
+    if (isset($visited[$file])) {
+        return;
+    }
+    $visited[$file] = true;
+    foreach (dependencies($file) as $class) {
+        $dependency = locate($class);
+        if ($dependency && $dependency !== $file) {
+            $visit($dependency);
+        }
+    }
+    $order[] = $file;
+};
+foreach (array_unique(array_filter(array_map('realpath', $candidates))) as $file) {
+    $visit($file);
+}
+echo json_encode($order, JSON_UNESCAPED_SLASHES);
+'''
+
+    # PHP's own preload warnings and errors, and the generated script's
+    _FAILED_FILE_P = re.compile(r"(?:preload|Fatal error).*? in (/\S+?\.php) on line|Skipped preloading (/\S+?\.php)")
+
+    def __init__(self, project_path: str):
+        self.project_path = os.path.abspath(project_path)
+        self.env = dotenv_values(os.path.join(self.project_path, '.env'))
+        self.container = f"{self.env.get('HOSTNAME')}.site.test"
+        self.ini_file = os.path.join(self.project_path, 'server', 'php.local.ini')
+        self.source_target, self.reports_target = self._find_mounts()
+        self.script_file = os.path.join(self.project_path, 'reports', self.SCRIPT_NAME)
+        self.script_target = f"{self.reports_target}/{self.SCRIPT_NAME}"
+        self._opcache_loaded = None
+
+    # ------------
+    # Hot files
+    # ------------
+
+    def find_profiled_files(self, profile_dir: str = PROFILE_DIR, limit: int = None) -> list:
+        """
+        Lists the project's PHP files that appear in Xdebug profiles in the container, the most used first.
+
+        Args:
+            profile_dir (str): Where Xdebug writes profiles in the container.
+            limit (int): Keep only this many of the most used files.
+
+        Raises:
+            RuntimeError: If there are no profiles to read.
+        """
+        # File names appear once per profile, the first time each file is referenced
+        result = self._exec(['sh', '-c', f'zcat -f {profile_dir}/cachegrind.out.* 2>/dev/null '
+                                         '| grep -h "^f[lie]=([0-9]*) /"'])
+        counts = {}
+        for line in result.stdout.splitlines():
+            file = line.split(') ', 1)[-1].strip()
+            if file.startswith(self.source_target + '/') and file.endswith('.php'):
+                counts[file] = counts.get(file, 0) + 1
+        if not counts:
+            raise RuntimeError(f"No Xdebug profiles of project files in {profile_dir}. Profile some requests first "
+                               "(xdebug.mode=profile with XDEBUG_TRIGGER).")
+        files = sorted(counts, key=lambda file: -counts[file])
+        return files[:limit] if limit else files
+
+    def order_files(self, files: list = None) -> list:
+        """
+        Orders files dependencies first, inside the container. Without files, uses Composer's classmap and PSR-4
+        directories.
+        """
+        result = self._exec(['php'] + self.PHP_ARGS + ['--', self.source_target] + (files or []), stdin=self.SCANNER)
+        try:
+            return json.loads(result.stdout[result.stdout.index('['):])
+        except ValueError:
+            raise RuntimeError(f"Could not order the files: {(result.stderr or result.stdout).strip()[-300:]}")
+
+    # -----------
+    # Generation
+    # -----------
+
+    def generate(self, files: list) -> tuple:
+        """
+        Writes the preload script, test-loading it and dropping files PHP can't preload until it loads cleanly.
+
+        Returns:
+            tuple: (files preloaded, files skipped)
+        """
+        skipped = []
+        for _ in range(self.MAX_VALIDATION_ROUNDS):
+            self._write_script(files)
+            failed = [file for file in files if file in self.validate()]
+            if not failed:
+                return files, skipped
+            skipped += failed
+            files = [file for file in files if file not in failed]
+        raise RuntimeError(f"The preload script still fails after skipping {len(skipped)} file(s).")
+
+    def validate(self) -> set:
+        """
+        Test-loads the preload script with the CLI.
+
+        Returns:
+            set: Files PHP couldn't preload.
+
+        Raises:
+            RuntimeError: If preloading fails without naming a file.
+        """
+        result = self._exec(['php'] + self.PHP_ARGS + self._extension_args() + [
+            '-d', 'opcache.enable=1', '-d', 'opcache.enable_cli=1',
+            '-d', f"opcache.preload={self.script_target}", '-d', 'opcache.preload_user=www-data',
+            '-d', 'log_errors=1', '-d', 'error_log=', '-d', 'display_errors=stderr',
+            '-r', 'echo "preloaded";'
+        ])
+        output = result.stdout + result.stderr
+        failed = {match.group(1) or match.group(2) for match in self._FAILED_FILE_P.finditer(output)}
+        if 'preloaded' not in result.stdout and not failed:
+            raise RuntimeError(f"PHP failed to preload: {output.strip()[-300:]}")
+        return failed
+
+    # -------
+    # Wiring
+    # -------
+
+    def is_enabled(self) -> bool:
+        return self._read_ini()[1] is not None
+
+    def enable(self, preload: bool = True) -> None:
+        """Turns OPcache on in php.local.ini, with the preload script unless preload is False."""
+        settings = ['opcache.enable = 1', 'opcache.memory_consumption = 256', 'opcache.max_accelerated_files = 20000']
+        if preload:
+            settings += [f"opcache.preload = {self.script_target}", 'opcache.preload_user = www-data']
+        if self._extension_args():
+            # The template's image ships OPcache without loading it
+            settings.insert(0, 'zend_extension = opcache')
+        self._write_ini([self.BLOCK_START] + settings + [self.BLOCK_END])
+
+    def disable(self) -> None:
+        self._write_ini([])
+
+    def restart(self, timeout: float = 60) -> bool:
+        """Restarts the project's containers so Apache starts with the current ini (and preloads again)."""
+        subprocess.run(['docker', 'compose', 'restart'], cwd=self.project_path, capture_output=True)
+        return DockerHelpers.wait_for_composition(self.project_path, timeout)
+
+    # ------------
+    # Measurement
+    # ------------
+
+    def measure(self, url: str, requests: int = 20, progress: callable = None) -> dict:
+        """
+        Compares request latency with OPcache alone and with the preload script, restarting Apache for each so the
+        first request is cold. Leaves preloading enabled.
+
+        Returns:
+            dict: Mode -> {'cold': seconds, 'warm': median seconds of the following requests}
+        """
+        results = {}
+        for mode, preload in [('opcache', False), ('opcache + preload', True)]:
+            self.enable(preload)
+            if not self.restart():
+                raise RuntimeError("The project didn't come back up after restarting.")
+            cold = self._time_first_request(url)
+            warm = [self._time_request(url) for _ in range(requests)]
+            results[mode] = {'cold': cold, 'warm': statistics.median(warm)}
+            if progress:
+                progress(mode, results[mode])
+        return results
+
+    # -------
+    # Helpers
+    # -------
+
+    def _find_mounts(self) -> tuple:
+        compose = ComposeFiles.load(os.path.join(self.project_path, 'docker-compose.yml'))
+        targets = {}
+        for service in (compose.get('services') or {}).values():
+            for host_path, container_path in ComposeFiles.get_bind_mounts(service, self.project_path):
+                targets[os.path.relpath(host_path, self.project_path)] = container_path
+        if 'src' not in targets or 'reports' not in targets or 'server/php.local.ini' not in targets:
+            raise ValueError("OPcache preloading needs the apache-php template's src/, reports/, and "
+                             "server/php.local.ini mounts.")
+        return targets['src'], targets['reports']
+
+    def _extension_args(self) -> list:
+        """Loads OPcache for a CLI run if the image doesn't already."""
+        if self._opcache_loaded is None:
+            self._opcache_loaded = 'Zend OPcache' in self._exec(['php'] + self.PHP_ARGS + ['-m']).stdout
+        return [] if self._opcache_loaded else ['-d', 'zend_extension=opcache']
+
+    def _write_script(self, files: list) -> None:
+        lines = [
+            "<?php",
+            f"// Generated by `anydev project opcache-preload` on {datetime.datetime.now():%Y-%m-%d %H:%M}. "
+            "Regenerate it rather than editing.",
+            f"// {len(files)} file(s), each after the files it depends on.",
+            "$files = [",
+        ] + [f"    {self._php_string(file)}," for file in files] + [
+            "];",
+            "foreach ($files as $file) {",
+            "    if (!is_file($file)) {",
+            "        continue;",
+            "    }",
+            "    try {",
+            "        opcache_compile_file($file);",
+            "    } catch (\\Throwable $e) {",
+            "        error_log(\"Skipped preloading $file: {$e->getMessage()}\");",
+            "    }",
+            "}",
+            "",
+        ]
+        os.makedirs(os.path.dirname(self.script_file), exist_ok=True)
+        with open(self.script_file, 'w') as f:
+            f.write('\n'.join(lines))
+
+    def _read_ini(self) -> tuple:
+        """Returns the ini's lines and the (start, end) indexes of the managed block, or None."""
+        with open(self.ini_file, 'r') as f:
+            lines = f.read().splitlines()
+        if self.BLOCK_START in lines and self.BLOCK_END in lines:
+            return lines, (lines.index(self.BLOCK_START), lines.index(self.BLOCK_END))
+        return lines, None
+
+    def _write_ini(self, block: list) -> None:
+        lines, span = self._read_ini()
+        if span:
+            start, end = span
+            lines = lines[:start] + lines[end + 1:]
+        while lines and not lines[-1].strip():
+            lines.pop()
+        # At the end, so it overrides the template's `opcache.enable = 0`
+        lines += ([''] + block) if block else []
+        with open(self.ini_file, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def _exec(self, command: list, stdin: str = None) -> subprocess.CompletedProcess:
+        return subprocess.run(['docker', 'exec', '-i', self.container] + command, input=stdin, capture_output=True,
+                              text=True)
+
+    def _time_first_request(self, url: str, timeout: float = 60) -> float:
+        """Times the first request Apache answers after a restart, waiting for it to listen."""
+        deadline = time.time() + timeout
+        while True:
+            try:
+                return self._time_request(url)
+            except (urllib.error.URLError, ConnectionError):
+                if time.time() > deadline:
+                    raise RuntimeError(f"{url} didn't respond within {timeout:g} seconds of restarting.")
+                time.sleep(0.5)
+
+    @staticmethod
+    def _php_string(value: str) -> str:
+        return "'" + value.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+    @staticmethod
+    def _time_request(url: str) -> float:
+        """Times a request, including reading the response. Error pages count, except the proxy's own."""
+        # Local certificates may not be trusted by Python's CA bundle
+        context = ssl._create_unverified_context()
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=30, context=context) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            e.read()
+            if e.code in [502, 503, 504]:
+                raise
+        return time.perf_counter() - started
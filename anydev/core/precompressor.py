@@ -0,0 +1,195 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    # Optional (pip install brotli); the brotli CLI is used instead when it's installed
+    brotli = None
+
+
+class Precompressor:
+    """
+    Writes .gz and .br siblings next to a project's static assets, for Apache to serve instead of compressing on
+    every request (see server/apache/conf.d/300-compression.conf in the apache-php template).
+
+    A manifest in the project directory records each asset's content hash and the siblings written for it, so
+    unchanged files are skipped (by size and mtime first, then by hash) and siblings of deleted assets are removed.
+    zlib and brotli release the GIL while compressing, so files are compressed in parallel threads.
+    """
+
+    # Must match the extensions served precompressed by 300-compression.conf
+    EXTENSIONS = ['.css', '.js', '.mjs', '.json', '.map', '.svg', '.xml', '.txt', '.html', '.htm', '.wasm', '.ttf',
+                  '.otf']
+
+    # Dependency and VCS directories are never served as-is
+    SKIP_DIRS = {'.git', 'node_modules'}
+
+    # Smaller files aren't worth compressing (they fit in a packet either way)
+    MIN_SIZE = 1024
+
+    MANIFEST = '.anydev-precompress.json'
+
+    def __init__(self, project_path: str, source_dir: str = 'src', jobs: int = None):
+        self.project_path = os.path.abspath(project_path)
+        self.source_path = os.path.join(self.project_path, source_dir)
+        self.manifest_file = os.path.join(self.project_path, self.MANIFEST)
+        self.jobs = jobs or os.cpu_count() or 4
+        self.encodings = ['gz'] + (['br'] if self.brotli_available() else [])
+        self.manifest = self._load_manifest()
+
+    @staticmethod
+    def brotli_available() -> bool:
+        return brotli is not None or shutil.which('brotli') is not None
+
+    def run(self) -> dict:
+        """
+        Brings every asset's siblings up to date.
+
+        Returns:
+            dict: Counts and sizes: compressed, unchanged, removed, bytes_in, bytes_out, seconds.
+        """
+        started = time.monotonic()
+        assets = self.find_assets()
+        summary = {'compressed': 0, 'unchanged': 0, 'removed': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+        changed = []
+        for relative_path, stat in assets.items():
+            entry = self.manifest.get(relative_path)
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns \
+                    and entry['encodings'] == self.encodings:
+                summary['unchanged'] += 1
+                continue
+            changed.append((relative_path, stat, entry))
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            for relative_path, entry in executor.map(lambda item: self._update(*item), changed):
+                if entry.get('compressed') and entry['outputs']:
+                    summary['compressed'] += 1
+                    summary['bytes_in'] += entry['size'] * len(entry['outputs'])
+                    summary['bytes_out'] += sum(entry['outputs'].values())
+                else:
+                    summary['unchanged'] += 1
+                entry.pop('compressed', None)
+                self.manifest[relative_path] = entry
+
+        for relative_path in set(self.manifest) - set(assets):
+            self._remove_siblings(relative_path, self.manifest.pop(relative_path))
+            summary['removed'] += 1
+
+        if changed or summary['removed']:
+            self._save_manifest()
+        summary['seconds'] = time.monotonic() - started
+        return summary
+
+    def watch(self, interval: float = 1.0, on_change: callable = None) -> None:
+        """
+        Polls the source directory and refreshes siblings as assets change, until interrupted.
+        Unchanged files cost a stat() per pass, so polling stays cheap on large trees.
+
+        Args:
+            interval (float): Seconds between passes.
+            on_change (callable): Called with each pass's summary when something was compressed or removed.
+        """
+        while True:
+            summary = self.run()
+            if on_change and (summary['compressed'] or summary['removed']):
+                on_change(summary)
+            time.sleep(interval)
+
+    def clean(self) -> int:
+        """
+        Removes every sibling recorded in the manifest, and the manifest itself.
+
+        Returns:
+            int: The number of assets cleaned up.
+        """
+        for relative_path, entry in self.manifest.items():
+            self._remove_siblings(relative_path, entry)
+        count = len(self.manifest)
+        self.manifest = {}
+        if os.path.exists(self.manifest_file):
+            os.remove(self.manifest_file)
+        return count
+
+    def find_assets(self) -> dict:
+        """Lists compressible assets under the source directory (relative path -> stat result)."""
+        assets = {}
+        for root, dirs, files in os.walk(self.source_path):
+            dirs[:] = [name for name in dirs if name not in self.SKIP_DIRS]
+            for name in files:
+                if os.path.splitext(name)[1].lower() not in self.EXTENSIONS:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if stat.st_size >= self.MIN_SIZE:
+                    assets[os.path.relpath(path, self.source_path)] = stat
+        return assets
+
+    def _update(self, relative_path: str, stat: os.stat_result, entry: dict = None) -> tuple:
+        """Compresses one asset if its content changed. Returns its new manifest entry."""
+        path = os.path.join(self.source_path, relative_path)
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+
+        new_entry = {'hash': digest, 'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'encodings': self.encodings}
+        if entry and entry['hash'] == digest and entry['encodings'] == self.encodings:
+            # Touched but not modified
+            return relative_path, new_entry | {'outputs': entry['outputs']}
+
+        outputs = {}
+        for encoding in self.encodings:
+            sibling = f"{path}.{encoding}"
+            compressed = self._compress(data, encoding)
+            # Incompressible files (e.g. minified fonts) are served as-is
+            if compressed is None or len(compressed) >= len(data):
+                if os.path.exists(sibling):
+                    os.remove(sibling)
+                continue
+            temp_file = f"{sibling}.{os.getpid()}.tmp"
+            with open(temp_file, 'wb') as f:
+                f.write(compressed)
+            os.utime(temp_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            os.replace(temp_file, sibling)
+            outputs[encoding] = len(compressed)
+        return relative_path, new_entry | {'outputs': outputs, 'compressed': True}
+
+    @staticmethod
+    def _compress(data: bytes, encoding: str) -> None or bytes:
+        if encoding == 'gz':
+            # mtime=0 keeps output identical for identical input
+            return gzip.compress(data, compresslevel=9, mtime=0)
+        if brotli is not None:
+            return brotli.compress(data, quality=11)
+        result = subprocess.run(['brotli', '--best', '--stdout'], input=data, capture_output=True)
+        return result.stdout if result.returncode == 0 else None
+
+    def _remove_siblings(self, relative_path: str, entry: dict) -> None:
+        for encoding in entry.get('outputs', {}):
+            sibling = os.path.join(self.source_path, f"{relative_path}.{encoding}")
+            if os.path.exists(sibling):
+                os.remove(sibling)
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_file, 'r') as f:
+                return json.load(f).get('assets', {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_manifest(self) -> None:
+        temp_file = f"{self.manifest_file}.{os.getpid()}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump({'assets': self.manifest}, f, indent=1, sort_keys=True)
+        os.replace(temp_file, self.manifest_file)
@@ -0,0 +1,205 @@
+import json
+import os
+import threading
+import time
+
+from anydev.configuration import Configuration
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dotenv import dotenv_values
+
+
+class ProjectDiscovery:
+    """
+    Finds AnyDev projects below one or more root directories.
+
+    Directories are listed with `os.scandir` across a thread pool. Heavy or irrelevant trees (dependencies, VCS
+    metadata, build output) are pruned, and AnyDev projects aren't descended into.
+    Each directory's mtime and children are cached, so a later scan only lists directories whose entries have
+    changed; everything else costs a single `stat`.
+    """
+
+    # Directory names that never contain projects
+    PRUNE_DIRS = {
+        '.git', 'vendor', 'node_modules', 'bower_components', '__pycache__', 'venv', 'site-packages',
+        'dist', 'build', 'target',
+    }
+
+    ENV_FILES = ['.env.example', '.env']
+
+    CACHE_VERSION = 1
+
+    def __init__(self, max_depth: int = 4, jobs: int = 16, use_cache: bool = True):
+        self.config = Configuration()
+        self.max_depth = max_depth
+        self.jobs = jobs
+        self.use_cache = use_cache
+        self.cache_file = os.path.join(self.config.config_dir, 'cache', 'discovery.json')
+
+        self._cache = self._load_cache() if use_cache else {}
+        self._new_cache = {}
+        self._lock = threading.Lock()
+        self.stats = {'directories': 0, 'listed': 0, 'seconds': 0.0}
+
+    def get_default_roots(self) -> list:
+        """The configured projects directory plus any extra `discovery_roots` from config.yaml."""
+        roots = [self.config.get_project_directory()] + self.config.get_discovery_roots()
+        return [os.path.abspath(os.path.expanduser(root)) for root in roots if root]
+
+    def scan(self, roots: list = None) -> list:
+        """
+        Scans the given roots (or the defaults) for AnyDev projects.
+
+        Returns:
+            list: Dicts with the 'name', 'path', and 'template' of each project found.
+        """
+        started = time.monotonic()
+        roots = [os.path.abspath(os.path.expanduser(root)) for root in (roots or self.get_default_roots())]
+        projects = {}
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            pending = {
+                executor.submit(self._scan_dir, root, 0)
+                for root in dict.fromkeys(roots) if os.path.isdir(root)
+            }
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    project, children, depth = future.result()
+                    if project:
+                        projects[project['path']] = project
+                    if depth < self.max_depth:
+                        pending |= {executor.submit(self._scan_dir, child, depth + 1) for child in children}
+
+        # Merge rather than replace, so scanning one root doesn't forget the others
+        self._cache |= self._new_cache
+        self._save_cache()
+
+        self.stats['seconds'] = time.monotonic() - started
+        return sorted(projects.values(), key=lambda project: project['path'])
+
+    def register(self, projects: list) -> tuple:
+        """
+        Registers projects that aren't registered yet, in a single batched write.
+
+        Projects are named after their directory, so a project whose name is already taken (by a registered project
+        at another path, or by another directory found in the same scan) is skipped rather than replacing the other.
+
+        Returns:
+            tuple: (the projects newly registered, the skipped projects, each with the 'conflict' path holding its name)
+        """
+        registry = self.config.get_registry()
+        new_projects = []
+        conflicts = []
+        claimed = {}
+        for project in projects:
+            if registry.get_by_path(project['path']) is not None:
+                continue
+            registered = registry.get(project['name'])
+            if registered:
+                conflicts.append(project | {'conflict': registered['path']})
+            elif project['name'] in claimed:
+                conflicts.append(project | {'conflict': claimed[project['name']]})
+            else:
+                claimed[project['name']] = project['path']
+                new_projects.append(project)
+        if new_projects:
+            registry.add_many(new_projects)
+        return new_projects, conflicts
+
+    def _scan_dir(self, path: str, depth: int) -> tuple:
+        """
+        Inspects one directory.
+
+        Returns:
+            tuple: (project dict or None, child directories to scan, depth)
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None, [], depth
+
+        cached = self._cache.get(path)
+        listed = False
+        if cached and cached['mtime'] == mtime:
+            # Same entries as last time; only the env files' contents may have changed
+            entry = cached
+            env_mtimes = self._env_mtimes(path, entry['env'].keys())
+            if env_mtimes != entry['env']:
+                entry = entry | {'env': env_mtimes, 'project': self._detect(path, env_mtimes)}
+        else:
+            entry = self._list_dir(path, mtime)
+            listed = True
+
+        with self._lock:
+            self.stats['directories'] += 1
+            self.stats['listed'] += listed
+            self._new_cache[path] = entry
+
+        if entry['project']:
+            return entry['project'], [], depth
+        return None, [os.path.join(path, child) for child in entry['children']], depth
+
+    def _list_dir(self, path: str, mtime: int) -> dict:
+        """Lists a directory's relevant children and detects whether it's a project."""
+        children = []
+        env_files = []
+        try:
+            with os.scandir(path) as entries:
+                for item in entries:
+                    name = item.name
+                    if name in self.ENV_FILES:
+                        env_files.append(name)
+                    elif name.startswith('.') or name in self.PRUNE_DIRS:
+                        continue
+                    elif item.is_dir(follow_symlinks=False):
+                        children.append(name)
+        except OSError:
+            pass
+
+        env_mtimes = self._env_mtimes(path, env_files)
+        return {
+            'mtime':      mtime,
+            'children':   sorted(children),
+            'env':        env_mtimes,
+            'project':    self._detect(path, env_mtimes),
+        }
+
+    def _detect(self, path: str, env_mtimes: dict) -> None or dict:
+        """Checks a directory's env files for the ANYDEV and ANYDEV_TEMPLATE flags."""
+        env_vars = {}
+        # .env overrides .env.example
+        for name in self.ENV_FILES[::-1]:
+            if name in env_mtimes:
+                try:
+                    env_vars = dotenv_values(os.path.join(path, name)) | env_vars
+                except Exception:
+                    continue
+
+        if str(env_vars.get('ANYDEV', '')).lower() not in ['true', '1', 'yes'] or not env_vars.get('ANYDEV_TEMPLATE'):
+            return None
+        return {'name': os.path.basename(path), 'path': path, 'template': env_vars['ANYDEV_TEMPLATE']}
+
+    @staticmethod
+    def _env_mtimes(path: str, names) -> dict:
+        mtimes = {}
+        for name in names:
+            try:
+                mtimes[name] = os.stat(os.path.join(path, name)).st_mtime_ns
+            except OSError:
+                continue
+        return mtimes
+
+    def _load_cache(self) -> dict:
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+            return data.get('directories', {}) if data.get('version') == self.CACHE_VERSION else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_cache(self) -> None:
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        temp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump({'version': self.CACHE_VERSION, 'directories': self._cache}, f)
+        os.replace(temp_file, self.cache_file)
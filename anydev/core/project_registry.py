@@ -0,0 +1,170 @@
+import os
+import sqlite3
+import threading
+import time
+
+from contextlib import contextmanager
+
+
+class ProjectRegistry:
+    """
+    SQLite-backed registry of AnyDev projects.
+
+    The database runs in WAL mode with a busy timeout, so several `anydev` invocations can read and write it at the
+    same time without clobbering each other. Projects are indexed by name, path, and template, and batches of
+    writes can be grouped into a single transaction with `transaction()`.
+    """
+
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS projects (
+            name      TEXT PRIMARY KEY,
+            path      TEXT NOT NULL UNIQUE,
+            template  TEXT,
+            last_used REAL,
+            status    TEXT
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS projects_template ON projects (template)",
+        "CREATE INDEX IF NOT EXISTS projects_last_used ON projects (last_used)",
+    ]
+
+    # Allowed sort columns (user input never reaches SQL directly)
+    SORT_COLUMNS = ['name', 'path', 'template', 'last_used', 'status']
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        # Touched after every write, so other processes can tell the registry changed without opening it
+        self.updated_file = f"{db_file}.updated"
+        os.makedirs(os.path.dirname(db_file), exist_ok=True)
+
+        self._conn = sqlite3.connect(db_file, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._depth = 0
+        self._changes = 0
+        # Transactions are per connection, so threads sharing the registry take turns
+        self._lock = threading.RLock()
+
+        with self.transaction():
+            for statement in self.SCHEMA:
+                self._conn.execute(statement)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups writes into a single transaction. Nested calls join the outermost transaction.
+        """
+        with self._lock:
+            if self._depth == 0:
+                # Take the write lock up front so concurrent writers queue instead of failing mid-transaction
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._changes = self._conn.total_changes
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("COMMIT")
+                    if self._conn.total_changes != self._changes:
+                        with open(self.updated_file, 'a'):
+                            os.utime(self.updated_file)
+
+    def add(self, name: str, path: str, template: str = None, status: str = None) -> None:
+        """
+        Adds or updates a project. A path can only belong to one project, so any other project at the same path
+        is replaced.
+        """
+        with self.transaction():
+            self._conn.execute("DELETE FROM projects WHERE path = ? AND name != ?", (path, name))
+            self._conn.execute(
+                """
+                INSERT INTO projects (name, path, template, last_used, status) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (name) DO UPDATE SET
+                    path = excluded.path,
+                    template = excluded.template,
+                    status = COALESCE(excluded.status, projects.status)
+                """,
+                (name, path, template, time.time(), status)
+            )
+
+    def add_many(self, projects: list) -> None:
+        """
+        Adds or updates several projects in one transaction.
+
+        Args:
+            projects (list): Dicts with 'name', 'path', and optionally 'template', 'status', and 'last_used'.
+        """
+        with self.transaction():
+            for project in projects:
+                self.add(project['name'], project['path'], project.get('template'), project.get('status'))
+                if project.get('last_used'):
+                    self.touch(project['name'], project['last_used'])
+
+    def remove(self, name: str) -> bool:
+        """Removes a project. Returns True if it was registered."""
+        with self.transaction():
+            return self._conn.execute("DELETE FROM projects WHERE name = ?", (name,)).rowcount > 0
+
+    def remove_many(self, names: list) -> None:
+        """Removes several projects in one transaction."""
+        with self.transaction():
+            self._conn.executemany("DELETE FROM projects WHERE name = ?", [(name,) for name in names])
+
+    def get(self, name: str) -> None or dict:
+        row = self._conn.execute("SELECT * FROM projects WHERE name = ?", (name,)).fetchone()
+        return dict(row) if row else None
+
+    def get_by_path(self, path: str) -> None or dict:
+        row = self._conn.execute("SELECT * FROM projects WHERE path = ?", (path,)).fetchone()
+        return dict(row) if row else None
+
+    def all(self, template: str = None, status: str = None, sort: str = 'name', descending: bool = False) -> list:
+        """
+        Lists projects, optionally filtered by template and/or status, using the registry's indexes.
+
+        Returns:
+            list: Project dicts with name, path, template, last_used, and status.
+        """
+        if sort not in self.SORT_COLUMNS:
+            raise ValueError(f"Cannot sort projects by {sort}")
+
+        conditions = []
+        params = []
+        if template:
+            conditions.append("template = ?")
+            params.append(template)
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+
+        query = "SELECT * FROM projects"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY {sort} {'DESC' if descending else 'ASC'}, name ASC"
+        return [dict(row) for row in self._conn.execute(query, params)]
+
+    def touch(self, name: str, when: float = None) -> None:
+        """Records that a project was just used."""
+        with self.transaction():
+            self._conn.execute("UPDATE projects SET last_used = ? WHERE name = ?", (when or time.time(), name))
+
+    def set_status(self, name: str, status: str) -> None:
+        """Records the last known status of a project (e.g. running, stopped, suspended)."""
+        with self.transaction():
+            self._conn.execute("UPDATE projects SET status = ? WHERE name = ?", (status, name))
+
+    def set_status_by_path(self, path: str, status: str) -> None:
+        """Records the last known status of the project at a path."""
+        with self.transaction():
+            self._conn.execute("UPDATE projects SET status = ? WHERE path = ?", (status, path))
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0]
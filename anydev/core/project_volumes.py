@@ -0,0 +1,172 @@
+import os
+import re
+import subprocess
+
+from anydev.core.compose_files import ComposeFiles
+
+
+class ProjectVolumes:
+    """
+    The named volumes a project's compose file lays over its bind-mounted source, for dependency and cache
+    directories (vendor/, node_modules/, .venv) that are slow to read through the host-shared filesystem.
+
+    A named volume mounted inside a bind mount hides the host directory at that path, so its contents have to be
+    installed in the container or seeded from the host. Volumes whose contents can't be copied from the host (e.g. a
+    virtualenv, which links to the host's Python) opt out of seeding in the compose file:
+
+        volumes:
+          venv:
+            x-anydev-seed: false
+    """
+
+    # Copies host directories into volumes, without needing anything installed in the project's own image
+    HELPER_IMAGE = 'alpine:3'
+
+    def __init__(self, project_path: str):
+        self.project_path = os.path.abspath(project_path)
+        self.env = ComposeFiles.get_env(self.project_path)
+        self.compose = ComposeFiles.load(os.path.join(self.project_path, 'docker-compose.yml'))
+
+    def get_project_name(self) -> str:
+        """The compose project name, which prefixes the project's volume names."""
+        name = self.env.get('COMPOSE_PROJECT_NAME') or self.compose.get('name') or os.path.basename(self.project_path)
+        # Compose normalizes project names the same way
+        return re.sub(r'[^a-z0-9_-]', '', name.lower())
+
+    def get_overlays(self) -> list:
+        """
+        Lists the project's named volumes, with the host directory each one hides (if any).
+
+        Returns:
+            list: One dict per mount: 'volume' (as named in the compose file), 'docker_volume', 'service', 'target'
+                  (container path), 'host_path' (None unless it's inside a bind mount), and 'seed'.
+        """
+        definitions = self.compose.get('volumes') or {}
+        overlays = []
+        for service_name, service in (self.compose.get('services') or {}).items():
+            bind_mounts = ComposeFiles.get_bind_mounts(service, self.project_path)
+            for volume in service.get('volumes', []):
+                if isinstance(volume, dict):
+                    if volume.get('type', 'volume') != 'volume':
+                        continue
+                    source, target = volume.get('source', ''), volume.get('target', '')
+                else:
+                    source, _, target = volume.partition(':')
+                    target = target.split(':')[0]
+                if source not in definitions:
+                    continue
+
+                definition = definitions[source] or {}
+                host_path = None
+                for bind_source, bind_target in bind_mounts:
+                    relative = os.path.relpath(target, bind_target)
+                    if relative != '.' and not relative.startswith('..'):
+                        host_path = os.path.join(bind_source, relative)
+                        break
+                overlays.append({
+                    'volume':        source,
+                    'docker_volume': definition.get('name') or f"{self.get_project_name()}_{source}",
+                    'service':       service_name,
+                    'target':        target,
+                    'host_path':     host_path,
+                    'seed':          host_path is not None and definition.get('x-anydev-seed', True) is not False,
+                })
+        return overlays
+
+    def get_sizes(self, overlays: list = None) -> dict:
+        """
+        Measures the project's volumes that exist, in a single helper container.
+
+        Returns:
+            dict: Docker volume name -> size in bytes. Volumes that don't exist yet are left out.
+        """
+        existing = self.get_existing_volumes()
+        volumes = sorted({overlay['docker_volume'] for overlay in overlays or self.get_overlays()} & existing)
+        if not volumes:
+            return {}
+
+        mount_args = []
+        for index, volume in enumerate(volumes):
+            mount_args += ['-v', f"{volume}:/volumes/{index}:ro"]
+        result = self._run_helper(mount_args, ['du', '-sk'] + [f"/volumes/{index}" for index in range(len(volumes))])
+        sizes = {}
+        for line in result.stdout.splitlines():
+            kilobytes, _, path = line.partition('\t')
+            try:
+                sizes[volumes[int(path.rsplit('/', 1)[1])]] = int(kilobytes) * 1024
+            except (ValueError, IndexError):
+                continue
+        return sizes
+
+    def seed(self, refresh: bool = False, volumes: list = None) -> list:
+        """
+        Copies host directories into their volumes.
+
+        Args:
+            refresh (bool): Empty and re-copy volumes that already have contents. Otherwise those are left alone.
+            volumes (list): Only these volumes (as named in the compose file). Defaults to all seedable ones.
+
+        Returns:
+            list: (overlay, outcome) tuples, where outcome is 'seeded', 'refreshed', 'kept' (already has contents),
+                  'no source' (nothing on the host to copy), or an error message.
+        """
+        results = []
+        for overlay in self.get_overlays():
+            if not overlay['seed'] or (volumes and overlay['volume'] not in volumes):
+                continue
+            if not os.path.isdir(overlay['host_path']) or not os.listdir(overlay['host_path']):
+                results.append((overlay, 'no source'))
+                continue
+
+            self._create_volume(overlay)
+            script = (
+                # Keep the volume's contents unless refreshing
+                ('find /volume -mindepth 1 -delete && ' if refresh else
+                 '[ -n "$(ls -A /volume)" ] && echo kept && exit 0; ')
+                + 'cp -a /source/. /volume/'
+            )
+            result = self._run_helper(
+                ['-v', f"{overlay['docker_volume']}:/volume", '-v', f"{overlay['host_path']}:/source:ro"],
+                ['sh', '-c', script]
+            )
+            if result.returncode != 0:
+                error = (result.stderr or result.stdout).strip().splitlines()
+                results.append((overlay, error[-1] if error else f"exited with {result.returncode}"))
+            elif result.stdout.strip() == 'kept':
+                results.append((overlay, 'kept'))
+            else:
+                results.append((overlay, 'refreshed' if refresh else 'seeded'))
+        return results
+
+    def remove(self) -> list:
+        """
+        Removes the project's volumes. Their containers must be removed first.
+
+        Returns:
+            list: The Docker volume names removed.
+        """
+        volumes = sorted({overlay['docker_volume'] for overlay in self.get_overlays()} & self.get_existing_volumes())
+        if not volumes:
+            return []
+        result = subprocess.run(['docker', 'volume', 'rm'] + volumes, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or "docker volume rm failed")
+        return volumes
+
+    @staticmethod
+    def get_existing_volumes() -> set:
+        result = subprocess.run(['docker', 'volume', 'ls', '--format', '{{.Name}}'], capture_output=True, text=True)
+        return set(result.stdout.split()) if result.returncode == 0 else set()
+
+    def _create_volume(self, overlay: dict) -> None:
+        """Creates a volume with compose's labels, so `docker compose up` adopts it instead of warning."""
+        subprocess.run([
+            'docker', 'volume', 'create',
+            '--label', f"com.docker.compose.project={self.get_project_name()}",
+            '--label', f"com.docker.compose.volume={overlay['volume']}",
+            overlay['docker_volume']
+        ], capture_output=True, text=True)
+
+    def _run_helper(self, mount_args: list, command: list) -> subprocess.CompletedProcess:
+        return subprocess.run(['docker', 'run', '--rm'] + mount_args + [self.HELPER_IMAGE] + command,
+                              capture_output=True, text=True)
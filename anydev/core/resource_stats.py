@@ -0,0 +1,242 @@
+import csv
+import json
+import re
+import subprocess
+import time
+
+from collections import deque
+from anydev.core.cli_output import CliOutput
+from anydev.core.container_owners import ContainerOwners
+from anydev.core.docker_controls import DockerHelpers
+from rich.table import Table
+
+
+class ResourceStats:
+    """
+    Aggregates `docker stats` samples for AnyDev containers per project and per shared service.
+
+    A single `docker stats` process streams samples for every running container (one Docker connection), which
+    are grouped into frames, attributed to their owner and kept in a fixed-size history for sparklines.
+    """
+
+    # Metrics summed per owner for each frame
+    METRICS = ['cpu', 'mem', 'mem_limit', 'net_rx', 'net_tx', 'block_read', 'block_write']
+
+    SPARK_CHARS = '▁▂▃▄▅▆▇█'
+
+    _ANSI_P = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+    _SIZE_P = re.compile(r'^\s*([\d.]+)\s*([kKMGTP]?i?B)?\s*$')
+    _SIZE_UNITS = {
+        'b': 1,
+        'kb': 1000, 'mb': 1000 ** 2, 'gb': 1000 ** 3, 'tb': 1000 ** 4, 'pb': 1000 ** 5,
+        'kib': 1024, 'mib': 1024 ** 2, 'gib': 1024 ** 3, 'tib': 1024 ** 4, 'pib': 1024 ** 5,
+    }
+
+    def __init__(self, history_size: int = 60):
+        self.owners = ContainerOwners()
+        self.history_size = history_size
+        # Owner key -> deque of aggregated samples (oldest first)
+        self.history = {}
+        # Container ID -> owner key (None for non-AnyDev containers)
+        self._container_owners = {}
+
+    def stream(self, once: bool = False):
+        """
+        Streams aggregated frames from `docker stats`.
+
+        Args:
+            once (bool): Only take a single sample instead of streaming continuously.
+
+        Yields:
+            dict: A frame mapping (kind, name) owner keys to aggregated samples.
+        """
+        stats_cmd = ['docker', 'stats', '--format', '{{json .}}'] + (['--no-stream'] if once else [])
+        proc = subprocess.Popen(stats_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1)
+
+        frame_rows = {}
+        received = False
+        try:
+            for line in proc.stdout:
+                # Streaming mode clears the screen between frames
+                new_frame = '\x1b[2J' in line
+                line = self._ANSI_P.sub('', line).strip()
+
+                row = None
+                if line:
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+
+                # A repeated container also means a new frame has started
+                if frame_rows and (new_frame or (row and row.get('ID') in frame_rows)):
+                    yield self.add_frame(frame_rows)
+                    frame_rows = {}
+
+                if row:
+                    frame_rows[row.get('ID')] = row
+                    received = True
+
+            if frame_rows:
+                yield self.add_frame(frame_rows)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+        if proc.returncode not in (0, -15) and not received:
+            CliOutput.error(f"docker stats failed: {proc.stderr.read().strip()}", True, proc.returncode)
+
+    def add_frame(self, rows: dict) -> dict:
+        """
+        Aggregates one frame of raw `docker stats` rows per owner and appends it to the history.
+
+        Args:
+            rows (dict): Container ID -> raw `docker stats` row.
+
+        Returns:
+            dict: Owner key -> aggregated sample.
+        """
+        self._resolve_owners(list(rows.keys()))
+        timestamp = time.time()
+
+        frame = {}
+        for container_id, row in rows.items():
+            owner = self._container_owners.get(container_id)
+            if owner is None:
+                continue
+
+            sample = frame.setdefault(owner, dict.fromkeys(self.METRICS, 0.0) | {'containers': 0, 'time': timestamp})
+            mem_used, mem_limit = self.parse_pair(row.get('MemUsage', ''))
+            net_rx, net_tx = self.parse_pair(row.get('NetIO', ''))
+            block_read, block_write = self.parse_pair(row.get('BlockIO', ''))
+
+            sample['containers'] += 1
+            sample['cpu'] += self.parse_percent(row.get('CPUPerc', ''))
+            sample['mem'] += mem_used
+            # Containers without limits all report the host total; don't sum those
+            sample['mem_limit'] = max(sample['mem_limit'], mem_limit)
+            sample['net_rx'] += net_rx
+            sample['net_tx'] += net_tx
+            sample['block_read'] += block_read
+            sample['block_write'] += block_write
+
+        for owner, sample in frame.items():
+            self.history.setdefault(owner, deque(maxlen=self.history_size)).append(sample)
+
+        return frame
+
+    def _resolve_owners(self, container_ids: list) -> None:
+        """Looks up owners for any containers that haven't been seen yet (in one inspect call)."""
+        unknown_ids = [cid for cid in container_ids if cid not in self._container_owners]
+        if not unknown_ids:
+            return
+
+        for container in DockerHelpers.inspect_containers(unknown_ids):
+            owner = self.owners.resolve(container)
+            container_id = container.get('Id', '')
+            for cid in unknown_ids:
+                if container_id.startswith(cid):
+                    self._container_owners[cid] = owner
+
+        # Containers that vanished before inspection are ignored from now on
+        for cid in unknown_ids:
+            self._container_owners.setdefault(cid, None)
+
+    def sparkline(self, owner: tuple, metric: str = 'cpu') -> str:
+        """Renders the owner's history of a metric as a unicode sparkline."""
+        values = [sample[metric] for sample in self.history.get(owner, [])]
+        if not values:
+            return ''
+        low, high = min(values), max(values)
+        spread = (high - low) or 1
+        return ''.join(
+            self.SPARK_CHARS[int((value - low) / spread * (len(self.SPARK_CHARS) - 1))] for value in values
+        )
+
+    def render_table(self, frame: dict) -> Table:
+        """Builds a rich table for the latest frame, heaviest CPU users first."""
+        table = Table(title="AnyDev Resource Usage")
+
+        table.add_column("Owner", justify="left", style="cyan", no_wrap=True)
+        table.add_column("Type", justify="left", style="magenta")
+        table.add_column("Containers", justify="right")
+        table.add_column("CPU %", justify="right", style="green")
+        table.add_column("Memory", justify="right", style="green")
+        table.add_column("Net I/O (rx / tx)", justify="right")
+        table.add_column("Block I/O (r / w)", justify="right")
+        table.add_column("CPU Trend", justify="left", style="yellow", no_wrap=True)
+
+        for owner, sample in sorted(frame.items(), key=lambda item: item[1]['cpu'], reverse=True):
+            kind, name = owner
+            table.add_row(
+                name,
+                kind,
+                str(sample['containers']),
+                f"{sample['cpu']:.2f}",
+                self.format_bytes(sample['mem']),
+                f"{self.format_bytes(sample['net_rx'])} / {self.format_bytes(sample['net_tx'])}",
+                f"{self.format_bytes(sample['block_read'])} / {self.format_bytes(sample['block_write'])}",
+                self.sparkline(owner),
+            )
+
+        return table
+
+    @staticmethod
+    def export_frame(frame: dict, export_file, export_format: str = 'csv', write_header: bool = False) -> None:
+        """
+        Appends a frame of samples to an open export file.
+
+        Args:
+            frame (dict): Owner key -> aggregated sample.
+            export_file: A writable text file object.
+            export_format (str): Either 'csv' or 'json' (one JSON object per line).
+            write_header (bool): Write the CSV header row first.
+        """
+        fields = ['time', 'kind', 'owner', 'containers'] + ResourceStats.METRICS
+        rows = [
+            {'kind': kind, 'owner': name} | {key: sample[key] for key in fields if key in sample}
+            for (kind, name), sample in frame.items()
+        ]
+
+        if export_format == 'json':
+            for row in rows:
+                export_file.write(json.dumps(row) + '\n')
+        else:
+            writer = csv.DictWriter(export_file, fieldnames=fields)
+            if write_header:
+                writer.writeheader()
+            writer.writerows(rows)
+        export_file.flush()
+
+    @staticmethod
+    def parse_percent(value: str) -> float:
+        """Parses docker's '12.34%' strings."""
+        try:
+            return float(value.strip().rstrip('%') or 0)
+        except ValueError:
+            return 0.0
+
+    @staticmethod
+    def parse_size(value: str) -> float:
+        """Parses docker's human-readable sizes (e.g. '1.5kB', '12.3MiB') into bytes."""
+        match = ResourceStats._SIZE_P.match(value)
+        if not match:
+            return 0.0
+        unit = (match.group(2) or 'B').lower()
+        return float(match.group(1)) * ResourceStats._SIZE_UNITS.get(unit, 1)
+
+    @staticmethod
+    def parse_pair(value: str) -> tuple:
+        """Parses docker's 'used / total' strings into a tuple of bytes."""
+        parts = value.split('/')
+        if len(parts) != 2:
+            return 0.0, 0.0
+        return ResourceStats.parse_size(parts[0]), ResourceStats.parse_size(parts[1])
+
+    @staticmethod
+    def format_bytes(value: float) -> str:
+        """Formats bytes in binary units."""
+        for unit in ['B', 'KiB', 'MiB', 'GiB', 'TiB']:
+            if abs(value) < 1024 or unit == 'TiB':
+                return f"{value:.1f}{unit}" if unit != 'B' else f"{int(value)}B"
+            value /= 1024
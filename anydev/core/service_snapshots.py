@@ -0,0 +1,424 @@
+import datetime
+import hashlib
+import json
+import os
+import platform
+import shutil
+import stat
+import subprocess
+import threading
+import time
+import zlib
+
+from anydev.configuration import Configuration
+from anydev.core.cli_output import CliOutput
+from anydev.core.compose_files import ComposeFiles
+from anydev.core.docker_controls import DockerHelpers
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ChunkStore:
+    """
+    A content-addressed, deduplicating, compressed store of file chunks.
+
+    Files are split into fixed-size blocks. Database files are made of fixed-size pages that change in place (InnoDB
+    uses 16 KiB, Postgres 8 KiB), so an edit only changes the blocks holding the pages it touched, without the
+    per-byte cost of content-defined chunking. Each unique block is stored once, zlib-compressed, under its SHA-256.
+    hashlib and zlib release the GIL, so files are stored from a thread pool.
+    """
+
+    # A multiple of the databases' page sizes, so a changed page never straddles two blocks
+    BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, root: str, compress_level: int = 3):
+        self.root = root
+        self.compress_level = compress_level
+
+    def chunk_path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def has(self, digest: str) -> bool:
+        return os.path.exists(self.chunk_path(digest))
+
+    def put(self, data: bytes) -> tuple:
+        """
+        Stores a chunk unless an identical one is already stored.
+
+        Returns:
+            tuple: (digest, bytes newly written to disk)
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.chunk_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = zlib.compress(data, self.compress_level)
+        # Threads may store the same new block at once
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(temp_path, path)
+        return digest, len(compressed)
+
+    def get(self, digest: str) -> bytes:
+        with open(self.chunk_path(digest), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    def store_file(self, path: str) -> dict:
+        """
+        Splits a file into fixed-size blocks and stores them.
+
+        Returns:
+            dict: 'chunks' (list of digests), 'bytes_read', and 'bytes_written'.
+        """
+        chunks = []
+        bytes_read = 0
+        bytes_written = 0
+
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(self.BLOCK_SIZE)
+                if not block:
+                    break
+                bytes_read += len(block)
+                digest, written = self.put(block)
+                chunks.append(digest)
+                bytes_written += written
+
+        return {'chunks': chunks, 'bytes_read': bytes_read, 'bytes_written': bytes_written}
+
+
+class ServiceSnapshots:
+    """
+    Physical snapshots of a shared service's data directory (e.g. ~/.anydev/mysql-8).
+
+    The service is stopped while its data directory is captured or restored. When the data directory and the
+    snapshot store share a copy-on-write filesystem (APFS, Btrfs, XFS), snapshots are reflink copies that take
+    seconds and no extra space. Otherwise files go into a shared ChunkStore. Files unchanged since the service's
+    previous snapshot (same size and mtime) reuse their chunk lists without being read again, and restores only
+    rewrite files that differ from what's on disk.
+    """
+
+    def __init__(self, service: str, jobs: int = None, use_reflinks: bool = True):
+        self.config = Configuration()
+        self.service = service
+        self.jobs = jobs or os.cpu_count() or 4
+        self.use_reflinks = use_reflinks
+
+        self.snapshots_root = os.path.join(self.config.config_dir, 'snapshots')
+        self.service_dir = os.path.join(self.snapshots_root, service)
+        self.store = ChunkStore(os.path.join(self.snapshots_root, 'chunks'))
+        self.data_dir = self.get_data_dir()
+
+    def get_data_dir(self) -> str:
+        """
+        Finds the service's persistent data directory from the bind mounts in AnyDev's docker-compose.yml.
+
+        Raises:
+            ValueError: If the service doesn't exist or has no data directory under ~/.anydev.
+        """
+        compose = ComposeFiles.load(os.path.join(self.config.cli_root_dir, 'docker-compose.yml'))
+        service = compose.get('services', {}).get(self.service)
+        if service is None:
+            raise ValueError(f"Unknown service: {self.service}")
+
+        config_dir = os.path.realpath(self.config.config_dir)
+        for source, target in ComposeFiles.get_bind_mounts(service, self.config.cli_root_dir):
+            if os.path.realpath(source).startswith(config_dir + os.sep):
+                return source
+        raise ValueError(f"Service '{self.service}' has no data directory under {self.config.config_dir}.")
+
+    def list_snapshots(self) -> list:
+        """Returns the manifests of all snapshots for this service, newest first."""
+        manifests = []
+        if os.path.isdir(self.service_dir):
+            for filename in os.listdir(self.service_dir):
+                if filename.endswith('.json'):
+                    with open(os.path.join(self.service_dir, filename), 'r') as f:
+                        manifests.append(json.load(f))
+        return sorted(manifests, key=lambda manifest: manifest.get('created', ''), reverse=True)
+
+    def snapshot(self, name: str) -> dict:
+        """
+        Captures the service's data directory as a named snapshot.
+
+        Returns:
+            dict: The snapshot manifest, including timings and sizes.
+        """
+        if not os.path.isdir(self.data_dir):
+            raise FileNotFoundError(f"Data directory not found: {self.data_dir}")
+        os.makedirs(self.service_dir, exist_ok=True)
+
+        with self._service_stopped():
+            started = time.monotonic()
+            manifest = {
+                'service':  self.service,
+                'name':     name,
+                'created':  datetime.datetime.now().isoformat(timespec='seconds'),
+                'data_dir': self.data_dir,
+            }
+
+            tree_dir = self._tree_dir(name)
+            shutil.rmtree(tree_dir + '.partial', ignore_errors=True)
+            if self.use_reflinks and self._reflink_copy(self.data_dir, tree_dir + '.partial'):
+                shutil.rmtree(tree_dir, ignore_errors=True)
+                os.rename(tree_dir + '.partial', tree_dir)
+                manifest |= {'mode': 'reflink', 'bytes_read': 0, 'bytes_written': 0}
+            else:
+                shutil.rmtree(tree_dir + '.partial', ignore_errors=True)
+                manifest |= {'mode': 'chunks'} | self._capture_chunks()
+
+            manifest['seconds'] = round(time.monotonic() - started, 3)
+
+        with open(self._manifest_path(name), 'w') as f:
+            json.dump(manifest, f)
+        return manifest
+
+    def restore(self, name: str) -> dict:
+        """
+        Replaces the service's data directory with a named snapshot.
+
+        Returns:
+            dict: The snapshot manifest, with timings and sizes for this restore.
+        """
+        try:
+            with open(self._manifest_path(name), 'r') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No snapshot named '{name}' for service '{self.service}'.")
+
+        with self._service_stopped():
+            started = time.monotonic()
+            if manifest['mode'] == 'reflink':
+                restoring_dir = self.data_dir + '.restoring'
+                shutil.rmtree(restoring_dir, ignore_errors=True)
+                if not self._reflink_copy(self._tree_dir(name), restoring_dir):
+                    raise RuntimeError("Unable to copy the snapshot back into place.")
+                self._swap_dir(restoring_dir)
+                stats = {'files_written': None, 'bytes_written': None}
+            else:
+                stats = self._restore_chunks(manifest['entries'])
+            manifest |= stats | {'seconds': round(time.monotonic() - started, 3)}
+
+        return manifest
+
+    def delete(self, name: str) -> int:
+        """
+        Deletes a snapshot and any chunks no longer referenced by other snapshots.
+
+        Returns:
+            int: Bytes reclaimed from the chunk store.
+        """
+        manifest_path = self._manifest_path(name)
+        if not os.path.isfile(manifest_path):
+            raise FileNotFoundError(f"No snapshot named '{name}' for service '{self.service}'.")
+        os.remove(manifest_path)
+        shutil.rmtree(self._tree_dir(name), ignore_errors=True)
+        return self.collect_garbage()
+
+    def collect_garbage(self) -> int:
+        """Removes chunks not referenced by any snapshot of any service."""
+        referenced = set()
+        for service in os.listdir(self.snapshots_root):
+            service_dir = os.path.join(self.snapshots_root, service)
+            if service == 'chunks' or not os.path.isdir(service_dir):
+                continue
+            for filename in os.listdir(service_dir):
+                if filename.endswith('.json'):
+                    with open(os.path.join(service_dir, filename), 'r') as f:
+                        for entry in json.load(f).get('entries', []):
+                            referenced.update(entry.get('chunks', []))
+
+        reclaimed = 0
+        chunks_dir = self.store.root
+        if os.path.isdir(chunks_dir):
+            for prefix in os.listdir(chunks_dir):
+                for digest in os.listdir(os.path.join(chunks_dir, prefix)):
+                    if digest not in referenced:
+                        path = os.path.join(chunks_dir, prefix, digest)
+                        reclaimed += os.path.getsize(path)
+                        os.remove(path)
+        return reclaimed
+
+    def _capture_chunks(self) -> dict:
+        """Walks the data directory and stores new or changed files in the chunk store, in parallel."""
+        previous = self._previous_entries()
+        entries = []
+        to_store = []
+
+        for root, dirs, files in os.walk(self.data_dir):
+            for name in sorted(dirs) + sorted(files):
+                path = os.path.join(root, name)
+                st = os.lstat(path)
+                entry = {
+                    'path':     os.path.relpath(path, self.data_dir),
+                    'mode':     stat.S_IMODE(st.st_mode),
+                    'mtime_ns': st.st_mtime_ns,
+                    'uid':      st.st_uid,
+                    'gid':      st.st_gid,
+                }
+                if stat.S_ISLNK(st.st_mode):
+                    entry |= {'type': 'symlink', 'target': os.readlink(path)}
+                elif stat.S_ISDIR(st.st_mode):
+                    entry['type'] = 'dir'
+                elif stat.S_ISREG(st.st_mode):
+                    entry |= {'type': 'file', 'size': st.st_size}
+                    old = previous.get(entry['path'])
+                    if old and old.get('size') == st.st_size and old.get('mtime_ns') == st.st_mtime_ns \
+                            and all(self.store.has(digest) for digest in old['chunks']):
+                        entry['chunks'] = old['chunks']
+                    else:
+                        to_store.append(entry)
+                else:
+                    # Sockets, FIFOs, etc. are recreated by the service
+                    continue
+                entries.append(entry)
+
+        bytes_read = 0
+        bytes_written = 0
+        if to_store:
+            CliOutput.info(f"Chunking {len(to_store)} changed file(s) with {self.jobs} worker(s)...")
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                futures = {
+                    executor.submit(self.store.store_file, os.path.join(self.data_dir, entry['path'])): entry
+                    for entry in to_store
+                }
+                for future, entry in futures.items():
+                    result = future.result()
+                    entry['chunks'] = result['chunks']
+                    bytes_read += result['bytes_read']
+                    bytes_written += result['bytes_written']
+
+        return {
+            'entries':        entries,
+            'files':          sum(1 for entry in entries if entry['type'] == 'file'),
+            'files_reused':   sum(1 for entry in entries if entry['type'] == 'file') - len(to_store),
+            'logical_bytes':  sum(entry.get('size', 0) for entry in entries),
+            'bytes_read':     bytes_read,
+            'bytes_written':  bytes_written,
+        }
+
+    def _restore_chunks(self, entries: list) -> dict:
+        """Restores a chunk-mode snapshot in place, rewriting only files that differ, in parallel."""
+        os.makedirs(self.data_dir, exist_ok=True)
+        wanted = {entry['path'] for entry in entries}
+
+        # Remove anything the snapshot doesn't have (deepest paths first)
+        for root, dirs, files in os.walk(self.data_dir, topdown=False):
+            for name in files + dirs:
+                path = os.path.join(root, name)
+                if os.path.relpath(path, self.data_dir) not in wanted:
+                    if os.path.isdir(path) and not os.path.islink(path):
+                        shutil.rmtree(path)
+                    else:
+                        os.remove(path)
+
+        for entry in entries:
+            path = os.path.join(self.data_dir, entry['path'])
+            if entry['type'] == 'dir':
+                if os.path.islink(path) or os.path.isfile(path):
+                    os.remove(path)
+                os.makedirs(path, exist_ok=True)
+            elif entry['type'] == 'symlink':
+                if os.path.lexists(path):
+                    os.remove(path)
+                os.symlink(entry['target'], path)
+
+        to_write = []
+        for entry in entries:
+            if entry['type'] != 'file':
+                continue
+            try:
+                st = os.lstat(os.path.join(self.data_dir, entry['path']))
+                if stat.S_ISREG(st.st_mode) and st.st_size == entry['size'] and st.st_mtime_ns == entry['mtime_ns']:
+                    continue
+            except FileNotFoundError:
+                pass
+            to_write.append(entry)
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            bytes_written = sum(executor.map(self._write_file, to_write))
+
+        # Directory metadata last, since writing files changes it
+        for entry in reversed(entries):
+            if entry['type'] == 'dir':
+                self._apply_metadata(os.path.join(self.data_dir, entry['path']), entry)
+
+        return {'files_written': len(to_write), 'bytes_written': bytes_written}
+
+    def _write_file(self, entry: dict) -> int:
+        path = os.path.join(self.data_dir, entry['path'])
+        temp_path = path + '.anydev-restore'
+        written = 0
+        with open(temp_path, 'wb') as f:
+            for digest in entry['chunks']:
+                written += f.write(self.store.get(digest))
+        os.replace(temp_path, path)
+        self._apply_metadata(path, entry)
+        return written
+
+    @staticmethod
+    def _apply_metadata(path: str, entry: dict) -> None:
+        try:
+            os.chown(path, entry['uid'], entry['gid'])
+        except (PermissionError, KeyError):
+            # Only root can hand files back to the container's user; Docker Desktop maps ownership anyway
+            pass
+        os.chmod(path, entry['mode'])
+        os.utime(path, ns=(entry['mtime_ns'], entry['mtime_ns']))
+
+    def _previous_entries(self) -> dict:
+        """Gets path -> entry for the service's most recent chunk-mode snapshot."""
+        for manifest in self.list_snapshots():
+            if manifest.get('mode') == 'chunks':
+                return {entry['path']: entry for entry in manifest['entries'] if entry['type'] == 'file'}
+        return {}
+
+    def _swap_dir(self, new_dir: str) -> None:
+        """Atomically-ish replaces the data directory with another directory."""
+        old_dir = self.data_dir + '.previous'
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(self.data_dir):
+            os.rename(self.data_dir, old_dir)
+        os.rename(new_dir, self.data_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    @staticmethod
+    def _reflink_copy(source: str, target: str) -> bool:
+        """Copies a directory tree with copy-on-write clones. Returns False if the filesystem can't do that."""
+        if platform.system() == 'Darwin':
+            copy_cmd = ['cp', '-c', '-R', '-p', source, target]
+        else:
+            copy_cmd = ['cp', '-a', '--reflink=always', source, target]
+        result = subprocess.run(copy_cmd, capture_output=True)
+        if result.returncode != 0:
+            shutil.rmtree(target, ignore_errors=True)
+            return False
+        return True
+
+    def _manifest_path(self, name: str) -> str:
+        return os.path.join(self.service_dir, f"{name}.json")
+
+    def _tree_dir(self, name: str) -> str:
+        return os.path.join(self.service_dir, f"{name}.tree")
+
+    def _service_stopped(self):
+        """Context manager that stops the service and starts it again afterwards if it was running."""
+        service = self.service
+        root_dir = self.config.cli_root_dir
+
+        class ServiceStopped:
+            def __enter__(self):
+                self.was_running = DockerHelpers.is_service_running(service, root_dir)
+                if self.was_running:
+                    CliOutput.info(f"Stopping {service}...")
+                    DockerHelpers.stop_service(service, root_dir)
+
+            def __exit__(self, exc_type, exc_value, traceback):
+                if self.was_running:
+                    CliOutput.info(f"Starting {service}...")
+                    DockerHelpers.start_service(service, root_dir)
+                return False
+
+        return ServiceStopped()
@@ -0,0 +1,345 @@
+import json
+import os
+import re
+import subprocess
+import time
+import yaml
+
+from anydev.configuration import Configuration
+from anydev.core.compose_files import ComposeFiles
+from anydev.core.docker_controls import DockerHelpers
+
+
+class ServiceTuning:
+    """
+    Sizes the shared database and cache services for the machine they run on, pgtune-style.
+
+    Host resources come from `docker info`, which reports what the Docker engine (or Docker Desktop's VM) actually
+    has. A memory budget is split between the active tunable services and turned into command-line settings, which
+    are written to a compose override file that's layered on top of docker-compose.yml whenever services are
+    (re)started. Durability is relaxed throughout: local data is disposable, and fsync-heavy defaults are the main
+    cost of database writes on Docker Desktop's file sharing.
+    """
+
+    # Relative share of the memory budget each service gets, when active
+    WEIGHTS = {
+        'mysql':     4,
+        'postgres':  4,
+        'redis':     1,
+        'memcached': 1,
+    }
+
+    # Share of Docker's memory used when no budget is configured
+    AUTO_BUDGET = 0.25
+
+    MB = 1024 * 1024
+
+    def __init__(self):
+        self.config = Configuration()
+        self.override_file = self.config.tuning_override_file
+        self.tuning_dir = os.path.dirname(self.override_file)
+        self.benchmark_file = os.path.join(self.tuning_dir, 'benchmarks.json')
+
+    @staticmethod
+    def get_host_resources() -> dict:
+        """
+        Gets the CPUs and memory available to Docker containers.
+
+        Returns:
+            dict: 'cpus' and 'memory_mb'.
+        """
+        try:
+            result = subprocess.run(['docker', 'info', '--format', '{{json .}}'], capture_output=True, text=True)
+            info = json.loads(result.stdout) if result.returncode == 0 else {}
+            return {'cpus': int(info['NCPU']), 'memory_mb': int(info['MemTotal']) // ServiceTuning.MB}
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        # Docker isn't reachable; fall back to the host itself
+        memory = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') if hasattr(os, 'sysconf') else 0
+        return {'cpus': os.cpu_count() or 1, 'memory_mb': memory // ServiceTuning.MB}
+
+    def get_tunable_services(self, profiles: list = None) -> list:
+        """Lists the tunable services enabled by the given (or active) profiles."""
+        profiles = self.config.get_active_profiles() if profiles is None else profiles
+        return [service for service in self.WEIGHTS if service in profiles]
+
+    def plan(self, budget_mb: int, resources: dict, services: list) -> dict:
+        """
+        Calculates settings for each service.
+
+        Args:
+            budget_mb (int): Total memory (MB) to hand out between the services.
+            resources (dict): 'cpus' and 'memory_mb', from get_host_resources().
+            services (list): Services to tune.
+
+        Returns:
+            dict: Service -> {'memory_mb', 'settings' (dict), 'command' (list)}
+        """
+        total_weight = sum(self.WEIGHTS[service] for service in services) or 1
+        cpus = max(1, resources['cpus'])
+        env = ComposeFiles.get_env(self.config.cli_root_dir)
+
+        plans = {}
+        for service in services:
+            memory_mb = max(64, budget_mb * self.WEIGHTS[service] // total_weight)
+            settings = getattr(self, f"_plan_{service}")(memory_mb, cpus, env)
+            plans[service] = {
+                'memory_mb': memory_mb,
+                'settings':  settings,
+                'command':   getattr(self, f"_command_{service}")(settings),
+            }
+        return plans
+
+    def write_override(self, plans: dict) -> str:
+        """
+        Writes the compose override file for the planned settings.
+
+        Returns:
+            str: The override file's path.
+        """
+        override = {
+            'services': {
+                service: {
+                    'command': plan['command'],
+                    'labels':  [f"anydev.tuning.memory_mb={plan['memory_mb']}"],
+                }
+                for service, plan in plans.items()
+            }
+        }
+        os.makedirs(self.tuning_dir, exist_ok=True)
+        with open(self.override_file, 'w') as f:
+            f.write("# Generated by `anydev services tune`. Changes will be overwritten.\n")
+            yaml.safe_dump(override, f, sort_keys=False)
+        return self.override_file
+
+    def remove_override(self) -> None:
+        if os.path.exists(self.override_file):
+            os.remove(self.override_file)
+
+    def apply(self, budget_mb: int = None) -> dict:
+        """
+        Plans settings for the active services, writes the override file and enables tuning in the configuration.
+        The configuration still needs to be saved and the services restarted.
+
+        Args:
+            budget_mb (int): Memory budget (MB). Defaults to the configured budget, or AUTO_BUDGET of Docker's memory.
+
+        Returns:
+            dict: The plans, as returned by plan().
+        """
+        resources = self.get_host_resources()
+        budget_mb = budget_mb or self.config.get_tuning_settings()['budget_mb'] \
+            or int(resources['memory_mb'] * self.AUTO_BUDGET)
+        plans = self.plan(budget_mb, resources, self.get_tunable_services())
+        self.write_override(plans)
+        self.config.set_tuning_settings(True, budget_mb)
+        return plans
+
+    def disable(self) -> None:
+        """Removes the override file and disables tuning in the configuration."""
+        self.remove_override()
+        self.config.set_tuning_settings(False, self.config.get_tuning_settings()['budget_mb'])
+
+    def wait_until_ready(self, services: list, timeout: float = 90) -> list:
+        """
+        Waits for services to accept connections after a restart.
+
+        Returns:
+            list: Services that didn't become ready in time.
+        """
+        checks = {
+            'mysql':     ['anydev-mysql', ['mysqladmin', 'ping', '-uroot', '--silent']],
+            'postgres':  ['anydev-postgres', ['pg_isready', '-U', 'postgres']],
+            'redis':     ['anydev-redis', ['redis-cli', 'ping']],
+            'memcached': ['anydev-memcached', ['true']],
+        }
+        password = ComposeFiles.get_env(self.config.cli_root_dir).get('MYSQL_ROOT_PASSWORD', '')
+        deadline = time.monotonic() + timeout
+        pending = [service for service in services if service in checks]
+        while pending and time.monotonic() < deadline:
+            for service in list(pending):
+                container, command = checks[service]
+                try:
+                    self._exec(container, command, {'MYSQL_PWD': password} if service == 'mysql' else None)
+                    pending.remove(service)
+                except RuntimeError:
+                    continue
+            if pending:
+                time.sleep(1)
+        return pending
+
+    # ----------------
+    # Service settings
+    # ----------------
+
+    @staticmethod
+    def _plan_mysql(memory_mb: int, cpus: int, env: dict) -> dict:
+        buffer_pool_mb = max(128, memory_mb * 3 // 4)
+        settings = {
+            'innodb-buffer-pool-size':        f"{buffer_pool_mb}M",
+            'innodb-buffer-pool-instances':   max(1, min(8, buffer_pool_mb // 1024)),
+            'innodb-log-buffer-size':         '64M',
+            'innodb-io-capacity':             2000,
+            'innodb-read-io-threads':         max(4, min(16, cpus)),
+            'innodb-write-io-threads':        max(4, min(16, cpus)),
+            # Relaxed durability: flush the log once a second, no binlog sync, no doublewrite buffer
+            'innodb-flush-log-at-trx-commit': 2,
+            'innodb-doublewrite':             'OFF',
+            'sync-binlog':                    0,
+            'skip-log-bin':                   None,
+            'max-connections':                200,
+        }
+        # innodb_redo_log_capacity replaced innodb_log_file_size in MySQL 8.0.30
+        if not str(env.get('VER_MYSQL', '8')).startswith('5'):
+            settings['innodb-redo-log-capacity'] = f"{max(512, buffer_pool_mb // 2)}M"
+        return settings
+
+    @staticmethod
+    def _command_mysql(settings: dict) -> list:
+        return ['mysqld'] + [f"--{key}" if value is None else f"--{key}={value}" for key, value in settings.items()]
+
+    @staticmethod
+    def _plan_postgres(memory_mb: int, cpus: int, env: dict) -> dict:
+        max_connections = 100
+        shared_buffers_mb = max(128, memory_mb // 4)
+        parallel_per_gather = max(1, min(4, cpus // 2))
+        work_mem_kb = (memory_mb - shared_buffers_mb) * 1024 // (max_connections * 3) // parallel_per_gather
+        return {
+            'max_connections':                  max_connections,
+            'shared_buffers':                   f"{shared_buffers_mb}MB",
+            'effective_cache_size':             f"{memory_mb * 3 // 4}MB",
+            'maintenance_work_mem':             f"{min(2048, max(64, memory_mb // 16))}MB",
+            'work_mem':                         f"{max(4096, work_mem_kb)}kB",
+            'wal_buffers':                      '16MB',
+            'min_wal_size':                     '1GB',
+            'max_wal_size':                     '4GB',
+            'checkpoint_completion_target':     0.9,
+            'default_statistics_target':        100,
+            'random_page_cost':                 1.1,
+            'effective_io_concurrency':         200,
+            'max_worker_processes':             cpus,
+            'max_parallel_workers':             cpus,
+            'max_parallel_workers_per_gather':  parallel_per_gather,
+            'max_parallel_maintenance_workers': parallel_per_gather,
+            # Relaxed durability: a crash may lose (or corrupt) local data, which is an acceptable tradeoff here
+            'fsync':                            'off',
+            'synchronous_commit':               'off',
+            'full_page_writes':                 'off',
+        }
+
+    @staticmethod
+    def _command_postgres(settings: dict) -> list:
+        command = ['postgres']
+        for key, value in settings.items():
+            command += ['-c', f"{key}={value}"]
+        return command
+
+    @staticmethod
+    def _plan_redis(memory_mb: int, cpus: int, env: dict) -> dict:
+        settings = {
+            'maxmemory':        f"{memory_mb}mb",
+            'maxmemory-policy': 'allkeys-lru',
+            # No RDB snapshots or AOF; Redis is a cache here
+            'save':             '',
+            'appendonly':       'no',
+        }
+        # Threaded I/O (Redis 6+) only pays off with a few cores to spare
+        if cpus >= 4 and not str(env.get('VER_REDIS', '7')).startswith(('4', '5')):
+            settings['io-threads'] = min(4, cpus // 2)
+        return settings
+
+    @staticmethod
+    def _command_redis(settings: dict) -> list:
+        command = ['redis-server']
+        for key, value in settings.items():
+            command += [f"--{key}", str(value)]
+        return command
+
+    @staticmethod
+    def _plan_memcached(memory_mb: int, cpus: int, env: dict) -> dict:
+        return {
+            'memory-limit':    memory_mb,
+            'threads':         max(4, min(16, cpus)),
+            'conn-limit':      1024,
+            'max-item-size':   '4m',
+        }
+
+    @staticmethod
+    def _command_memcached(settings: dict) -> list:
+        return ['memcached'] + [f"--{key}={value}" for key, value in settings.items()]
+
+    # ----------
+    # Benchmarks
+    # ----------
+
+    def benchmark(self, services: list) -> dict:
+        """
+        Runs a short, standard benchmark against each running service.
+
+        Returns:
+            dict: Service -> {'metric', 'value', 'unit'} (or {'error'}).
+        """
+        results = {}
+        for service in services:
+            runner = getattr(self, f"_benchmark_{service}", None)
+            if runner is None:
+                results[service] = {'error': "no benchmark tool in the image"}
+                continue
+            try:
+                results[service] = runner()
+            except RuntimeError as e:
+                results[service] = {'error': str(e)}
+        return results
+
+    def save_benchmark(self, label: str, results: dict) -> None:
+        """Records benchmark results (e.g. 'baseline', 'tuned') for later comparison."""
+        history = self.load_benchmarks()
+        history[label] = {'time': time.time(), 'results': results}
+        os.makedirs(self.tuning_dir, exist_ok=True)
+        with open(self.benchmark_file, 'w') as f:
+            json.dump(history, f, indent=2)
+
+    def load_benchmarks(self) -> dict:
+        try:
+            with open(self.benchmark_file, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    @staticmethod
+    def _exec(container: str, command: list, env: dict = None) -> str:
+        # Benchmark tools report some of their results on stderr
+        return DockerHelpers.exec_in_container(container, command, env, include_stderr=True)
+
+    def _benchmark_mysql(self) -> dict:
+        password = ComposeFiles.get_env(self.config.cli_root_dir).get('MYSQL_ROOT_PASSWORD', '')
+        output = self._exec('anydev-mysql', [
+            'mysqlslap', '-uroot', '--concurrency=8', '--iterations=3', '--number-of-queries=4000',
+            '--auto-generate-sql', '--auto-generate-sql-load-type=mixed', '--auto-generate-sql-add-autoincrement',
+            '--engine=innodb',
+        ], {'MYSQL_PWD': password})
+        match = re.search(r'Average number of seconds to run all queries:\s*([\d.]+)', output)
+        if not match:
+            raise RuntimeError("unexpected mysqlslap output")
+        return {'metric': 'mixed workload time', 'value': float(match.group(1)), 'unit': 's', 'lower_is_better': True}
+
+    def _benchmark_postgres(self) -> dict:
+        env = {'PGUSER': 'postgres'}
+        self._exec('anydev-postgres', ['sh', '-c', 'dropdb --if-exists anydev_bench && createdb anydev_bench'], env)
+        try:
+            self._exec('anydev-postgres', ['pgbench', '-i', '-q', '-s', '10', 'anydev_bench'], env)
+            output = self._exec('anydev-postgres', ['pgbench', '-c', '8', '-j', '4', '-T', '20', 'anydev_bench'], env)
+        finally:
+            self._exec('anydev-postgres', ['dropdb', '--if-exists', 'anydev_bench'], env)
+        match = re.search(r'tps = ([\d.]+)', output)
+        if not match:
+            raise RuntimeError("unexpected pgbench output")
+        return {'metric': 'TPC-B transactions', 'value': float(match.group(1)), 'unit': 'tps', 'lower_is_better': False}
+
+    def _benchmark_redis(self) -> dict:
+        output = self._exec('anydev-redis', ['redis-benchmark', '-q', '-n', '200000', '-c', '50', '-P', '16', '-t', 'set,get'])
+        values = [float(value) for value in re.findall(r'([\d.]+) requests per second', output)]
+        if not values:
+            raise RuntimeError("unexpected redis-benchmark output")
+        return {'metric': 'SET/GET', 'value': sum(values) / len(values), 'unit': 'req/s', 'lower_is_better': False}
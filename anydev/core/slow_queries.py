@@ -0,0 +1,296 @@
+import re
+import subprocess
+import time
+
+from anydev.core.db_snapshots import MysqlEngine, PostgresEngine
+from anydev.core.latency_histogram import LatencyHistogram
+
+
+class QueryDigest:
+    """
+    Aggregates queries by fingerprint: the query with its literals replaced, so `WHERE id = 1` and `WHERE id = 2`
+    count as the same query.
+
+    Memory depends only on the number of distinct fingerprints (capped), never on the number of queries, so logs of
+    any size can be streamed through it.
+    """
+
+    # Past this, new fingerprints are counted together instead of individually
+    MAX_FINGERPRINTS = 5000
+    OTHER = '(other queries)'
+
+    # Longest example query kept per fingerprint
+    EXAMPLE_LENGTH = 500
+
+    # `#` starts a comment only in MySQL; in Postgres `#`, `#>`, and `#>>` are operators
+    _COMMENT_P = re.compile(r'/\*.*?\*/|--[^\n]*', re.S)
+    _MYSQL_COMMENT_P = re.compile(r'/\*.*?\*/|--[^\n]*|#[^\n]*', re.S)
+    # Double quotes delimit strings in MySQL, but identifiers in Postgres
+    _STRING_P = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+    _MYSQL_STRING_P = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+    _NUMBER_P = re.compile(r'(?<![\w$])-?(?:0x[0-9a-f]+|\d+(?:\.\d+)?(?:e[+-]?\d+)?)\b', re.I)
+    _PARAMETER_P = re.compile(r'\$\d+')
+    _LIST_P = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+    _VALUES_P = re.compile(r'(values\s*\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+')
+    _SPACE_P = re.compile(r'\s+')
+
+    def __init__(self, engine: str = 'mysql'):
+        self.engine = engine
+        self.fingerprints = {}
+
+    @staticmethod
+    def fingerprint(sql: str, engine: str = 'mysql') -> str:
+        """Normalizes a query: literals become ?, lists of them (...), and case and spacing are made uniform."""
+        mysql = engine == 'mysql'
+        sql = (QueryDigest._MYSQL_STRING_P if mysql else QueryDigest._STRING_P).sub('?', sql)
+        sql = (QueryDigest._MYSQL_COMMENT_P if mysql else QueryDigest._COMMENT_P).sub(' ', sql)
+        sql = QueryDigest._NUMBER_P.sub('?', sql)
+        sql = QueryDigest._PARAMETER_P.sub('?', sql)
+        sql = QueryDigest._SPACE_P.sub(' ', sql).strip().rstrip(';').strip().lower()
+        sql = QueryDigest._LIST_P.sub('(...)', sql)
+        return QueryDigest._VALUES_P.sub(r'\1', sql)
+
+    def add(self, sql: str, seconds: float, database: str = None, rows_examined: int = None,
+            rows_sent: int = None) -> None:
+        fingerprint = self.fingerprint(sql, self.engine)
+        if fingerprint not in self.fingerprints and len(self.fingerprints) >= self.MAX_FINGERPRINTS:
+            fingerprint = self.OTHER
+        entry = self.fingerprints.get(fingerprint)
+        if entry is None:
+            entry = self.fingerprints[fingerprint] = {
+                'histogram':     LatencyHistogram(),
+                'databases':     set(),
+                'rows_examined': 0,
+                'rows_sent':     0,
+                'example':       sql.strip()[:self.EXAMPLE_LENGTH],
+            }
+        entry['histogram'].record(seconds)
+        if database and len(entry['databases']) < 10:
+            entry['databases'].add(database)
+        entry['rows_examined'] += rows_examined or 0
+        entry['rows_sent'] += rows_sent or 0
+
+    def report(self, sort: str = 'total', top: int = 15) -> list:
+        """
+        Lists the worst fingerprints.
+
+        Args:
+            sort (str): total, p95, max, count, or rows (rows examined).
+            top (int): How many to list.
+
+        Returns:
+            list: Dicts with fingerprint, example, databases, count, total, mean, p95, max, rows_examined, rows_sent.
+        """
+        rows = []
+        for fingerprint, entry in self.fingerprints.items():
+            histogram = entry['histogram']
+            rows.append({
+                'fingerprint':   fingerprint,
+                'example':       entry['example'],
+                'databases':     sorted(entry['databases']),
+                'count':         histogram.count,
+                'total':         histogram.total,
+                'mean':          histogram.mean,
+                'p95':           histogram.quantile(0.95),
+                'max':           histogram.max,
+                'rows_examined': entry['rows_examined'],
+                'rows_sent':     entry['rows_sent'],
+            })
+        key = 'rows_examined' if sort == 'rows' else sort
+        rows.sort(key=lambda row: row[key] or 0, reverse=True)
+        return rows[:top]
+
+    @property
+    def total_queries(self) -> int:
+        return sum(entry['histogram'].count for entry in self.fingerprints.values())
+
+
+class SlowQueryLog:
+    """
+    Captures slow queries from a shared database container for a session, and digests them.
+
+    MySQL writes its slow query log to a file in the container; Postgres logs statements over a duration threshold
+    (log_min_duration_statement) to its container output. Either way, the settings are changed at runtime only and
+    put back when the session ends, and the log is streamed through the parser line by line.
+    """
+
+    ENGINES = ['mysql', 'postgres']
+
+    MYSQL_LOG_FILE = '/tmp/anydev-slow.log'
+    MYSQL_SETTINGS = ['slow_query_log', 'slow_query_log_file', 'long_query_time', 'log_output']
+    POSTGRES_SETTINGS = ['log_min_duration_statement', 'log_line_prefix']
+
+    _MYSQL_STATS_P = re.compile(r'^# Query_time: (?P<time>[\d.]+)\s+Lock_time: [\d.]+\s+Rows_sent: (?P<sent>\d+)'
+                                r'\s+Rows_examined: (?P<examined>\d+)')
+    _MYSQL_USE_P = re.compile(r'^use `?(?P<database>[^`;]+)`?;', re.I)
+    _POSTGRES_P = re.compile(r'db=(?P<database>\S*) .*?LOG:\s+duration: (?P<ms>[\d.]+) ms\s+'
+                             r'(?:statement|execute [^:]*|parse [^:]*|bind [^:]*):\s(?P<sql>.*)$')
+
+    def __init__(self, engine: str):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unsupported database engine: {engine}. Use {' or '.join(self.ENGINES)}.")
+        self.engine_name = engine
+        self.engine = MysqlEngine('mysql') if engine == 'mysql' else PostgresEngine('postgres')
+        self.previous = {}
+        self.started = None
+        self.offset = 0
+
+    def start(self, threshold: float) -> None:
+        """
+        Starts logging queries slower than the threshold.
+
+        Args:
+            threshold (float): In seconds. 0 logs every query.
+
+        Raises:
+            RuntimeError: If the settings can't be changed (e.g. the container isn't running).
+        """
+        self.started = time.time()
+        if self.engine_name == 'mysql':
+            rows = self.engine.query(f"SELECT {', '.join(f'@@GLOBAL.{name}' for name in self.MYSQL_SETTINGS)}")
+            self.previous = dict(zip(self.MYSQL_SETTINGS, rows[0]))
+            self.offset = self._mysql_log_size()
+            self.engine.query(
+                f"SET GLOBAL slow_query_log_file = '{self.MYSQL_LOG_FILE}'; SET GLOBAL log_output = 'FILE'; "
+                f"SET GLOBAL long_query_time = {threshold:f}; SET GLOBAL slow_query_log = ON"
+            )
+        else:
+            self.previous = {
+                name: (setting, source) for name, setting, source in
+                self.engine.query("SELECT name, setting, source FROM pg_settings WHERE name IN "
+                                  f"({', '.join(repr(name) for name in self.POSTGRES_SETTINGS)})")
+            }
+            self._postgres_set({
+                'log_min_duration_statement': str(round(threshold * 1000)),
+                # Adds the database to each line, to attribute queries to projects
+                'log_line_prefix':            '%m [%p] db=%d ',
+            })
+
+    def stop(self) -> None:
+        """Puts the logging settings back the way they were."""
+        if self.engine_name == 'mysql':
+            self.engine.query(
+                f"SET GLOBAL slow_query_log = {self.previous['slow_query_log']}; "
+                f"SET GLOBAL long_query_time = {self.previous['long_query_time']}; "
+                f"SET GLOBAL log_output = '{self.previous['log_output']}'; "
+                f"SET GLOBAL slow_query_log_file = '{self.previous['slow_query_log_file']}'"
+            )
+        else:
+            statements = []
+            for name, (setting, source) in self.previous.items():
+                if source == 'configuration file':
+                    statements.append(f"ALTER SYSTEM SET {name} = '{setting.replace(chr(39), chr(39) * 2)}'")
+                else:
+                    statements.append(f"ALTER SYSTEM RESET {name}")
+            for statement in statements + ["SELECT pg_reload_conf()"]:
+                self.engine.query(statement)
+
+    def digest(self, database: str = None) -> QueryDigest:
+        """
+        Streams the session's log through a digest.
+
+        Args:
+            database (str): Only count queries against this database.
+        """
+        if self.engine_name == 'mysql':
+            command = self.engine.exec_cmd(['sh', '-c', f'tail -c +{self.offset + 1} {self.MYSQL_LOG_FILE} '
+                                                        f'&& rm -f {self.MYSQL_LOG_FILE}'])
+            parse = self.parse_mysql
+        else:
+            command = ['docker', 'logs', '--since', str(int(self.started)), self.engine.container]
+            parse = self.parse_postgres
+
+        digest = QueryDigest(self.engine_name)
+        # Postgres logs to stderr
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                   errors='replace')
+        try:
+            for entry in parse(process.stdout):
+                if not database or entry['database'] == database:
+                    digest.add(**entry)
+        finally:
+            process.stdout.close()
+            process.wait()
+        return digest
+
+    @staticmethod
+    def parse_file(path: str, engine: str, database: str = None) -> QueryDigest:
+        """Digests an existing log file (a MySQL slow log or Postgres server log) without starting a session."""
+        parse = SlowQueryLog.parse_mysql if engine == 'mysql' else SlowQueryLog.parse_postgres
+        digest = QueryDigest(engine)
+        with open(path, 'r', errors='replace') as lines:
+            for entry in parse(lines):
+                if not database or entry['database'] == database:
+                    digest.add(**entry)
+        return digest
+
+    @staticmethod
+    def parse_mysql(lines):
+        """
+        Parses a MySQL slow query log one line at a time.
+
+        Yields:
+            dict: sql, seconds, database, rows_examined, rows_sent
+        """
+        database, stats, sql = None, None, []
+
+        def entry():
+            return {'sql': ' '.join(sql), 'seconds': float(stats['time']), 'database': database,
+                    'rows_examined': int(stats['examined']), 'rows_sent': int(stats['sent'])}
+
+        for line in lines:
+            line = line.rstrip('\n')
+            if line.startswith('#'):
+                if stats and sql:
+                    yield entry()
+                    stats, sql = None, []
+                match = SlowQueryLog._MYSQL_STATS_P.match(line)
+                if match:
+                    stats, sql = match, []
+                continue
+            if not stats:
+                # Server start-up banner lines
+                continue
+            use = SlowQueryLog._MYSQL_USE_P.match(line)
+            if use:
+                database = use.group('database')
+            elif not line.startswith('SET timestamp=') and line.strip():
+                sql.append(line.strip())
+        if stats and sql:
+            yield entry()
+
+    @staticmethod
+    def parse_postgres(lines):
+        """
+        Parses Postgres log lines with durations (log_min_duration_statement), including continuation lines of
+        multi-line statements.
+
+        Yields:
+            dict: sql, seconds, database
+        """
+        current = None
+        for line in lines:
+            line = line.rstrip('\n')
+            if current and line.startswith('\t'):
+                current['sql'] += ' ' + line.strip()
+                continue
+            if current:
+                yield current
+                current = None
+            match = SlowQueryLog._POSTGRES_P.search(line)
+            if match:
+                current = {'sql': match.group('sql'), 'seconds': float(match.group('ms')) / 1000,
+                           'database': match.group('database') or None}
+        if current:
+            yield current
+
+    def _mysql_log_size(self) -> int:
+        result = subprocess.run(self.engine.exec_cmd(['sh', '-c', f'stat -c %s {self.MYSQL_LOG_FILE} 2>/dev/null']),
+                                capture_output=True, text=True)
+        output = result.stdout.strip()
+        return int(output) if output.isdigit() else 0
+
+    def _postgres_set(self, settings: dict) -> None:
+        for name, value in settings.items():
+            self.engine.query(f"ALTER SYSTEM SET {name} = '{value}'")
+        self.engine.query("SELECT pg_reload_conf()")
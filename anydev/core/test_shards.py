@@ -0,0 +1,336 @@
+import fnmatch
+import heapq
+import json
+import os
+import re
+import shlex
+import time
+import xml.etree.ElementTree as ElementTree
+
+from anydev.configuration import Configuration
+from anydev.core.compose_files import ComposeFiles
+from anydev.core.docker_controls import DockerHelpers
+from anydev.core.docker_engine import DockerEngine
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import dotenv_values
+
+
+class TestShards:
+    """
+    Runs a project's test suite as parallel shards inside its running app container.
+
+    Test files are split into shards by their recorded durations (longest first, each onto the least loaded shard),
+    so shards finish close together. Each shard runs in its own exec session with its own copy of the project's
+    database: a cloned schema on MySQL, or a database created from the original as a template on Postgres. The
+    shards' JUnit reports are merged into reports/junit.xml, and the durations in them are recorded in
+    reports/test-durations.json for the next run's split.
+    """
+
+    # Per template: test file name patterns, and the runner command. {files}, {junit}, {shard} and {shards} are
+    # filled in for each shard.
+    TEMPLATES = {
+        'apache-php': {
+            'patterns': ['*Test.php'],
+            'command':  'vendor/bin/phpunit --log-junit {junit} {files}',
+        },
+        'python':     {
+            'patterns': ['test_*.py', '*_test.py'],
+            # xunit1 reports include each test's file
+            'command':  'PATH="$PWD/.venv/bin:$PATH" python -m pytest -o junit_family=xunit1 --junitxml={junit} '
+                        '{files}',
+        },
+    }
+
+    # Dependency directories never hold the project's own tests
+    SKIP_DIRS = {'.git', '.venv', 'node_modules', 'vendor', '__pycache__'}
+
+    DURATIONS_FILE = 'test-durations.json'
+    SHARD_DIR = 'test-shards'
+
+    # Env variables that name the project's database; any the project uses are pointed at the shard's copy
+    DATABASE_KEYS = {
+        'mysql':    ['MYSQL_DATABASE', 'DB_DATABASE'],
+        'postgres': ['POSTGRES_DB', 'DB_DATABASE'],
+    }
+
+    _IDENTIFIER_P = re.compile(r'^[A-Za-z0-9_$]+$')
+
+    def __init__(self, project_path: str, shards: int, command: str = None, patterns: list = None,
+                 database: str = 'auto'):
+        self.project_path = os.path.abspath(project_path)
+        self.shards = max(1, shards)
+        self.config = Configuration()
+        self.env = dotenv_values(os.path.join(self.project_path, '.env'))
+        defaults = self.TEMPLATES.get(self.env.get('ANYDEV_TEMPLATE'), {})
+        self.command = command or defaults.get('command')
+        self.patterns = patterns or defaults.get('patterns') or []
+
+        self.source_dir, self.workdir, self.reports_dir, self.reports_target = self._find_mounts()
+        self.durations_file = os.path.join(self.reports_dir, self.DURATIONS_FILE)
+        self.database, self.database_name = self._find_database(database)
+
+    # ----------
+    # Assignment
+    # ----------
+
+    def discover(self) -> list:
+        """Lists test files, relative to the source directory (and so to the container's working directory)."""
+        files = []
+        for root, dirs, names in os.walk(self.source_dir):
+            dirs[:] = sorted(name for name in dirs if name not in self.SKIP_DIRS)
+            for name in names:
+                if any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns):
+                    files.append(os.path.relpath(os.path.join(root, name), self.source_dir))
+        return sorted(files)
+
+    def assign(self, files: list) -> list:
+        """
+        Splits test files into shards by their recorded durations. Files without one are assumed to take the
+        median recorded time.
+
+        Returns:
+            list: One {'files': [...], 'estimate': seconds} per shard.
+        """
+        durations = self.load_durations().get('files', {})
+        known = sorted(durations[file] for file in files if file in durations)
+        default = known[len(known) // 2] if known else 1.0
+
+        shards = [{'files': [], 'estimate': 0.0} for _ in range(min(self.shards, max(len(files), 1)))]
+        heap = [(0.0, index) for index in range(len(shards))]
+        for file in sorted(files, key=lambda file: (-durations.get(file, default), file)):
+            load, index = heapq.heappop(heap)
+            shards[index]['files'].append(file)
+            shards[index]['estimate'] += durations.get(file, default)
+            heapq.heappush(heap, (shards[index]['estimate'], index))
+        return shards
+
+    # ---------
+    # Databases
+    # ---------
+
+    def prepare_databases(self, count: int) -> list:
+        """
+        Creates a fresh copy of the project database for each shard.
+
+        Returns:
+            list: The env variables pointing each shard at its copy.
+
+        Raises:
+            RuntimeError: If a copy can't be made.
+        """
+        if not self.database:
+            return [{} for _ in range(count)]
+
+        names = [self.get_shard_database(index) for index in range(count)]
+        if self.database == 'mysql':
+            exists = self._mysql(['-N', '-e', "SELECT SCHEMA_NAME FROM information_schema.SCHEMATA "
+                                              f"WHERE SCHEMA_NAME = '{self.database_name}'"]).strip()
+            for name in names:
+                self._mysql(['-e', f"DROP DATABASE IF EXISTS `{name}`; CREATE DATABASE `{name}`"])
+            if exists:
+                # Dump once, load into every copy
+                dump = '/tmp/anydev-test-clone.sql'
+                script = f'mysqldump -uroot --single-transaction --routines --triggers "$0" > {dump}'
+                for index in range(len(names)):
+                    script += f' && mysql -uroot "${{{index + 1}}}" < {dump}'
+                script += f'; status=$?; rm -f {dump}; exit $status'
+                self._mysql(['sh', '-c', script, self.database_name] + names, shell=True)
+        else:
+            exists = self._psql(f"SELECT 1 FROM pg_database WHERE datname = '{self.database_name}'").strip()
+            for name in names:
+                self._psql(f'DROP DATABASE IF EXISTS "{name}"')
+                # Copying from a template fails while anything is connected to it (e.g. the running app)
+                self._psql(f'CREATE DATABASE "{name}"' + (f' TEMPLATE "{self.database_name}"' if exists else ''))
+
+        keys = [key for key in self.DATABASE_KEYS[self.database] if key in self.env]
+        return [{key: name for key in keys} | {'ANYDEV_TEST_DATABASE': name} for name in names]
+
+    def drop_databases(self, count: int) -> None:
+        for index in range(count):
+            name = self.get_shard_database(index)
+            if self.database == 'mysql':
+                self._mysql(['-e', f"DROP DATABASE IF EXISTS `{name}`"])
+            elif self.database == 'postgres':
+                self._psql(f'DROP DATABASE IF EXISTS "{name}"')
+
+    def get_shard_database(self, index: int) -> str:
+        return f"{self.database_name}_shard{index + 1}"
+
+    # -------
+    # Running
+    # -------
+
+    def run(self, shards: list, databases: list, progress: callable = None) -> list:
+        """
+        Runs every shard at once, each in its own exec session in the app container.
+
+        Args:
+            shards (list): From assign().
+            databases (list): From prepare_databases().
+            progress (callable): Called with (shard number, result) when a shard finishes.
+
+        Returns:
+            list: Per shard: 'files', 'estimate', 'exit_code', 'seconds', 'log' and 'junit' (host paths).
+        """
+        container_id = DockerEngine().find_project_container(self.project_path,
+                                                             hostname=f"{self.env.get('HOSTNAME')}.site.test")
+        if not container_id:
+            raise RuntimeError("The project is not currently running.")
+        shard_dir = os.path.join(self.reports_dir, self.SHARD_DIR)
+        os.makedirs(shard_dir, exist_ok=True)
+
+        def run_shard(index: int) -> dict:
+            result = shards[index] | {
+                'log':   os.path.join(shard_dir, f"shard-{index + 1}.log"),
+                'junit': os.path.join(shard_dir, f"shard-{index + 1}.xml"),
+            }
+            if os.path.exists(result['junit']):
+                os.remove(result['junit'])
+            command = self.command.format(
+                files=' '.join(shlex.quote(file) for file in result['files']),
+                junit=shlex.quote(f"{self.reports_target}/{self.SHARD_DIR}/shard-{index + 1}.xml"),
+                shard=index + 1,
+                shards=len(shards)
+            )
+            env = databases[index] | {'ANYDEV_TEST_SHARD': str(index + 1), 'ANYDEV_TEST_SHARDS': str(len(shards))}
+
+            started = time.monotonic()
+            with open(result['log'], 'wb') as log:
+                # The engine client's connection isn't shared between threads
+                result['exit_code'] = DockerEngine().run(container_id, ['sh', '-c', command], workdir=self.workdir,
+                                                         env=env, stdout=log, stderr=log)
+            result['seconds'] = time.monotonic() - started
+            if progress:
+                progress(index + 1, result)
+            return result
+
+        with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+            return list(executor.map(run_shard, range(len(shards))))
+
+    # -------
+    # Reports
+    # -------
+
+    def merge_reports(self, results: list) -> dict:
+        """
+        Merges the shards' JUnit reports into reports/junit.xml and records per-test durations.
+
+        Returns:
+            dict: Totals: tests, failures, errors, skipped, time, and missing (shards that wrote no report).
+        """
+        merged = ElementTree.Element('testsuites', {'name': 'anydev test shards'})
+        totals = {'tests': 0, 'failures': 0, 'errors': 0, 'skipped': 0, 'time': 0.0, 'missing': 0}
+        test_durations, file_durations = {}, {}
+
+        for number, result in enumerate(results, start=1):
+            try:
+                root = ElementTree.parse(result['junit']).getroot()
+            except (OSError, ElementTree.ParseError):
+                totals['missing'] += 1
+                continue
+            for suite in [root] if root.tag == 'testsuite' else root.findall('testsuite'):
+                suite.set('name', f"{suite.get('name', 'shard')} (shard {number})")
+                merged.append(suite)
+                for key in ['tests', 'failures', 'errors', 'skipped']:
+                    totals[key] += int(suite.get(key, 0) or 0)
+                totals['time'] += float(suite.get('time', 0) or 0)
+            for case in root.iter('testcase'):
+                seconds = float(case.get('time', 0) or 0)
+                file = self._get_case_file(case, result['files'])
+                test_durations[f"{case.get('classname', '')}::{case.get('name', '')}"] = seconds
+                if file:
+                    file_durations[file] = file_durations.get(file, 0.0) + seconds
+
+        for key in ['tests', 'failures', 'errors', 'skipped']:
+            merged.set(key, str(totals[key]))
+        merged.set('time', f"{totals['time']:.3f}")
+        ElementTree.ElementTree(merged).write(os.path.join(self.reports_dir, 'junit.xml'), encoding='utf-8',
+                                              xml_declaration=True)
+
+        if file_durations:
+            durations = self.load_durations()
+            durations['files'] = durations.get('files', {}) | file_durations
+            durations['tests'] = durations.get('tests', {}) | test_durations
+            with open(self.durations_file, 'w') as f:
+                json.dump(durations, f, indent=1, sort_keys=True)
+        return totals
+
+    def load_durations(self) -> dict:
+        try:
+            with open(self.durations_file, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _get_case_file(self, case: ElementTree.Element, files: list) -> None or str:
+        """Works out which test file a JUnit test case came from."""
+        file = case.get('file')
+        if file:
+            file = os.path.relpath(file, self.workdir) if os.path.isabs(file) else os.path.normpath(file)
+            return file if file in files else None
+        # Without a file attribute, match the dotted class name (e.g. tests.test_api.TestUsers) to a module path
+        parts = case.get('classname', '').split('.')
+        for length in range(len(parts), 0, -1):
+            module = '/'.join(parts[:length]) + '.py'
+            if module in files:
+                return module
+        return None
+
+    # -------
+    # Helpers
+    # -------
+
+    def _find_mounts(self) -> tuple:
+        """
+        Finds where the project's source and reports directories are mounted in the app container.
+
+        Returns:
+            tuple: (source dir on the host, its container path, reports dir on the host, its container path)
+        """
+        compose = ComposeFiles.load(os.path.join(self.project_path, 'docker-compose.yml'))
+        source_dir, reports_dir = os.path.join(self.project_path, 'src'), os.path.join(self.project_path, 'reports')
+        workdir = reports_target = None
+        for service in (compose.get('services') or {}).values():
+            for host_path, container_path in ComposeFiles.get_bind_mounts(service, self.project_path):
+                if host_path == source_dir:
+                    workdir = container_path
+                elif host_path == reports_dir:
+                    reports_target = container_path
+            if workdir and reports_target:
+                break
+        if not workdir or not reports_target:
+            raise ValueError("The project's docker-compose.yml doesn't mount both ./src and ./reports.")
+        return source_dir, workdir, reports_dir, reports_target
+
+    def _find_database(self, database: str) -> tuple:
+        """Works out which shared database the project uses, from its .env."""
+        if database == 'none':
+            return None, None
+        connection = (self.env.get('DB_CONNECTION') or '').lower()
+        if database == 'auto':
+            if connection in ['pgsql', 'postgres', 'postgresql'] or self.env.get('POSTGRES_DB'):
+                database = 'postgres'
+            elif connection in ['mysql', 'mariadb'] or self.env.get('MYSQL_DATABASE') or self.env.get('DB_DATABASE'):
+                database = 'mysql'
+            else:
+                return None, None
+        if database not in self.DATABASE_KEYS:
+            raise ValueError(f"Unknown database {database}. Use auto, mysql, postgres, or none.")
+
+        name = next((self.env[key] for key in self.DATABASE_KEYS[database] if self.env.get(key)), None)
+        if not name:
+            raise ValueError(f"The project's .env doesn't name a {database} database "
+                             f"({' or '.join(self.DATABASE_KEYS[database])}).")
+        if not self._IDENTIFIER_P.match(name):
+            raise ValueError(f"Database name {name} can only contain letters, digits, _ and $.")
+        return database, name
+
+    def _mysql(self, args: list, shell: bool = False) -> str:
+        password = ComposeFiles.get_env(self.config.cli_root_dir).get('MYSQL_ROOT_PASSWORD', '')
+        command = args if shell else ['mysql', '-uroot'] + args
+        return DockerHelpers.exec_in_container('anydev-mysql', command, {'MYSQL_PWD': password})
+
+    def _psql(self, sql: str) -> str:
+        password = ComposeFiles.get_env(self.config.cli_root_dir).get('POSTGRES_PASSWORD', '')
+        return DockerHelpers.exec_in_container('anydev-postgres', ['psql', '-U', 'postgres', '-tA', '-c', sql],
+                                               {'PGPASSWORD': password})
@@ -0,0 +1,275 @@
+import csv
+import json
+import math
+import re
+import time
+import urllib.error
+import urllib.request
+
+from collections import deque
+from anydev.core.cli_output import CliOutput
+from rich.table import Table
+
+
+class TraefikMetrics:
+    """
+    Scrapes the shared Traefik's Prometheus endpoint and turns its counters into per-project traffic figures.
+
+    Traefik only exposes cumulative counters and latency histograms. Scrapes are kept for a sliding window, and rates,
+    status-code mixes and latency percentiles are computed from the difference between the oldest and newest scrape
+    in the window, the way Prometheus' rate() and histogram_quantile() would.
+
+    HTTP and HTTPS routers of the same project (e.g. php-foo and php-foo-secure) are reported together.
+    """
+
+    METRICS_URL = 'http://127.0.0.1:8082/metrics'
+
+    PERCENTILES = [0.5, 0.95, 0.99]
+    STATUS_CLASSES = ['2xx', '3xx', '4xx', '5xx']
+
+    _SAMPLE_P = re.compile(r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>.*)\})?\s+(?P<value>\S+)')
+    _LABEL_P = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+    def __init__(self, window: float = 60, interval: float = 2, url: str = METRICS_URL):
+        self.window = window
+        self.interval = interval
+        self.url = url
+        # Scrapes inside the window (oldest first)
+        self.samples = deque()
+
+    @staticmethod
+    def check_endpoint(url: str = METRICS_URL) -> None:
+        """Exits with a helpful message if Traefik's metrics endpoint isn't reachable."""
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                pass
+        except (urllib.error.URLError, OSError):
+            CliOutput.error(
+                f"Could not reach Traefik's metrics at {url}. "
+                "Restart the shared services (`anydev services restart`) to enable them."
+            )
+
+    def stream(self, once: bool = False):
+        """
+        Scrapes Traefik every interval and yields a report for the current window.
+
+        Args:
+            once (bool): Report on a single interval, then stop.
+
+        Yields:
+            dict: Router -> figures (see report()).
+        """
+        self.add_sample(self.scrape())
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.add_sample(self.scrape())
+            except (urllib.error.URLError, OSError):
+                # Traefik restarting; keep the window and try again
+                if once:
+                    raise
+                continue
+            yield self.report()
+            if once:
+                return
+
+    def scrape(self) -> dict:
+        """
+        Reads Traefik's router counters and histograms.
+
+        Returns:
+            dict: {'time': ..., 'routers': {router: {'codes': {code: count}, 'buckets': {le: count}, 'sum', 'count'}}}
+        """
+        with urllib.request.urlopen(self.url, timeout=max(self.interval, 1)) as response:
+            text = response.read().decode('utf-8', errors='replace')
+
+        routers = {}
+        for name, labels, value in self.parse(text):
+            if not name.startswith('traefik_router_'):
+                continue
+            router = self.router_key(labels.get('router', ''))
+            if router is None:
+                continue
+            stats = routers.setdefault(router, {'codes': {}, 'buckets': {}, 'sum': 0.0, 'count': 0.0})
+            if name == 'traefik_router_requests_total':
+                code = labels.get('code', '')
+                stats['codes'][code] = stats['codes'].get(code, 0.0) + value
+            elif name == 'traefik_router_request_duration_seconds_bucket':
+                le = float(labels.get('le', '+Inf'))
+                stats['buckets'][le] = stats['buckets'].get(le, 0.0) + value
+            elif name == 'traefik_router_request_duration_seconds_sum':
+                stats['sum'] += value
+            elif name == 'traefik_router_request_duration_seconds_count':
+                stats['count'] += value
+        return {'time': time.time(), 'routers': routers}
+
+    def add_sample(self, sample: dict) -> None:
+        """Adds a scrape, dropping those that have fallen out of the window (always keeping two)."""
+        self.samples.append(sample)
+        while len(self.samples) > 2 and self.samples[1]['time'] <= sample['time'] - self.window:
+            self.samples.popleft()
+
+    def report(self) -> dict:
+        """
+        Computes each router's figures between the oldest and newest scrape in the window.
+
+        Returns:
+            dict: Router -> {'requests', 'rps', 'status' (class -> share), 'mean', 'p50', 'p95', 'p99'}. Latencies
+                  are in seconds, or None without requests.
+        """
+        if len(self.samples) < 2:
+            return {}
+        oldest, newest = self.samples[0], self.samples[-1]
+        elapsed = max(newest['time'] - oldest['time'], 1e-9)
+
+        report = {}
+        for router, current in newest['routers'].items():
+            previous = oldest['routers'].get(router, {'codes': {}, 'buckets': {}, 'sum': 0.0, 'count': 0.0})
+            codes = {code: self._delta(count, previous['codes'].get(code, 0.0))
+                     for code, count in current['codes'].items()}
+            requests = sum(codes.values())
+
+            status = dict.fromkeys(self.STATUS_CLASSES, 0.0)
+            for code, count in codes.items():
+                status_class = f"{code[:1]}xx"
+                if status_class in status and requests:
+                    status[status_class] += count / requests
+
+            buckets = {le: self._delta(count, previous['buckets'].get(le, 0.0))
+                       for le, count in current['buckets'].items()}
+            count = self._delta(current['count'], previous['count'])
+            duration = self._delta(current['sum'], previous['sum'])
+
+            report[router] = {
+                'requests': requests,
+                'rps':      requests / elapsed,
+                'status':   status,
+                'mean':     duration / count if count else None,
+            } | {f"p{round(q * 100)}": self.histogram_quantile(q, buckets) for q in self.PERCENTILES}
+        return report
+
+    def render_table(self, report: dict) -> Table:
+        table = Table(title=f"Traefik Traffic (last {self.window:g}s)")
+        table.add_column("Router", justify="left", style="cyan", no_wrap=True)
+        table.add_column("RPS", justify="right", style="green")
+        table.add_column("Requests", justify="right")
+        for status_class in self.STATUS_CLASSES:
+            table.add_column(status_class, justify="right", style="red" if status_class == '5xx' else None)
+        for q in self.PERCENTILES:
+            table.add_column(f"p{round(q * 100)}", justify="right", style="magenta")
+
+        for router, figures in sorted(report.items(), key=lambda item: (-item[1]['rps'], item[0])):
+            table.add_row(
+                router,
+                f"{figures['rps']:.2f}",
+                f"{figures['requests']:.0f}",
+                *[f"{figures['status'][status_class] * 100:.0f}%" if figures['requests'] else "-"
+                  for status_class in self.STATUS_CLASSES],
+                *[self.format_latency(figures[f"p{round(q * 100)}"]) for q in self.PERCENTILES]
+            )
+        return table
+
+    @staticmethod
+    def export_report(report: dict, export_file, export_format: str = 'csv', write_header: bool = False) -> None:
+        """
+        Appends a report to an open export file.
+
+        Args:
+            report (dict): Router -> figures.
+            export_file: A writable text file object.
+            export_format (str): Either 'csv' or 'json' (one JSON object per line).
+            write_header (bool): Write the CSV header row first.
+        """
+        timestamp = time.time()
+        fields = ['time', 'router', 'requests', 'rps'] + TraefikMetrics.STATUS_CLASSES + ['mean'] + \
+            [f"p{round(q * 100)}" for q in TraefikMetrics.PERCENTILES]
+        rows = [
+            {'time': timestamp, 'router': router} | {key: value for key, value in figures.items() if key != 'status'}
+            | figures['status']
+            for router, figures in report.items()
+        ]
+
+        if export_format == 'json':
+            for row in rows:
+                export_file.write(json.dumps(row) + '\n')
+        else:
+            writer = csv.DictWriter(export_file, fieldnames=fields)
+            if write_header:
+                writer.writeheader()
+            writer.writerows(rows)
+        export_file.flush()
+
+    @staticmethod
+    def parse(text: str):
+        """
+        Parses the Prometheus text exposition format.
+
+        Yields:
+            tuple: (metric name, labels dict, value)
+        """
+        for line in text.splitlines():
+            if not line or line.startswith('#'):
+                continue
+            match = TraefikMetrics._SAMPLE_P.match(line)
+            if not match:
+                continue
+            try:
+                value = float(match.group('value'))
+            except ValueError:
+                continue
+            labels = {key: raw.replace('\\"', '"').replace('\\\\', '\\')
+                      for key, raw in TraefikMetrics._LABEL_P.findall(match.group('labels') or '')}
+            yield match.group('name'), labels, value
+
+    @staticmethod
+    def router_key(router: str) -> None or str:
+        """
+        Names the project a router belongs to: php-foo@docker and php-foo-secure@docker are both php-foo.
+        Traefik's own routers (api, dashboard) are ignored.
+        """
+        name, _, provider = router.partition('@')
+        if not name or provider == 'internal':
+            return None
+        return name[:-len('-secure')] if name.endswith('-secure') else name
+
+    @staticmethod
+    def histogram_quantile(q: float, buckets: dict) -> None or float:
+        """
+        Estimates a quantile from cumulative histogram buckets, interpolating linearly within the bucket it falls
+        in (like Prometheus' histogram_quantile).
+
+        Args:
+            q (float): The quantile (0-1).
+            buckets (dict): Upper bound (le) -> cumulative count, including +Inf.
+
+        Returns:
+            float: The estimate in the buckets' unit, or None without observations.
+        """
+        bounds = sorted(buckets)
+        if not bounds or buckets[bounds[-1]] <= 0:
+            return None
+        rank = q * buckets[bounds[-1]]
+
+        lower_bound, lower_count = 0.0, 0.0
+        for bound in bounds:
+            count = buckets[bound]
+            if count >= rank:
+                if math.isinf(bound):
+                    # Above the highest finite bucket; that bound is the best estimate available
+                    return lower_bound
+                if count == lower_count:
+                    return bound
+                return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+            lower_bound, lower_count = bound, count
+        return lower_bound
+
+    @staticmethod
+    def format_latency(seconds: None or float) -> str:
+        if seconds is None:
+            return "-"
+        return f"{seconds * 1000:.1f}ms" if seconds < 10 else f"{seconds:.1f}s"
+
+    @staticmethod
+    def _delta(current: float, previous: float) -> float:
+        # Counters restart from zero when Traefik restarts
+        return current - previous if current >= previous else current
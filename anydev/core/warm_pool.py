@@ -0,0 +1,284 @@
+import fcntl
+import hashlib
+import json
+import os
+import secrets
+import shutil
+import ssl
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from anydev.configuration import Configuration
+from anydev.core.create_project import CreateProject
+from anydev.core.docker_controls import DockerHelpers
+from dotenv import dotenv_values, set_key
+
+
+class WarmPool:
+    """
+    Keeps a few started, unassigned projects per template ("slots") under <projects dir>/.anydev-pool, so a new
+    project can take one over instead of starting from nothing.
+
+    A slot has its template copied, images built, dependency volumes filled, and its app answering requests. Docker
+    can't change a container's labels, environment, or mounts, so adopting a slot moves its directory to the new
+    project, rewrites its hostname, and recreates the containers from the slot's images and volumes, keeping the
+    slot's compose project name. Only container creation and Traefik picking up the route are left to wait for.
+
+    Slots are tied to a fingerprint of their template (files and the env values AnyDev sets), so slots built from an
+    older version of a template are never adopted, and are replaced on the next fill.
+    """
+
+    SLOT_FILE = '.anydev-slot.json'
+
+    # Seconds a new slot gets to answer its first request (dependency installs included)
+    READY_TIMEOUT = 300
+
+    # Seconds `anydev project create` waits for a new project of a pooled template to answer
+    FIRST_RESPONSE_TIMEOUT = 30
+
+    def __init__(self):
+        self.config = Configuration()
+        self.settings = self.config.get_pool_settings()
+        self.pool_dir = os.path.join(os.path.expanduser(self.config.get_project_directory()), '.anydev-pool')
+
+    # ------
+    # Slots
+    # ------
+
+    def get_slots(self, template: str = None) -> list:
+        """
+        Lists the pool's slots, oldest first.
+
+        Returns:
+            list: Slot dicts with path, hostname, template, fingerprint, versions, created, state ('ready',
+                  'starting', or 'failed'), boot_seconds, error, and stale (built from an older template).
+        """
+        slots = []
+        fingerprints = {}
+        for entry in sorted(os.listdir(self.pool_dir)) if os.path.isdir(self.pool_dir) else []:
+            if entry.endswith('.adopting'):
+                continue
+            try:
+                with open(os.path.join(self.pool_dir, entry, self.SLOT_FILE), 'r') as f:
+                    slot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if template and slot['template'] != template:
+                continue
+            if slot['template'] not in fingerprints:
+                fingerprints[slot['template']] = self.fingerprint(slot['template'])
+            slot['path'] = os.path.join(self.pool_dir, entry)
+            slot['stale'] = slot['fingerprint'] != fingerprints[slot['template']]
+            slots.append(slot)
+        return sorted(slots, key=lambda slot: slot['created'])
+
+    def fingerprint(self, template: str) -> None or str:
+        """Hashes a template's files and the env values AnyDev gives its projects (e.g. pooler hosts)."""
+        template_dir = os.path.join(self.config.templates_dir, template)
+        if not os.path.isdir(template_dir):
+            return None
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(template_dir):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, template_dir).encode())
+                with open(path, 'rb') as f:
+                    digest.update(hashlib.sha256(f.read()).digest())
+        env_values = CreateProject.get_env_values('', template)
+        digest.update(json.dumps({key: value for key, value in env_values.items() if value}, sort_keys=True).encode())
+        return digest.hexdigest()[:12]
+
+    def fill(self, templates: list = None, size: int = None, progress: callable = None) -> list:
+        """
+        Tops the pool up to `size` ready slots per template, replacing stale and failed slots. Only one fill runs at
+        a time; others return straight away.
+
+        Returns:
+            list: The slots created (see get_slots()).
+        """
+        templates = templates or self.settings['templates']
+        size = self.settings['size'] if size is None else size
+        os.makedirs(self.pool_dir, exist_ok=True)
+        with open(os.path.join(self.pool_dir, '.fill.lock'), 'w') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return []
+
+            created = []
+            for template in templates:
+                usable = []
+                for slot in self.get_slots(template):
+                    # With the lock held, a slot still starting was left behind by a fill that died
+                    if slot['stale'] or slot['state'] != 'ready':
+                        self.remove_slot(slot)
+                    else:
+                        usable.append(slot)
+                for _ in range(size - len(usable)):
+                    slot = self.create_slot(template)
+                    created.append(slot)
+                    if progress:
+                        progress(slot)
+            return created
+
+    def create_slot(self, template: str) -> dict:
+        """Copies a template into a new slot, starts it, and waits for it to answer."""
+        if not os.path.isdir(os.path.join(self.config.templates_dir, template)):
+            raise ValueError(f"Template '{template}' not found in {self.config.templates_dir}.")
+        hostname = f"pool-{template}-{secrets.token_hex(3)}"
+        path = os.path.join(self.pool_dir, hostname)
+        shutil.copytree(os.path.join(self.config.templates_dir, template), path)
+        self._write_env(path, CreateProject.get_env_values(hostname, template))
+
+        template_env = dotenv_values(os.path.join(path, '.env'))
+        slot = {
+            'hostname':     hostname,
+            'template':     template,
+            'fingerprint':  self.fingerprint(template),
+            # The template's version settings (e.g. PHP_VERSION), for display
+            'versions':     {key: value for key, value in template_env.items() if key.endswith('VERSION') and value},
+            'created':      time.time(),
+            'state':        'starting',
+            'boot_seconds': None,
+            'error':        None,
+        }
+        self._write_slot(path, slot)
+
+        started = time.monotonic()
+        result = DockerHelpers.start_composition(path)
+        if result.returncode != 0:
+            output = (result.stderr or result.stdout or '').strip().splitlines()
+            slot['state'], slot['error'] = 'failed', output[-1] if output else f"exited with {result.returncode}"
+        elif self.wait_for_response(f"https://{hostname}.site.test/", self.READY_TIMEOUT) is None:
+            slot['state'], slot['error'] = 'failed', f"no response within {self.READY_TIMEOUT} seconds"
+        else:
+            slot['state'], slot['boot_seconds'] = 'ready', time.monotonic() - started
+        self._write_slot(path, slot)
+        slot['path'] = path
+        return slot
+
+    def remove_slot(self, slot: dict) -> None or str:
+        """Removes a slot's containers, volumes, and directory. Returns an error message on failure."""
+        result = subprocess.run(['docker', 'compose', 'down', '--volumes', '--remove-orphans'], cwd=slot['path'],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            output = (result.stderr or result.stdout).strip().splitlines()
+            return output[-1] if output else f"docker compose down exited with {result.returncode}"
+        shutil.rmtree(slot['path'], ignore_errors=True)
+        return None
+
+    def drain(self, templates: list = None) -> list:
+        """
+        Removes every slot (of the given templates).
+
+        Returns:
+            list: (slot, error) tuples.
+        """
+        return [(slot, self.remove_slot(slot)) for slot in self.get_slots()
+                if not templates or slot['template'] in templates]
+
+    # ---------
+    # Adoption
+    # ---------
+
+    def take(self, template: str) -> None or dict:
+        """
+        Claims the oldest ready, up-to-date slot of a template, so no other `anydev` process can adopt it.
+
+        Returns:
+            dict: The slot, with `path` pointing at its claimed location, or None if there isn't one.
+        """
+        for slot in self.get_slots(template):
+            if slot['stale'] or slot['state'] != 'ready':
+                continue
+            claimed_path = f"{slot['path']}.adopting"
+            try:
+                # Atomic, so only one process wins
+                os.rename(slot['path'], claimed_path)
+            except OSError:
+                continue
+            slot['path'] = claimed_path
+            return slot
+        return None
+
+    def adopt(self, slot: dict, project_path: str, hostname: str) -> None:
+        """
+        Turns a claimed slot into the project at project_path: moves its files there (replacing the template files
+        already copied), points its env at the new hostname, and recreates its containers without rebuilding.
+
+        Raises:
+            RuntimeError: If the containers can't be recreated.
+        """
+        os.makedirs(project_path, exist_ok=True)
+        for name in os.listdir(slot['path']):
+            target = os.path.join(project_path, name)
+            if os.path.isdir(target) and not os.path.islink(target):
+                shutil.rmtree(target)
+            elif os.path.lexists(target):
+                os.remove(target)
+            shutil.move(os.path.join(slot['path'], name), target)
+        os.rmdir(slot['path'])
+        os.remove(os.path.join(project_path, self.SLOT_FILE))
+
+        # The slot's compose project name keeps its images and volumes
+        compose_name = dotenv_values(os.path.join(project_path, '.env')).get('COMPOSE_PROJECT_NAME')
+        self._write_env(project_path, CreateProject.get_env_values(hostname, slot['template'])
+                        | {'COMPOSE_PROJECT_NAME': compose_name})
+
+        result = DockerHelpers.start_composition(project_path, extra_args=['--no-build'])
+        if result.returncode != 0:
+            output = (result.stderr or result.stdout or '').strip().splitlines()
+            raise RuntimeError(output[-1] if output else f"docker compose exited with {result.returncode}")
+
+    def refill_in_background(self, template: str) -> None:
+        """Starts `anydev pool fill` for a template in a detached process, logging to the pool directory."""
+        with open(os.path.join(self.pool_dir, 'fill.log'), 'a') as log_file:
+            subprocess.Popen([sys.executable, '-m', 'anydev.cli', 'pool', 'fill', template], stdout=log_file,
+                             stderr=log_file, stdin=subprocess.DEVNULL, start_new_session=True)
+
+    @staticmethod
+    def wait_for_response(url: str, timeout: float, interval: float = 0.25) -> None or float:
+        """
+        Polls a URL until it answers with anything but a server error.
+
+        Returns:
+            float: Seconds until it answered, or None if it didn't within the timeout.
+        """
+        # Local certificates may not be trusted by Python's CA bundle
+        context = ssl._create_unverified_context()
+        started = time.monotonic()
+        while True:
+            try:
+                with urllib.request.urlopen(url, timeout=max(interval, 2), context=context):
+                    return time.monotonic() - started
+            except urllib.error.HTTPError as e:
+                # Traefik answers with its own 404 until it has picked up the route
+                if e.code < 500 and not (e.code == 404 and e.read().strip() == b'404 page not found'):
+                    return time.monotonic() - started
+            except (urllib.error.URLError, OSError):
+                pass
+            if time.monotonic() - started + interval > timeout:
+                return None
+            time.sleep(interval)
+
+    # -------
+    # Helpers
+    # -------
+
+    @staticmethod
+    def _write_env(path: str, values: dict) -> None:
+        """Sets AnyDev's values in .env.example and copies it to .env, like project creation does."""
+        env_example_path = os.path.join(path, '.env.example')
+        if not os.path.exists(env_example_path):
+            open(env_example_path, 'a').close()
+        for key, value in values.items():
+            set_key(env_example_path, key, value)
+        shutil.copy(env_example_path, os.path.join(path, '.env'))
+
+    def _write_slot(self, path: str, slot: dict) -> None:
+        with open(os.path.join(path, self.SLOT_FILE), 'w') as f:
+            json.dump({key: value for key, value in slot.items() if key not in ['path', 'stale']}, f, indent=2)
@@ -0,0 +1,205 @@
+"""
+`anydevd`: keeps AnyDev's state warm for the thin client (see anydev/client.py).
+
+The daemon imports the CLI once and keeps the parsed configuration, project registry, compose models and a live
+view of Docker's containers in memory. Configuration files are re-read when they change, and container state is
+refreshed from `docker events`. Read-only commands listed in SERVED_COMMANDS are run here with their output
+captured and sent back; the client runs everything else (prompts, TTYs, long-running commands) in-process.
+"""
+import io
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+import typer.core
+import typer.main
+
+from anydev.cli import main as cli_main
+from anydev.client import SOCKET_PATH
+from anydev.configuration import Configuration
+from anydev.core.docker_state import DockerState
+from click.exceptions import Abort, ClickException, Exit
+
+
+class _ClientStream(io.StringIO):
+    """Captures command output, reporting the client's terminal (not the daemon's) to rich and click."""
+
+    def __init__(self, tty: bool):
+        super().__init__()
+        self._tty = tty
+
+    def isatty(self) -> bool:
+        return self._tty
+
+    @property
+    def encoding(self) -> str:
+        return 'utf-8'
+
+
+class AnydevDaemon:
+    """Serves warm commands over a unix socket."""
+
+    # Commands run by the daemon, by callback. They must not prompt, read stdin, or run for long.
+    SERVED_COMMANDS = {
+        'anydev.cli.version',
+        'anydev.commands.cache.stats',
+        'anydev.commands.project.list_all',
+        'anydev.commands.services.status',
+    }
+
+    def __init__(self, socket_path: str = SOCKET_PATH):
+        self.config = Configuration()
+        self.socket_path = socket_path
+        self.pid_file = f"{os.path.splitext(socket_path)[0]}.pid"
+        self.started = time.time()
+        self.requests = 0
+
+        self._group = typer.main.get_command(cli_main)
+        self._docker_state = DockerState()
+        # Commands share the process's cwd, environment and stdout, so they run one at a time
+        self._lock = threading.Lock()
+        self._watched_files = [self.config.config_file, self.config.cli_env_active]
+        self._watched_mtimes = self._get_mtimes()
+        self._server = None
+
+    def serve(self) -> None:
+        """Warms up and serves requests until shut down."""
+        # Open the registry and parse the shared compose file now, rather than on the first request
+        self.config.get_registry()
+        self._docker_state.watch()
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+
+        daemon = self
+
+        class RequestHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    payload = json.loads(self.rfile.readline())
+                    reply = daemon.handle(payload)
+                except (ValueError, TypeError):
+                    reply = {'fallback': True}
+                self.wfile.write(json.dumps(reply).encode() + b'\n')
+
+        old_umask = os.umask(0o077)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon_threads = True
+
+        with open(self.pid_file, 'w') as f:
+            f.write(str(os.getpid()))
+        try:
+            self._server.serve_forever()
+        finally:
+            self._docker_state.stop()
+            for path in [self.socket_path, self.pid_file]:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def handle(self, payload: dict) -> dict:
+        """Handles one request: run, ping, or shutdown."""
+        op = payload.get('op')
+        if op == 'ping':
+            return {
+                'pid':      os.getpid(),
+                'uptime':   time.time() - self.started,
+                'requests': self.requests,
+                'served':   sorted(self.SERVED_COMMANDS),
+            }
+        if op == 'shutdown':
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+            return {'ok': True}
+        if op == 'run':
+            return self.run(payload)
+        return {'fallback': True}
+
+    def run(self, payload: dict) -> dict:
+        """Runs a served command with the client's cwd and terminal settings, capturing its output."""
+        argv = [str(arg) for arg in payload.get('argv', [])]
+        if not self.is_served(argv):
+            return {'fallback': True}
+
+        with self._lock:
+            self._refresh_config()
+            self.requests += 1
+            stdout, stderr = _ClientStream(payload.get('tty', False)), _ClientStream(payload.get('tty', False))
+            saved_streams = sys.stdout, sys.stderr
+            saved_cwd = os.getcwd()
+            saved_env = dict(os.environ)
+            try:
+                os.chdir(payload.get('cwd') or saved_cwd)
+                os.environ.update({key: str(value) for key, value in (payload.get('env') or {}).items()})
+                os.environ['COLUMNS'] = str(payload.get('columns', 80))
+                sys.stdout, sys.stderr = stdout, stderr
+                exit_code = self._invoke(argv, stderr)
+            except OSError:
+                return {'fallback': True}
+            finally:
+                sys.stdout, sys.stderr = saved_streams
+                os.chdir(saved_cwd)
+                os.environ.clear()
+                os.environ.update(saved_env)
+
+        return {'out': stdout.getvalue(), 'err': stderr.getvalue(), 'exit': exit_code}
+
+    def is_served(self, argv: list) -> bool:
+        """Resolves argv (with aliases) to a command and checks whether the daemon serves it."""
+        if any(arg in ['--help', '-h'] for arg in argv):
+            return False
+
+        command = self._group
+        for arg in argv:
+            if not isinstance(command, typer.core.TyperGroup):
+                break
+            if arg.startswith('-'):
+                return False
+            command = command.get_command(None, arg)
+            if command is None:
+                return False
+        if isinstance(command, typer.core.TyperGroup):
+            return False
+
+        callback = getattr(command.callback, '__wrapped__', command.callback)
+        return f"{callback.__module__}.{callback.__qualname__}" in self.SERVED_COMMANDS
+
+    def _invoke(self, argv: list, stderr) -> int:
+        try:
+            result = self._group.main(args=argv, prog_name='anydev', standalone_mode=False)
+            return result if isinstance(result, int) else 0
+        except Exit as e:
+            return e.exit_code
+        except ClickException as e:
+            e.show(file=stderr)
+            return e.exit_code
+        except Abort:
+            return 1
+
+    def _refresh_config(self) -> None:
+        """Re-reads the configuration if any watched file changed since the last request."""
+        mtimes = self._get_mtimes()
+        if mtimes != self._watched_mtimes:
+            self._watched_mtimes = mtimes
+            self.config.reload()
+
+    def _get_mtimes(self) -> list:
+        mtimes = []
+        for path in self._watched_files:
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return mtimes
+
+
+def main() -> None:
+    AnydevDaemon().serve()
+
+
+if __name__ == '__main__':
+    main()